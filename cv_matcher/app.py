@@ -2,20 +2,40 @@
 Point d'entrée de l'application de matching CV.
 """
 import os
+import json
+import itertools
 import logging
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 import uvicorn
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 from core.extractor import CVExtractor
 from core.processor import TextProcessor
-from core.encoder import TextEncoder
-from core.matcher import CVMatcher
 from core.summarizer import MatchSummarizer
+from core.store import CandidateStore
+from core.dedup import DuplicateIndex
+from core.ann import IVFIndex
+from core.pipeline import MatchPipeline
+from core.sharding import ShardExecutor
+from core.storage import create_document_reader, DocumentStoreError
+from core.planner import plan_resources, apply_plan
 from utils.ner import EntityExtractor
-from config import CV_UPLOAD_DIR, API_HOST, API_PORT, DEBUG_MODE
+from utils.profiling import ProfilingMiddleware, profiled_call, profiled_iter
+from config import CV_UPLOAD_DIR, API_HOST, API_PORT, DEBUG_MODE, CANDIDATE_STORE_PATH, MATCH_PAGE_SIZE, DEDUP_INDEX_PATH
+from config import MATCH_MAX_SHARDS, PREFILTER_SIZE, ANN_ENABLED, ANN_INDEX_PATH
+from config import PROFILING_ENABLED, PROFILING_ADMIN_TOKEN, PROFILING_DIR
+from config import SPACY_MODEL, USE_STUB_BACKENDS, STUB_SPACY_MODEL
+
+# Backends des modèles, remplaçables par des bouchons pour les tests de charge
+if USE_STUB_BACKENDS:
+    from benchmarks.stubs import StubTextEncoder as TextEncoder
+else:
+    from core.encoder import TextEncoder
 
 # Configuration du logging
 logging.basicConfig(
@@ -25,11 +45,21 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app):
+    """Cycle de vie de l'application: dernière sauvegarde du stockage et des index à l'arrêt."""
+    yield
+    # Les requêtes ne sauvegardent qu'au plus une fois par PERSIST_INTERVAL
+    match_pipeline.persist(force=True)
+    if shard_executor is not None:
+        shard_executor.close()
+
 # Création de l'application FastAPI
 app = FastAPI(
     title="RecruitPME - API de Matching CV",
     description="API pour l'analyse et le matching de CV avec des offres d'emploi",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuration CORS
@@ -41,11 +71,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profilage à la demande: le middleware n'est installé que s'il est activé
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, admin_token=PROFILING_ADMIN_TOKEN, output_dir=PROFILING_DIR)
+
+# Répartition des CPUs entre l'encodeur, spaCy, l'extraction et les workers uvicorn
+resource_plan = plan_resources()
+apply_plan(resource_plan)
+
+# Workers du matching partitionné, seulement s'ils sont prévus par le plan (SHARD_WORKERS
+# ou politique de ressources): créés avant le chargement des modèles (fork sans pools
+# de threads OpenMP), ils se partagent le budget de l'encodeur
+shard_workers = resource_plan["shard_workers"]
+shard_executor = None
+if shard_workers > 0:
+    shard_executor = ShardExecutor(
+        max_workers=shard_workers,
+        spacy_model=STUB_SPACY_MODEL if USE_STUB_BACKENDS else SPACY_MODEL,
+        stub_backends=USE_STUB_BACKENDS,
+        encoder_threads=max(1, resource_plan["encoder_threads"] // shard_workers)
+    )
+    shard_executor.start()
+
 # Initialisation des composants
 text_processor = TextProcessor()
 text_encoder = TextEncoder()
-entity_extractor = EntityExtractor()
-match_summarizer = MatchSummarizer(entity_extractor)
+entity_extractor = EntityExtractor(STUB_SPACY_MODEL if USE_STUB_BACKENDS else SPACY_MODEL)
+candidate_store = CandidateStore.load(CANDIDATE_STORE_PATH)
+duplicate_index = DuplicateIndex.load(DEDUP_INDEX_PATH)
+ann_index = IVFIndex.load(ANN_INDEX_PATH, dim=text_encoder.dimension) if ANN_ENABLED else None
+document_reader = create_document_reader()
+match_summarizer = MatchSummarizer(entity_extractor, candidate_store)
+match_pipeline = MatchPipeline(
+    text_processor, text_encoder, entity_extractor, match_summarizer, candidate_store, duplicate_index,
+    extraction_workers=resource_plan["extraction_workers"],
+    ner_processes=resource_plan["ner_processes"],
+    shard_executor=shard_executor,
+    ann_index=ann_index
+)
+
+# Index approximatif du vivier: entraîné ici, hors requête, dès que assez de CVs sont encodés
+if ann_index is not None:
+    match_pipeline.build_ann_index()
 
 # Modèles de données
 class JobOffer(BaseModel):
@@ -53,6 +120,8 @@ class JobOffer(BaseModel):
     description: str
     skills: Optional[List[str]] = None
     experience_level: Optional[str] = None
+    required_skills: Optional[List[str]] = None
+    min_experience_years: Optional[int] = None
     
 class MatchResult(BaseModel):
     filename: str
@@ -63,34 +132,157 @@ class MatchResult(BaseModel):
     experience_level: str
     matched_skills: List[str]
     missing_skills: List[str]
+    duplicates: List[str] = []
 
 class MatchResponse(BaseModel):
     results: List[MatchResult]
+    match_id: Optional[str] = None
+    total: int = 0
+    ranked: int = 0  # Candidats classés et paginables (inférieur à total avec le préfiltrage)
+
+class SearchResult(BaseModel):
+    filename: str
+    score: int
+    similarity: float
     
 # Vérifier que le répertoire d'upload existe
 os.makedirs(CV_UPLOAD_DIR, exist_ok=True)
 
+def _upload_path(filename):
+    """
+    Retourne le chemin d'enregistrement d'un fichier envoyé, sans sortir du
+    répertoire d'upload.
+    
+    Args:
+        filename (str): Nom du fichier fourni par le client
+        
+    Returns:
+        tuple: (nom du fichier sans répertoire, chemin d'enregistrement)
+    """
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    if name in ("", ".", ".."):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nom de fichier invalide: {filename}"
+        )
+    return name, os.path.join(CV_UPLOAD_DIR, name)
+
+async def _save_uploads(files):
+    """
+    Enregistre les fichiers envoyés dans le répertoire d'upload.
+    
+    Args:
+        files (list): Fichiers envoyés (UploadFile)
+        
+    Returns:
+        list: Tuples (nom du fichier, chemin du fichier), dans l'ordre de la requête
+    """
+    file_paths = []
+    
+    for file in files:
+        filename, file_path = _upload_path(file.filename)
+        # Deux fichiers de même nom s'écraseraient et partageraient leur analyse
+        if any(filename == name for name, _ in file_paths):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Fichier {filename} envoyé plusieurs fois"
+            )
+        with open(file_path, "wb") as f:
+            f.write(await file.read())
+        file_paths.append((filename, file_path))
+        
+    return file_paths
+
+def _build_match_response(page):
+    """
+    Construit la réponse de matching à partir d'une page résumée du pipeline.
+    
+    Args:
+        page (dict): Page retournée par MatchPipeline.run ou MatchPipeline.page
+        
+    Returns:
+        MatchResponse: Réponse de l'API
+    """
+    final_results = []
+    
+    for result in page["results"]:
+        summary = result["summary"]
+        if summary is None:
+            # CV illisible depuis le classement: le message d'erreur tient lieu de résumé
+            final_results.append(
+                MatchResult(
+                    filename=result["filename"],
+                    score=result["score"],
+                    summary=result["error"],
+                    skills=[],
+                    experience_level="",
+                    matched_skills=[],
+                    missing_skills=[],
+                    duplicates=result["duplicates"]
+                )
+            )
+            continue
+        final_results.append(
+            MatchResult(
+                filename=result["filename"],
+                score=result["score"],
+                summary=summary["text"],
+                skills=summary["matched_skills"] + summary["missing_skills"],
+                experience_years=summary["experience_years"],
+                experience_level=summary["experience_level"],
+                matched_skills=summary["matched_skills"],
+                missing_skills=summary["missing_skills"],
+                duplicates=result["duplicates"]
+            )
+        )
+        
+    return MatchResponse(results=final_results, match_id=page["match_id"], total=page["total"], ranked=page["ranked"])
+
 @app.post("/api/match/", response_model=MatchResponse)
 async def match_cvs_with_job(
-    job_offer: JobOffer,
+    job_offer: str = Form(...),
     files: Optional[List[UploadFile]] = File(None),
-    cv_directory: Optional[str] = Form(None)
+    file_keys: Optional[List[str]] = Form(None),
+    cv_directory: Optional[str] = Form(None),
+    top_k: int = Form(MATCH_PAGE_SIZE, ge=1),
+    offset: int = Form(0, ge=0),
+    collapse_duplicates: bool = Form(False),
+    shards: int = Form(1),
+    prefilter_size: int = Form(PREFILTER_SIZE)
 ):
     """
     Analyse et classe les CVs selon leur pertinence pour une offre d'emploi.
     
+    Seule la page demandée (top_k, offset) est résumée; les pages suivantes
+    s'obtiennent avec GET /api/match/{match_id}.
+    
     Args:
-        job_offer: L'offre d'emploi à utiliser pour le matching
+        job_offer: L'offre d'emploi à utiliser pour le matching (JSON)
         files: Liste de fichiers CV à analyser (facultatif)
+        file_keys: Clés de CVs déjà stockés (facultatif)
         cv_directory: Répertoire contenant les CVs à analyser (facultatif)
+        top_k: Nombre de candidats résumés
+        offset: Rang du premier candidat résumé
+        collapse_duplicates: Regrouper les quasi-doublons sous le mieux classé
+        shards: Nombre de partitions notées en parallèle par des processus workers
+                (1, ou aucun worker configuré = classement en flux dans le
+                processus de l'API)
+        prefilter_size: CVs présélectionnés par les embeddings statiques puis
+                        encodés par le modèle complet (0 = pas de préfiltrage;
+                        classement en flux uniquement)
         
     Returns:
         MatchResponse: Résultat du matching
     """
-    if not files and not cv_directory:
+    try:
+        job_offer = JobOffer.model_validate_json(job_offer)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+        
+    if not files and not file_keys and not cv_directory:
         raise HTTPException(
             status_code=400,
-            detail="Vous devez fournir soit des fichiers, soit un répertoire de CVs"
+            detail="Vous devez fournir des fichiers, des clés de fichiers ou un répertoire de CVs"
         )
         
     logger.info(f"Analyse d'une offre: {job_offer.title}")
@@ -101,32 +293,23 @@ async def match_cvs_with_job(
         job_text += "\nCompétences requises: " + ", ".join(job_offer.skills)
     if job_offer.experience_level:
         job_text += f"\nNiveau d'expérience: {job_offer.experience_level}"
-        
-    # 2. Traitement et encodage de l'offre
-    processed_job_text = text_processor.clean_job_text(job_text)
-    job_embedding = text_encoder.encode_chunks(processed_job_text)
     
-    # 3. Traitement des CVs
-    cv_texts = {}
-    cv_embeddings = {}
+    # 2. Sources de CVs (nom du fichier, chemin du fichier)
+    sources = []
     
-    # 3.1 Si des fichiers sont fournis
+    # 2.1 Si des fichiers sont fournis
     if files:
-        for file in files:
-            # Sauvegarder le fichier
-            file_path = os.path.join(CV_UPLOAD_DIR, file.filename)
-            with open(file_path, "wb") as f:
-                f.write(await file.read())
-                
-            # Extraire le texte
-            cv_text = CVExtractor.extract_from_pdf(file_path)
-            if cv_text:
-                cv_texts[file.filename] = cv_text
-                # Traiter et encoder le CV
-                processed_cv_text = text_processor.clean_cv_text(cv_text)
-                cv_embeddings[file.filename] = text_encoder.encode_chunks(processed_cv_text)
+        sources.append(await _save_uploads(files))
+        
+    # 2.2 Si des clés de CVs stockés sont fournies (lus sans nouvel upload)
+    if file_keys:
+        sources.append(
+            (file_key, file_path)
+            for file_key, file_path in document_reader.fetch_many(file_keys)
+            if file_path
+        )
     
-    # 3.2 Si un répertoire est fourni
+    # 2.3 Si un répertoire est fourni
     if cv_directory:
         if not os.path.isdir(cv_directory):
             cv_directory = os.path.join(CV_UPLOAD_DIR, cv_directory)
@@ -137,93 +320,227 @@ async def match_cvs_with_job(
                 detail=f"Le répertoire {cv_directory} n'existe pas"
             )
             
-        extracted_texts = CVExtractor.extract_all_from_directory(cv_directory)
-        for filename, cv_text in extracted_texts.items():
-            cv_texts[filename] = cv_text
-            # Traiter et encoder le CV
-            processed_cv_text = text_processor.clean_cv_text(cv_text)
-            cv_embeddings[filename] = text_encoder.encode_chunks(processed_cv_text)
-            
-    # 4. Calcul des scores de matching
-    if not cv_embeddings:
+        # Identifiants relatifs au répertoire des uploads: deux CVs de même nom
+        # dans des répertoires différents ne partagent pas leur analyse
+        sources.append(CVExtractor.list_directory(cv_directory, root=CV_UPLOAD_DIR))
+        
+    file_paths = itertools.chain.from_iterable(sources)
+    shards = max(1, min(shards, MATCH_MAX_SHARDS))
+    if shards > 1 and shard_executor is None:
+        logger.info("Matching partitionné non configuré (SHARD_WORKERS): classement en flux")
+        shards = 1
+    
+    # 3. Classement et résumé de la page demandée, hors de la boucle d'événements
+    try:
+        if shards > 1:
+            # Partitions notées en parallèle par les workers, attendues hors de la boucle d'événements
+            page = await run_in_threadpool(
+                profiled_call(match_pipeline.run_sharded),
+                job_text,
+                file_paths,
+                top_k=top_k,
+                offset=offset,
+                required_skills=job_offer.required_skills,
+                min_experience_years=job_offer.min_experience_years,
+                collapse_duplicates=collapse_duplicates,
+                shards=shards
+            )
+        else:
+            # Classement en flux, CVs extraits à la volée
+            page = await run_in_threadpool(
+                profiled_call(match_pipeline.run),
+                job_text,
+                CVExtractor.iter_from_paths(file_paths, resource_plan["extraction_workers"]),
+                top_k=top_k,
+                offset=offset,
+                required_skills=job_offer.required_skills,
+                min_experience_years=job_offer.min_experience_years,
+                collapse_duplicates=collapse_duplicates,
+                prefilter_size=prefilter_size
+            )
+    except DocumentStoreError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    
+    if page["total"] == 0:
         raise HTTPException(
             status_code=404,
             detail="Aucun CV valide n'a pu être extrait"
         )
         
-    # Calculer les similarités et scores
-    match_results = CVMatcher.rank_candidates(cv_embeddings, job_embedding)
-    
-    # 5. Génération des résumés et détails
-    final_results = []
+    return _build_match_response(page)
+
+@app.get("/api/match/{match_id}", response_model=MatchResponse)
+async def get_match_page(
+    match_id: str,
+    top_k: int = Query(MATCH_PAGE_SIZE, ge=1),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Résume une page supplémentaire d'un matching déjà classé.
     
-    for result in match_results:
-        filename = result['filename']
-        similarity = result['similarity']
-        score = result['score']
+    Args:
+        match_id: Identifiant retourné par /api/match/
+        top_k: Nombre de candidats résumés
+        offset: Rang du premier candidat résumé
         
-        # Analyser le CV pour le résumé
-        cv_text = cv_texts[filename]
-        summary = match_summarizer.generate_summary(
-            cv_text, 
-            job_text, 
-            similarity, 
-            score
+    Returns:
+        MatchResponse: Page du matching
+    """
+    page = await run_in_threadpool(profiled_call(match_pipeline.page), match_id, top_k=top_k, offset=offset)
+    if page is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Le matching {match_id} n'existe pas ou a expiré"
         )
         
-        # Créer le résultat final
-        final_results.append(
-            MatchResult(
-                filename=filename,
-                score=score,
-                summary=summary["text"],
-                skills=summary["matched_skills"] + summary["missing_skills"],
-                experience_years=summary["experience_years"],
-                experience_level=summary["experience_level"],
-                matched_skills=summary["matched_skills"],
-                missing_skills=summary["missing_skills"]
-            )
-        )
+    return _build_match_response(page)
+
+@app.post("/api/search/", response_model=List[SearchResult])
+async def search_candidate_pool(
+    job_offer: str = Form(...),
+    top_k: int = Form(MATCH_PAGE_SIZE, ge=1),
+    nprobe: Optional[int] = Form(None, ge=1)
+):
+    """
+    Classe tout le vivier des CVs déjà encodés pour une offre d'emploi, sans
+    relire les fichiers (index approximatif, ANN_ENABLED=true).
     
-    return MatchResponse(results=final_results)
+    Args:
+        job_offer: L'offre d'emploi (JSON)
+        top_k: Nombre de candidats retournés
+        nprobe: Listes de l'index parcourues (par défaut IVF_NPROBE)
+        
+    Returns:
+        List[SearchResult]: Candidats par score décroissant
+    """
+    if ann_index is None:
+        raise HTTPException(
+            status_code=404,
+            detail="La recherche dans le vivier n'est pas activée (ANN_ENABLED)"
+        )
+        
+    try:
+        job_offer = JobOffer.model_validate_json(job_offer)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+        
+    job_text = f"{job_offer.title}\n{job_offer.description}"
+    if job_offer.skills:
+        job_text += "\nCompétences requises: " + ", ".join(job_offer.skills)
+    if job_offer.experience_level:
+        job_text += f"\nNiveau d'expérience: {job_offer.experience_level}"
+        
+    results = await run_in_threadpool(profiled_call(match_pipeline.search), job_text, top_k, nprobe=nprobe)
+    return [SearchResult(**result) for result in results]
 
 @app.post("/api/analyze_cv/")
 async def analyze_single_cv(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
+    file_key: Optional[str] = Form(None)
 ):
     """
     Analyse un seul CV sans matching avec une offre.
     
     Args:
         file: Fichier CV à analyser
+        file_key: Clé d'un CV déjà stocké, lu sans nouvel upload
         
     Returns:
         dict: Résultat de l'analyse
     """
-    # Sauvegarder le fichier
-    file_path = os.path.join(CV_UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    if file is not None:
+        # Sauvegarder le fichier
+        filename, file_path = _upload_path(file.filename)
+        with open(file_path, "wb") as f:
+            f.write(await file.read())
+    elif file_key:
+        filename = file_key
+        try:
+            file_path = document_reader.fetch(file_key)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except DocumentStoreError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        if file_path is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Le document {file_key} n'existe pas"
+            )
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Vous devez fournir soit un fichier, soit une clé de fichier"
+        )
         
-    # Extraire le texte
-    cv_text = CVExtractor.extract_from_pdf(file_path)
-    if not cv_text:
+    # Extraction, indexation et analyse hors de la boucle d'événements
+    analysis = await run_in_threadpool(profiled_call(match_pipeline.analyze_file), filename, file_path)
+    if analysis is None:
         raise HTTPException(
             status_code=400,
             detail="Impossible d'extraire le texte du CV"
         )
-        
-    # Analyser le CV
-    analysis = entity_extractor.analyze_cv(cv_text)
     
     return {
-        "filename": file.filename,
+        "filename": filename,
         "skills": analysis["skills"],
         "experience_years": analysis["experience_years"],
         "experience_level": analysis["experience_level"],
         "education": analysis["education"]
     }
 
+@app.post("/api/analyze_cvs/")
+async def analyze_multiple_cvs(
+    files: Optional[List[UploadFile]] = File(None),
+    file_keys: Optional[List[str]] = Form(None)
+):
+    """
+    Analyse un lot de CVs sans matching avec une offre.
+    
+    Les résultats sont renvoyés en flux NDJSON, une ligne par fichier dans
+    l'ordre de la requête; un fichier illisible produit une ligne d'erreur
+    sans interrompre le lot. Deux fichiers envoyés sous le même nom sont refusés.
+    
+    Args:
+        files: Fichiers CV à analyser
+        file_keys: Clés de CVs déjà stockés, lus sans nouvel upload
+        
+    Returns:
+        StreamingResponse: Résultats par fichier (application/x-ndjson)
+    """
+    if not files and not file_keys:
+        raise HTTPException(
+            status_code=400,
+            detail="Vous devez fournir soit des fichiers, soit des clés de fichiers"
+        )
+        
+    # Sauvegarder les fichiers
+    file_paths = await _save_uploads(files or [])
+        
+    # Lecture simultanée des CVs déjà stockés
+    if file_keys:
+        try:
+            file_paths.extend(document_reader.fetch_many(file_keys))
+        except DocumentStoreError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        
+    # Générateur synchrone exécuté dans le pool de threads de Starlette:
+    # analyze_many verrouille le stockage et l'index partagés
+    def ndjson_lines():
+        for result in match_pipeline.analyze_many(file_paths):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+            
+    return StreamingResponse(profiled_iter(ndjson_lines()), media_type="application/x-ndjson")
+
+@app.get("/api/resources/plan")
+async def get_resource_plan():
+    """
+    Retourne le plan de répartition des CPUs appliqué par ce worker.
+    
+    Returns:
+        dict: CPUs détectés et taille de chaque pool
+    """
+    return resource_plan
+
 @app.post("/api/analyze_job/")
 async def analyze_job_offer(
     job_offer: JobOffer,
@@ -259,4 +576,11 @@ async def analyze_job_offer(
 
 if __name__ == "__main__":
     logger.info(f"Démarrage de l'API sur http://{API_HOST}:{API_PORT}")
-    uvicorn.run("app:app", host=API_HOST, port=API_PORT, reload=DEBUG_MODE)
\ No newline at end of file
+    # Seul point où le nombre de workers du plan est appliqué
+    uvicorn.run(
+        "app:app",
+        host=API_HOST,
+        port=API_PORT,
+        reload=DEBUG_MODE,
+        workers=1 if DEBUG_MODE else resource_plan["serving_workers"]
+    )
\ No newline at end of file
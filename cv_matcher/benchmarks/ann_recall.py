@@ -0,0 +1,172 @@
+"""
+Mesure du rappel et de la latence de l'index IVF (core/ann.py) face à la recherche exacte.
+
+Les embeddings sont lus depuis un fichier .npy (ex. embeddings réels de CVs)
+ou générés synthétiquement (vecteurs normalisés groupés autour de centres
+aléatoires). Les requêtes sont tirées de la même distribution mais absentes
+de l'index. Pour chaque configuration (vecteurs complets ou PQ) et chaque
+nprobe, le rapport donne le rappel@k, la latence moyenne et p99 par requête,
+et l'empreinte mémoire par CV.
+
+Usage:
+    python -m benchmarks.ann_recall --size 200000 --lists 512 --nprobe 1,4,16,64 --pq 0,48
+"""
+import time
+import json
+import logging
+import argparse
+import numpy as np
+from core.ann import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_embeddings(n, dim, clusters, noise=0.5, seed=0):
+    """
+    Génère des embeddings normalisés groupés autour de centres aléatoires.
+
+    Args:
+        n (int): Nombre de vecteurs
+        dim (int): Dimension
+        clusters (int): Nombre de groupes
+        noise (float): Écart-type du bruit autour des centres
+        seed (int): Graine aléatoire
+
+    Returns:
+        numpy.ndarray: Vecteurs (n, dim) en float32
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n)]
+    vectors += noise * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_search(vectors, queries, k):
+    """
+    Recherche exacte des k plus proches voisins (produit scalaire sur tout le vivier).
+
+    Args:
+        vectors (numpy.ndarray): Vecteurs indexés
+        queries (numpy.ndarray): Requêtes
+        k (int): Nombre de voisins
+
+    Returns:
+        tuple: (voisins de chaque requête, latences en secondes)
+    """
+    neighbours, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        scores = vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        latencies.append(time.perf_counter() - start)
+        neighbours.append(set(top.tolist()))
+    return neighbours, latencies
+
+
+def evaluate(index, queries, truth, k, nprobe):
+    """
+    Mesure le rappel@k et la latence de l'index pour un nprobe donné.
+
+    Args:
+        index (IVFIndex): Index peuplé
+        queries (numpy.ndarray): Requêtes
+        truth (list): Voisins exacts de chaque requête
+        k (int): Nombre de voisins
+        nprobe (int): Nombre de listes parcourues
+
+    Returns:
+        dict: Rappel moyen et latences (ms)
+    """
+    recalls, latencies = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = index.search(query, k, nprobe=nprobe)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({key for key, _ in results} & expected) / k)
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "nprobe": nprobe,
+        "recall": round(float(np.mean(recalls)), 4),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rappel@k et latence de l'index IVF")
+    parser.add_argument("--embeddings", help="Fichier .npy d'embeddings normalisés (sinon synthétiques)")
+    parser.add_argument("--size", type=int, default=200000, help="Nombre de vecteurs synthétiques")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension des vecteurs synthétiques")
+    parser.add_argument("--clusters", type=int, default=1000, help="Nombre de groupes synthétiques")
+    parser.add_argument("--noise", type=float, default=1.0, help="Bruit des vecteurs synthétiques")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+    parser.add_argument("--k", type=int, default=10, help="Nombre de voisins")
+    parser.add_argument("--lists", type=int, default=512, help="Nombre de listes inversées")
+    parser.add_argument("--nprobe", default="1,4,16,64", help="Valeurs de nprobe")
+    parser.add_argument("--pq", default="0,48", help="Sous-vecteurs PQ (0 = vecteurs complets)")
+    parser.add_argument("--output", help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+    else:
+        vectors = synthetic_embeddings(args.size + args.queries, args.dim, args.clusters, args.noise)
+    vectors, queries = vectors[:-args.queries], vectors[-args.queries:]
+
+    truth, exact_latencies = exact_search(vectors, queries, args.k)
+    exact_ms = np.array(exact_latencies) * 1000
+    report = {
+        "size": len(vectors),
+        "dim": vectors.shape[1],
+        "k": args.k,
+        "exact": {"mean_ms": round(float(exact_ms.mean()), 3),
+                  "p99_ms": round(float(np.percentile(exact_ms, 99)), 3),
+                  "bytes_per_cv": vectors.shape[1] * 4},
+        "indexes": []
+    }
+
+    for pq_subvectors in (int(m) for m in args.pq.split(",")):
+        index = IVFIndex(vectors.shape[1], n_lists=args.lists, pq_subvectors=pq_subvectors, path=None)
+
+        start = time.perf_counter()
+        index.train(vectors)
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index.add(np.arange(len(vectors)), vectors)
+        add_s = time.perf_counter() - start
+
+        runs = [evaluate(index, queries, truth, args.k, int(nprobe)) for nprobe in args.nprobe.split(",")]
+        report["indexes"].append({
+            "pq_subvectors": pq_subvectors,
+            "train_s": round(train_s, 2),
+            "add_s": round(add_s, 2),
+            "bytes_per_cv": index._data.shape[1] * index._data.itemsize + 4,
+            "runs": runs
+        })
+
+    print(f"\n{report['size']} CVs, dimension {report['dim']}, rappel@{args.k}")
+    print(f"Recherche exacte: {report['exact']['mean_ms']} ms en moyenne, p99 {report['exact']['p99_ms']} ms, "
+          f"{report['exact']['bytes_per_cv']} octets/CV\n")
+    header = f"{'index':<12} {'nprobe':>6} {'rappel':>8} {'moy. ms':>9} {'p99 ms':>9} {'accél.':>7} {'oct./CV':>8}"
+    print(header)
+    print("-" * len(header))
+    for entry in report["indexes"]:
+        name = f"PQ {entry['pq_subvectors']}" if entry["pq_subvectors"] else "IVF-Flat"
+        for run in entry["runs"]:
+            speedup = report["exact"]["mean_ms"] / run["mean_ms"] if run["mean_ms"] else float("inf")
+            print(f"{name:<12} {run['nprobe']:>6} {run['recall']:>8} {run['mean_ms']:>9} "
+                  f"{run['p99_ms']:>9} {speedup:>6.1f}x {entry['bytes_per_cv']:>8}")
+        print(f"{'':<12} entraînement {entry['train_s']} s, ajout {entry['add_s']} s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
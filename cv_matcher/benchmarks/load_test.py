@@ -0,0 +1,430 @@
+"""
+Harnais de test de charge local pour l'API de matching CV.
+
+Démarre l'application avec uvicorn, rejoue un mélange synthétique de requêtes
+(analyse de CVs de tailles variées, analyse d'offres, matching d'un répertoire)
+à des niveaux de concurrence croissants, puis rapporte les percentiles de
+latence, le taux d'erreur, le débit et le coude de saturation.
+
+Contre un service déjà démarré (--url), les analyses de CVs écrivent dans son
+stockage: elles sont exclues du mélange sauf avec --allow-writes, et les CVs
+envoyés sont supprimés du répertoire d'upload à la fin.
+
+Usage:
+    python -m benchmarks.load_test --stub-backends --levels 1,2,4,8,16 --duration 15
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import socket
+import asyncio
+import logging
+import argparse
+import shutil
+import tempfile
+import subprocess
+import httpx
+import fitz  # PyMuPDF
+import numpy as np
+from config import BASE_DIR, COMPETENCES_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Tailles des CVs synthétiques, en nombre de pages
+CV_SIZES = {"small": 1, "medium": 4, "large": 12}
+
+# Mélange par défaut des requêtes (poids relatifs)
+DEFAULT_MIX = {"analyze_cv": 5, "analyze_job": 3, "match": 2}
+
+JOB_OFFER = {
+    "title": "Développeur Full Stack",
+    "description": "Nous recherchons un développeur Python / React avec 5 ans d'expérience "
+                   "pour concevoir des API et des interfaces web.",
+    "skills": ["python", "react", "docker", "postgresql"],
+    "experience_level": "confirmé"
+}
+
+# Un coude est détecté quand doubler la concurrence apporte moins de 10% de débit
+KNEE_GAIN_THRESHOLD = 1.10
+
+
+def generate_cv_pdf(path, pages, rng):
+    """
+    Génère un CV PDF synthétique.
+
+    Args:
+        path (str): Chemin du fichier à créer
+        pages (int): Nombre de pages
+        rng (random.Random): Générateur aléatoire
+    """
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        skills = ", ".join(rng.sample(COMPETENCES_PATTERNS, 8))
+        start = rng.randint(2005, 2018)
+        lines = [
+            f"Candidat {rng.randint(1, 10 ** 6)} - page {page_number + 1}",
+            f"{rng.randint(1, 15)} ans d'expérience",
+            f"Compétences: {skills}",
+            f"{start} - {start + rng.randint(1, 5)} Développeur chez Entreprise {rng.randint(1, 100)}",
+            "",
+            "Formation: Master informatique, Université de Lyon",
+        ]
+        lines += [f"Projet {i}: {', '.join(rng.sample(COMPETENCES_PATTERNS, 5))}" for i in range(30)]
+        page.insert_text((50, 50), "\n".join(lines), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def prepare_workload(upload_dir, directory_size, seed=0):
+    """
+    Prépare les fichiers de la charge synthétique.
+
+    Args:
+        upload_dir (str): Répertoire d'upload du service
+        directory_size (int): Nombre de CVs du répertoire utilisé pour le matching
+        seed (int): Graine aléatoire
+
+    Le répertoire de matching est créé sous un nom unique dans upload_dir; ce
+    nom préfixe aussi les CVs envoyés à l'analyse. Le tout doit être supprimé
+    par l'appelant (voir cleanup_workload).
+
+    Returns:
+        dict: Contenu des CVs par taille, nom du répertoire de matching (relatif
+              à upload_dir), son chemin et le répertoire d'upload
+    """
+    rng = random.Random(seed)
+    cvs = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size, pages in CV_SIZES.items():
+            path = os.path.join(tmp, f"{size}.pdf")
+            generate_cv_pdf(path, pages, rng)
+            with open(path, "rb") as f:
+                cvs[size] = f.read()
+
+    os.makedirs(upload_dir, exist_ok=True)
+    path = tempfile.mkdtemp(prefix="loadtest_", dir=upload_dir)
+    for i in range(directory_size):
+        generate_cv_pdf(os.path.join(path, f"cv_{i:04d}.pdf"), rng.choice([1, 2, 4]), rng)
+
+    return {"cvs": cvs, "directory": os.path.basename(path), "path": path, "upload_dir": upload_dir}
+
+
+def cleanup_workload(workload):
+    """
+    Supprime le répertoire de matching créé par prepare_workload et les CVs
+    envoyés à l'analyse, préfixés par son nom.
+
+    Args:
+        workload (dict): Charge préparée par prepare_workload
+    """
+    shutil.rmtree(workload["path"], ignore_errors=True)
+    uploads = glob.glob(os.path.join(glob.escape(workload["upload_dir"]), f"{workload['directory']}_*.pdf"))
+    for path in uploads:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    logger.info(f"Répertoire de charge supprimé: {workload['path']} ({len(uploads)} CVs envoyés supprimés)")
+
+
+def free_port():
+    """
+    Retourne un port TCP libre sur la machine locale.
+
+    Returns:
+        int: Numéro de port
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, work_dir, stub_backends, workers, extra_env=None):
+    """
+    Démarre l'application avec uvicorn dans un sous-processus.
+
+    Args:
+        port (int): Port d'écoute
+        work_dir (str): Répertoire de travail (uploads et données)
+        stub_backends (bool): Remplacer Sentence-BERT et spaCy par des bouchons
+        workers (int): Nombre de workers uvicorn
+        extra_env (dict, optional): Variables d'environnement supplémentaires du serveur
+
+    Returns:
+        subprocess.Popen: Processus du serveur
+    """
+    env = dict(
+        os.environ,
+        CV_UPLOAD_DIR=os.path.join(work_dir, "uploads"),
+        CV_MATCHER_DATA_DIR=os.path.join(work_dir, "data"),
+        USE_STUB_BACKENDS="true" if stub_backends else "false",
+        **(extra_env or {})
+    )
+    command = [
+        sys.executable, "-m", "uvicorn", "app:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning"
+    ]
+    return subprocess.Popen(command, cwd=str(BASE_DIR), env=env)
+
+
+def wait_ready(base_url, process, timeout=300):
+    """
+    Attend que le service réponde.
+
+    Args:
+        base_url (str): URL du service
+        process (subprocess.Popen): Processus du serveur, ou None
+        timeout (float): Délai maximal en secondes
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {process.returncode})")
+        try:
+            if httpx.get(f"{base_url}/openapi.json", timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Le service {base_url} ne répond pas après {timeout}s")
+
+
+async def send_request(client, kind, workload, rng):
+    """
+    Envoie une requête du type demandé.
+
+    Args:
+        client (httpx.AsyncClient): Client HTTP partagé
+        kind (str): Type de requête ('analyze_cv', 'analyze_job' ou 'match')
+        workload (dict): Charge préparée par prepare_workload
+        rng (random.Random): Générateur aléatoire
+
+    Returns:
+        httpx.Response: Réponse du service
+    """
+    if kind == "analyze_cv":
+        size = rng.choice(list(CV_SIZES))
+        # Préfixe du répertoire de charge: les uploads sont retrouvés au nettoyage
+        filename = f"{workload['directory']}_{size}_{rng.randint(0, 10 ** 9)}.pdf"
+        files = {"file": (filename, workload["cvs"][size], "application/pdf")}
+        return await client.post("/api/analyze_cv/", files=files)
+
+    if kind == "analyze_job":
+        return await client.post("/api/analyze_job/", json=JOB_OFFER)
+
+    data = {"job_offer": json.dumps(JOB_OFFER), "cv_directory": workload["directory"], "top_k": "10"}
+    return await client.post("/api/match/", data=data)
+
+
+async def run_level(base_url, concurrency, duration, workload, mix, seed=0):
+    """
+    Exécute un palier de charge en boucle fermée.
+
+    Args:
+        base_url (str): URL du service
+        concurrency (int): Nombre de clients simultanés
+        duration (float): Durée du palier en secondes
+        workload (dict): Charge préparée par prepare_workload
+        mix (dict): Poids relatifs des types de requêtes
+        seed (int): Graine aléatoire
+
+    Returns:
+        list: Échantillons (type, latence en secondes, succès)
+    """
+    samples = []
+    kinds, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id, client):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await send_request(client, kind, workload, rng)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples.append((kind, time.perf_counter() - start, ok))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await asyncio.gather(*(worker(i, client) for i in range(concurrency)))
+
+    return samples
+
+
+def summarize_samples(samples, duration):
+    """
+    Calcule les statistiques d'un ensemble d'échantillons.
+
+    Args:
+        samples (list): Échantillons (type, latence, succès)
+        duration (float): Durée de la mesure en secondes
+
+    Returns:
+        dict: Nombre de requêtes, débit, taux d'erreur et percentiles de latence (ms)
+    """
+    if not samples:
+        return {"requests": 0, "throughput_rps": 0.0, "error_rate": 0.0,
+                "p50_ms": None, "p90_ms": None, "p99_ms": None}
+
+    latencies = np.array([latency for _, latency, _ in samples]) * 1000
+    errors = sum(1 for _, _, ok in samples if not ok)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / duration, 2),
+        "error_rate": round(errors / len(samples), 4),
+        "p50_ms": round(float(p50), 1),
+        "p90_ms": round(float(p90), 1),
+        "p99_ms": round(float(p99), 1)
+    }
+
+
+def find_knee(levels):
+    """
+    Détermine le coude de saturation: le dernier palier dont le suivant
+    n'apporte plus de gain de débit significatif.
+
+    Args:
+        levels (list): Statistiques globales par palier (avec la clé 'concurrency')
+
+    Returns:
+        int: Concurrence au coude, ou None si le débit progresse encore
+    """
+    for previous, current in zip(levels, levels[1:]):
+        if current["throughput_rps"] < previous["throughput_rps"] * KNEE_GAIN_THRESHOLD:
+            return previous["concurrency"]
+    return None
+
+
+def print_report(report):
+    """
+    Affiche le rapport du test de charge.
+
+    Args:
+        report (dict): Rapport produit par run_load_test
+    """
+    header = f"{'conc.':>6} {'type':<12} {'req':>6} {'req/s':>8} {'err%':>6} {'p50':>9} {'p90':>9} {'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for level in report["levels"]:
+        for kind, stats in [("total", level)] + sorted(level["by_kind"].items()):
+            if not stats["requests"]:
+                continue
+            print(
+                f"{level['concurrency']:>6} {kind:<12} {stats['requests']:>6} "
+                f"{stats['throughput_rps']:>8} {stats['error_rate'] * 100:>5.1f}% "
+                f"{stats['p50_ms']:>7}ms {stats['p90_ms']:>7}ms {stats['p99_ms']:>7}ms"
+            )
+    knee = report["knee_concurrency"]
+    print(f"\nCoude de débit: {'concurrence ' + str(knee) if knee else 'non atteint'}")
+
+
+def run_load_test(base_url, levels, duration, workload, mix):
+    """
+    Exécute tous les paliers de charge.
+
+    Args:
+        base_url (str): URL du service
+        levels (list): Niveaux de concurrence
+        duration (float): Durée de chaque palier en secondes
+        workload (dict): Charge préparée par prepare_workload
+        mix (dict): Poids relatifs des types de requêtes
+
+    Returns:
+        dict: Statistiques par palier et coude de saturation
+    """
+    results = []
+    for concurrency in levels:
+        samples = asyncio.run(run_level(base_url, concurrency, duration, workload, mix))
+        stats = summarize_samples(samples, duration)
+        stats["concurrency"] = concurrency
+        stats["by_kind"] = {
+            kind: summarize_samples([s for s in samples if s[0] == kind], duration)
+            for kind in mix
+        }
+        results.append(stats)
+        logger.info(f"Palier {concurrency}: {stats['throughput_rps']} req/s, p99 {stats['p99_ms']} ms")
+
+    return {"levels": results, "knee_concurrency": find_knee(results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge local de l'API de matching CV")
+    parser.add_argument("--url", help="URL d'un service déjà démarré (sinon un serveur local est lancé)")
+    parser.add_argument("--stub-backends", action="store_true",
+                        help="Remplacer Sentence-BERT et spaCy par des bouchons")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de workers uvicorn")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Niveaux de concurrence")
+    parser.add_argument("--duration", type=float, default=15, help="Durée de chaque palier (s)")
+    parser.add_argument("--directory-size", type=int, default=50,
+                        help="Nombre de CVs du répertoire de matching")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Poids des requêtes, ex. analyze_cv=5,analyze_job=3,match=2")
+    parser.add_argument("--keep-workload", action="store_true",
+                        help="Conserver les CVs synthétiques écrits dans le répertoire d'upload (mode --url)")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="Inclure l'analyse de CVs en mode --url (analyses conservées par le service)")
+    parser.add_argument("--output", help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    levels = [int(level) for level in args.levels.split(",")]
+    mix = {kind: float(weight) for kind, weight in (item.split("=") for item in args.mix.split(","))}
+
+    # Un service en production conserve chaque CV analysé dans son stockage et son index
+    if args.url and not args.allow_writes and mix.pop("analyze_cv", None):
+        logger.warning("Mode --url: analyze_cv retiré du mélange (--allow-writes pour l'inclure)")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        process = None
+        if args.url:
+            base_url = args.url.rstrip("/")
+            upload_dir = os.environ.get("CV_UPLOAD_DIR", os.path.join(BASE_DIR, "uploads", "cvs"))
+        else:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            upload_dir = os.path.join(work_dir, "uploads")
+
+        workload = None
+        try:
+            workload = prepare_workload(upload_dir, args.directory_size)
+            if not args.url:
+                process = start_server(port, work_dir, args.stub_backends, args.workers)
+            wait_ready(base_url, process)
+
+            report = run_load_test(base_url, levels, args.duration, workload, mix)
+            report["config"] = {
+                "stub_backends": args.stub_backends,
+                "workers": args.workers,
+                "duration_s": args.duration,
+                "mix": mix,
+                "directory_size": args.directory_size
+            }
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+            # En mode --url, les CVs sont écrits dans le répertoire d'upload du service
+            if workload is not None and not args.keep_workload:
+                cleanup_workload(workload)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
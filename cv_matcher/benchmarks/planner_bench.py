@@ -0,0 +1,124 @@
+"""
+Comparaison d'exécutions avec et sans planification des CPUs (core/planner.py).
+
+Sans planification, chaque pool se dimensionne seul sur tous les CPUs visibles:
+autant de workers uvicorn que de CPUs, un pool d'extraction de la même taille
+dans chaque worker et torch avec ses threads par défaut. Avec planification,
+le serveur applique la politique demandée. Les deux exécutions rejouent la
+même charge que benchmarks/load_test.py, chacune dans un répertoire de travail
+neuf (aucune analyse en cache d'une exécution à l'autre).
+
+Usage:
+    python -m benchmarks.planner_bench --stub-backends --policy balanced --levels 1,4,16 --duration 10
+"""
+import os
+import json
+import logging
+import argparse
+import tempfile
+from core.planner import detect_cpus, plan_resources
+from benchmarks.load_test import (
+    DEFAULT_MIX, prepare_workload, free_port, start_server, wait_ready, run_load_test
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_configuration(name, extra_env, workers, args, levels, mix):
+    """
+    Démarre un serveur avec une configuration de ressources et mesure sa charge.
+
+    Args:
+        name (str): Nom de la configuration
+        extra_env (dict): Variables d'environnement du serveur
+        workers (int): Nombre de workers uvicorn
+        args (argparse.Namespace): Options de la ligne de commande
+        levels (list): Niveaux de concurrence
+        mix (dict): Poids relatifs des types de requêtes
+
+    Returns:
+        dict: Rapport de run_load_test, avec la configuration utilisée
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        workload = prepare_workload(os.path.join(work_dir, "uploads"), args.directory_size)
+
+        process = start_server(port, work_dir, args.stub_backends, workers, extra_env)
+        try:
+            wait_ready(base_url, process)
+            logger.info(f"Configuration '{name}': {workers} worker(s), {extra_env}")
+            report = run_load_test(base_url, levels, args.duration, workload, mix)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report["config"] = {"name": name, "workers": workers, "env": extra_env}
+    return report
+
+
+def print_comparison(reports):
+    """
+    Affiche le débit et le p99 de chaque configuration, palier par palier.
+
+    Args:
+        reports (list): Rapports produits par run_configuration
+    """
+    header = f"{'conc.':>6}" + "".join(f" {r['config']['name'] + ' req/s':>22} {'p99':>9}" for r in reports)
+    print(header)
+    print("-" * len(header))
+    for levels in zip(*(r["levels"] for r in reports)):
+        line = f"{levels[0]['concurrency']:>6}"
+        for level in levels:
+            line += f" {level['throughput_rps']:>22} {str(level['p99_ms']) + 'ms':>9}"
+        print(line)
+    for report in reports:
+        knee = report["knee_concurrency"]
+        print(f"{report['config']['name']}: coude {'à ' + str(knee) if knee else 'non atteint'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison avec et sans planification des CPUs")
+    parser.add_argument("--policy", default="balanced", help="Politique planifiée (RESOURCE_POLICIES)")
+    parser.add_argument("--stub-backends", action="store_true",
+                        help="Remplacer Sentence-BERT et spaCy par des bouchons")
+    parser.add_argument("--levels", default="1,4,16", help="Niveaux de concurrence")
+    parser.add_argument("--duration", type=float, default=10, help="Durée de chaque palier (s)")
+    parser.add_argument("--directory-size", type=int, default=50,
+                        help="Nombre de CVs du répertoire de matching")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Poids des requêtes, ex. analyze_cv=5,analyze_job=3,match=2")
+    parser.add_argument("--output", help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    levels = [int(level) for level in args.levels.split(",")]
+    mix = {kind: float(weight) for kind, weight in (item.split("=") for item in args.mix.split(","))}
+
+    cpus = detect_cpus()
+    plan = plan_resources(args.policy, cpus)
+    logger.info(f"CPUs détectés: {cpus}")
+
+    # Sans planification: chaque pool prend tous les CPUs qu'il voit
+    unplanned_env = {
+        "RESOURCE_POLICY": "none",
+        "EXTRACTION_WORKERS": str(cpus["affinity"]),
+        "API_WORKERS": str(cpus["affinity"])
+    }
+    reports = [
+        run_configuration("non planifié", unplanned_env, cpus["affinity"], args, levels, mix),
+        run_configuration(args.policy, {"RESOURCE_POLICY": args.policy}, plan["serving_workers"],
+                          args, levels, mix)
+    ]
+
+    print(f"\nCPUs: {cpus}\nPlan '{args.policy}': {json.dumps({k: v for k, v in plan.items() if k != 'cpus'})}\n")
+    print_comparison(reports)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": cpus, "plan": plan, "runs": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Qualité et vitesse de l'encodeur statique (encode_fast) face à Sentence-BERT.
+
+Les CVs d'un répertoire sont extraits et nettoyés, puis encodés par le modèle
+complet (encode_chunks) et par les embeddings statiques distillés
+(encode_fast). Les offres sont lues depuis un fichier texte (une par ligne);
+à défaut, chaque CV sert de requête face aux autres. Le rapport donne:
+
+- le débit de chaque encodeur (CVs/s) et la durée de distillation de la table;
+- la corrélation de Spearman entre les similarités des deux encodeurs;
+- le rappel@k: part du top k du modèle complet retrouvée dans le top k statique;
+- le rappel de la shortlist: part du top k du modèle complet retrouvée dans
+  les N premiers CVs statiques, c'est-à-dire avec PREFILTER_SIZE=N.
+
+Usage:
+    python -m benchmarks.static_encoder --cvs uploads/cvs --jobs offres.txt --k 10 --shortlist 50,100,200
+"""
+import os
+import time
+import json
+import logging
+import argparse
+import numpy as np
+from core.extractor import CVExtractor
+from core.processor import TextProcessor
+from core.encoder import TextEncoder
+from config import STATIC_EMBEDDINGS_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def encode_all(encode, texts):
+    """
+    Encode une liste de textes et mesure le débit.
+
+    Args:
+        encode (callable): Fonction d'encodage d'un texte
+        texts (list): Textes à encoder
+
+    Returns:
+        tuple: (embeddings (n, dimension), CVs encodés par seconde)
+    """
+    start = time.perf_counter()
+    embeddings = np.array([encode(text) for text in texts], dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    return embeddings, len(texts) / elapsed if elapsed else float("inf")
+
+
+def spearman(a, b):
+    """
+    Corrélation de Spearman entre deux séries (sans ex aequo).
+
+    Args:
+        a (numpy.ndarray): Première série
+        b (numpy.ndarray): Seconde série
+
+    Returns:
+        float: Corrélation des rangs
+    """
+    rank_a = np.argsort(np.argsort(a)).astype(np.float64)
+    rank_b = np.argsort(np.argsort(b)).astype(np.float64)
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def compare(full_scores, fast_scores, k, shortlists):
+    """
+    Compare les classements des deux encodeurs pour une requête.
+
+    Args:
+        full_scores (numpy.ndarray): Similarités du modèle complet
+        fast_scores (numpy.ndarray): Similarités statiques
+        k (int): Taille du top
+        shortlists (list): Tailles de shortlist évaluées
+
+    Returns:
+        dict: Corrélation, rappel@k et rappel de chaque shortlist
+    """
+    expected = set(np.argsort(-full_scores, kind="stable")[:k].tolist())
+    fast_order = np.argsort(-fast_scores, kind="stable")
+    return {
+        "spearman": spearman(full_scores, fast_scores),
+        "recall": len(expected & set(fast_order[:k].tolist())) / len(expected),
+        "shortlist": {n: len(expected & set(fast_order[:n].tolist())) / len(expected) for n in shortlists}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qualité et vitesse de l'encodeur statique")
+    parser.add_argument("--cvs", required=True, help="Répertoire des CVs")
+    parser.add_argument("--jobs", help="Fichier d'offres, une par ligne (sinon les CVs servent de requêtes)")
+    parser.add_argument("--queries", type=int, default=100, help="Nombre maximal de requêtes")
+    parser.add_argument("--k", type=int, default=10, help="Taille du top comparé")
+    parser.add_argument("--shortlist", default="50,100,200", help="Tailles de shortlist (PREFILTER_SIZE)")
+    parser.add_argument("--output", help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    text_processor = TextProcessor()
+    names, texts = [], []
+    for filename, _, cv_text in CVExtractor.iter_from_directory(args.cvs):
+        names.append(filename)
+        texts.append(text_processor.clean_cv_text(cv_text))
+    if len(texts) <= args.k:
+        parser.error(f"Il faut plus de {args.k} CVs lisibles dans {args.cvs}")
+
+    encoder = TextEncoder(mode="full", preload_static=False)
+    distilled = not os.path.exists(STATIC_EMBEDDINGS_PATH)
+    start = time.perf_counter()
+    encoder.encode_fast("")
+    load_s = time.perf_counter() - start
+
+    full, full_rate = encode_all(encoder.encode_chunks, texts)
+    fast, fast_rate = encode_all(encoder.encode_fast, texts)
+
+    shortlists = [int(n) for n in args.shortlist.split(",")]
+    runs = []
+    if args.jobs:
+        with open(args.jobs, encoding="utf-8") as f:
+            jobs = [text_processor.clean_job_text(line) for line in f if line.strip()][:args.queries]
+        for job in jobs:
+            runs.append(compare(full @ encoder.encode_chunks(job), fast @ encoder.encode_fast(job), args.k, shortlists))
+    else:
+        for i in range(min(args.queries, len(texts))):
+            others = np.arange(len(texts)) != i
+            runs.append(compare((full @ full[i])[others], (fast @ fast[i])[others], args.k, shortlists))
+
+    report = {
+        "cvs": len(texts),
+        "queries": len(runs),
+        "k": args.k,
+        "static_table": {"distilled": distilled, "seconds": round(load_s, 2),
+                         "bytes": os.path.getsize(STATIC_EMBEDDINGS_PATH)},
+        "full_cvs_per_s": round(full_rate, 1),
+        "fast_cvs_per_s": round(fast_rate, 1),
+        "spearman": round(float(np.mean([run["spearman"] for run in runs])), 4),
+        "recall": round(float(np.mean([run["recall"] for run in runs])), 4),
+        "shortlist_recall": {n: round(float(np.mean([run["shortlist"][n] for run in runs])), 4) for n in shortlists}
+    }
+
+    print(f"\n{report['cvs']} CVs, {report['queries']} requêtes, top {args.k}")
+    table = report["static_table"]
+    print(f"Table statique: {'distillée' if table['distilled'] else 'chargée'} en {table['seconds']} s, "
+          f"{table['bytes'] / 1e6:.1f} Mo")
+    print(f"Débit: Sentence-BERT {report['full_cvs_per_s']} CVs/s, statique {report['fast_cvs_per_s']} CVs/s "
+          f"({report['fast_cvs_per_s'] / report['full_cvs_per_s']:.0f}x)")
+    print(f"Spearman des similarités: {report['spearman']}")
+    print(f"Rappel@{args.k} du top statique: {report['recall']}")
+    for n, recall in report["shortlist_recall"].items():
+        print(f"Rappel@{args.k} avec PREFILTER_SIZE={n}: {recall}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
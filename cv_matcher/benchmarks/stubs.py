@@ -0,0 +1,82 @@
+"""
+Bouchons des modèles pour mesurer la couche de service sans le coût des modèles.
+"""
+import zlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StubTextEncoder:
+    """
+    Remplaçant de TextEncoder: sac de mots haché, sans passe Sentence-BERT.
+
+    Les embeddings restent normalisés et déterministes, ce qui garde un
+    classement cohérent pour les tests de charge.
+    """
+
+    def __init__(self, model_name=None, dimension=384):
+        """
+        Initialise l'encodeur bouchon.
+
+        Args:
+            model_name (str, optional): Ignoré, pour compatibilité avec TextEncoder
+            dimension (int): Dimension des embeddings produits
+        """
+        logger.info("Encodeur bouchon activé (pas de modèle Sentence-BERT)")
+        self.dimension = dimension
+
+    def encode_text(self, text):
+        """
+        Encode un texte en un vecteur haché normalisé.
+
+        Args:
+            text (str): Texte à encoder
+
+        Returns:
+            numpy.ndarray: Vecteur d'embeddings
+        """
+        embedding = np.zeros(self.dimension, dtype=np.float32)
+        for word in text.split():
+            embedding[zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding /= norm
+        return embedding
+
+    def encode_chunks(self, text, chunk_size=512, overlap=100):
+        """
+        Même signature que TextEncoder.encode_chunks; le texte est encodé d'un bloc.
+
+        Args:
+            text (str): Texte à encoder
+            chunk_size (int): Ignoré
+            overlap (int): Ignoré
+
+        Returns:
+            numpy.ndarray: Vecteur d'embeddings
+        """
+        return self.encode_text(text)
+
+    def encode_fast(self, text):
+        """
+        Même signature que TextEncoder.encode_fast (embedding de préfiltrage).
+
+        Args:
+            text (str): Texte à encoder
+
+        Returns:
+            numpy.ndarray: Vecteur d'embeddings
+        """
+        return self.encode_text(text)
+
+    def has_static_embeddings(self):
+        """
+        Même signature que TextEncoder.has_static_embeddings.
+
+        Returns:
+            bool: Toujours True (encode_fast ne demande pas de table)
+        """
+        return True
@@ -8,25 +8,104 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 CV_UPLOAD_DIR = os.environ.get("CV_UPLOAD_DIR", "uploads/cvs/")
 MODELS_DIR = os.path.join(BASE_DIR, "models")
+DATA_DIR = os.environ.get("CV_MATCHER_DATA_DIR", os.path.join(BASE_DIR, "data"))
+CANDIDATE_STORE_PATH = os.path.join(DATA_DIR, "candidate_store.npz")
+DEDUP_INDEX_PATH = os.path.join(DATA_DIR, "dedup_index.npz")
+ANN_INDEX_PATH = os.path.join(DATA_DIR, "ann_index.npz")
+PERSIST_INTERVAL = int(os.environ.get("PERSIST_INTERVAL", "60"))  # Secondes minimales entre deux sauvegardes du stockage et des index (0 = à chaque requête)
 
 # Configuration des modèles
 SENTENCE_TRANSFORMER_MODEL = "all-MiniLM-L6-v2"  # Modèle léger de Sentence-BERT
 SPACY_MODEL = "fr_core_news_sm"  # Modèle français de SpaCy (large)
 
+# Encodeur statique: embeddings de tokens distillés de SENTENCE_TRANSFORMER_MODEL,
+# moyennés sans passe transformer. ENCODER_MODE=fast l'utilise pour tous les
+# embeddings; en mode full, il ne sert qu'au préfiltrage (PREFILTER_SIZE).
+# La table est distillée au démarrage si besoin, ou à l'avance: python -m core.encoder
+ENCODER_MODE = os.environ.get("ENCODER_MODE", "full")  # full (Sentence-BERT) ou fast (embeddings statiques)
+STATIC_EMBEDDINGS_PATH = os.path.join(MODELS_DIR, f"static_{SENTENCE_TRANSFORMER_MODEL}.npz")
+PREFILTER_SIZE = int(os.environ.get("PREFILTER_SIZE", "0"))  # CVs réencodés par le modèle complet (0 = pas de préfiltrage)
+STATIC_WORD_CACHE_SIZE = 100000  # Découpages WordPiece de mots gardés en cache (LRU)
+
+# Les embeddings statiques et ceux de Sentence-BERT ne sont pas comparables:
+# les index qui conservent des embeddings sont séparés par mode d'encodage
+if ENCODER_MODE == "fast":
+    DEDUP_INDEX_PATH = os.path.join(DATA_DIR, "dedup_index_fast.npz")
+    ANN_INDEX_PATH = os.path.join(DATA_DIR, "ann_index_fast.npz")
+
 # Seuils et paramètres
 SIMILARITY_THRESHOLD = 0.5  # Seuil minimum de similarité
 MAX_CV_SIZE_MB = 10  # Taille maximale des fichiers CV en MB
 MIN_SCORE = 0  # Score minimum
 MAX_SCORE = 100  # Score maximum
+MATCH_PAGE_SIZE = 10  # Nombre de candidats résumés par page de matching
+MATCH_SESSION_CACHE_SIZE = 100  # Nombre de classements conservés pour la pagination
+MATCH_MAX_SHARDS = 32  # Nombre maximal de partitions d'un matching réparti entre workers
+
+# Détection des quasi-doublons (MinHash + LSH)
+DEDUP_THRESHOLD = 0.9  # Similarité de Jaccard minimale entre deux CVs quasi-identiques
+MINHASH_PERMUTATIONS = 128  # Longueur des signatures MinHash
+MINHASH_BANDS = 16  # Nombre de bandes LSH
+SHINGLE_SIZE = 5  # Nombre de mots par shingle
+
+# Recherche approximative des plus proches voisins (index IVF)
+ANN_ENABLED = os.environ.get("ANN_ENABLED", "False").lower() == "true"  # Recherche dans le vivier (/api/search/)
+ANN_MIN_TRAINING_SIZE = int(os.environ.get("ANN_MIN_TRAINING_SIZE", "10000"))  # Embeddings connus requis pour entraîner l'index au démarrage
+IVF_LISTS = 1024  # Nombre de listes inversées (de l'ordre de la racine carrée du nombre de CVs)
+IVF_NPROBE = 16  # Listes parcourues par requête (compromis rappel / latence)
+PQ_SUBVECTORS = 0  # Sous-vecteurs de la quantification des résidus (0 = vecteurs complets, ex. 48 pour 384 dimensions)
 
 # Configuration de l'API
 API_HOST = "0.0.0.0"
 API_PORT = 8000
+API_WORKERS = int(os.environ.get("API_WORKERS", "1"))  # Workers uvicorn hors planification (RESOURCE_POLICY=none)
 DEBUG_MODE = os.environ.get("DEBUG", "False").lower() == "true"
 
+# Bouchons des modèles (Sentence-BERT, spaCy) pour tester la couche de service seule
+USE_STUB_BACKENDS = os.environ.get("USE_STUB_BACKENDS", "False").lower() == "true"
+STUB_SPACY_MODEL = "blank:fr"
+
+# Profilage à la demande (réservé aux administrateurs)
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_ADMIN_TOKEN = os.environ.get("PROFILING_ADMIN_TOKEN", "")
+PROFILING_DIR = os.environ.get("PROFILING_DIR", os.path.join(DATA_DIR, "profiles"))
+
 # Liste des extensions de fichiers acceptées
 ALLOWED_EXTENSIONS = ['.pdf', '.docx', '.doc']
 
+# Extraction de texte
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", "1"))  # Processus d'extraction (1 = séquentiel)
+EXTRACTION_CACHE_SIZE = 256  # Nombre de textes extraits gardés en cache
+
+# Lecture des CVs stockés, désignés par une clé (file_key / file_keys)
+DOCUMENT_STORE = os.environ.get("DOCUMENT_STORE", "local")  # "local" (système de fichiers) ou "http" (stockage objet)
+DOCUMENT_STORE_ROOT = os.environ.get("DOCUMENT_STORE_ROOT", CV_UPLOAD_DIR)  # Racine des clés en mode local
+DOCUMENT_STORE_URL = os.environ.get("DOCUMENT_STORE_URL", "")  # URL de base des clés en mode http
+DOCUMENT_FETCH_WORKERS = int(os.environ.get("DOCUMENT_FETCH_WORKERS", "8"))  # Lectures simultanées
+DOCUMENT_CACHE_DIR = os.path.join(DATA_DIR, "documents")  # Copies locales, indexées par (clé, ETag)
+DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get("DOCUMENT_CACHE_MAX_BYTES", str(1024 ** 3)))  # Au-delà, les copies les moins récentes sont supprimées
+
+# Analyse des CVs par lots
+NER_BATCH_SIZE = 32  # Nombre de textes par lot nlp.pipe
+NER_PROCESSES = int(os.environ.get("NER_PROCESSES", "1"))  # Processus SpaCy (1 = séquentiel)
+ANALYSIS_BATCH_SIZE = 64  # Nombre de CVs extraits avant chaque passe d'analyse groupée
+
+# Planification des CPUs entre les pools (core/planner.py), désactivée par défaut.
+# Les tailles des pools (threads, processus spaCy et d'extraction) s'appliquent
+# dans chaque worker; le nombre de workers uvicorn (serving_workers) ne
+# s'applique qu'au lancement par `python app.py`: avec `uvicorn app:app`,
+# passer --workers à la main (valeur donnée par GET /api/resources/plan).
+RESOURCE_POLICY = os.environ.get("RESOURCE_POLICY", "none")  # Politique de RESOURCE_POLICIES, ou "none"
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "0"))  # Processus du matching partitionné (0 = selon la politique, aucun avec "none")
+RESOURCE_POLICIES = {
+    # cpus_per_worker: CPUs par worker uvicorn (None = un seul worker pour tous les CPUs)
+    # extraction_share: part des CPUs d'un worker réservée au pool d'extraction
+    # ner_share: part des CPUs de calcul donnée aux processus spaCy (l'encodeur les utilise tous)
+    "latency": {"cpus_per_worker": None, "extraction_share": 0.25, "ner_share": 0.5},
+    "balanced": {"cpus_per_worker": 4, "extraction_share": 0.25, "ner_share": 0.5},
+    "throughput": {"cpus_per_worker": 1, "extraction_share": 0.0, "ner_share": 0.0},
+}
+
 # Configuration de l'extraction d'entités
 COMPETENCES_PATTERNS = [
     "python", "java", "javascript", "typescript", "c++", "react", "angular",
@@ -36,4 +115,7 @@ COMPETENCES_PATTERNS = [
     "machine learning", "intelligence artificielle", "nlp", "react.js", "node.js",
     "vue.js", "web", "backend", "frontend", "full stack", "devops", "sécurité",
     "mobile", "android", "ios", "swift", "kotlin", "flutter", "react native"
-]
\ No newline at end of file
+]
+
+# Taille maximale de la taxonomie des compétences (core/store.py)
+SKILL_TAXONOMY_MAX_SIZE = 4096  # Au-delà, les nouvelles compétences des CVs sont ignorées
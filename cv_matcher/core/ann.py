@@ -0,0 +1,448 @@
+"""
+Module de recherche approximative des plus proches voisins (index IVF, NumPy uniquement).
+"""
+import os
+import logging
+import threading
+import numpy as np
+from config import IVF_LISTS, IVF_NPROBE, PQ_SUBVECTORS, ANN_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+# Nombre de centroïdes par sous-espace du produit de quantification (codes sur un octet)
+PQ_CENTROIDS = 256
+
+# Nombre de lignes traitées à la fois lors des affectations aux centroïdes
+ASSIGN_CHUNK = 8192
+
+
+def _assign(vectors, centroids, spherical):
+    """
+    Affecte chaque vecteur à son centroïde le plus proche.
+
+    Args:
+        vectors (numpy.ndarray): Vecteurs (n, d)
+        centroids (numpy.ndarray): Centroïdes (k, d)
+        spherical (bool): Similarité cosinus (vecteurs normalisés) plutôt que distance euclidienne
+
+    Returns:
+        numpy.ndarray: Index du centroïde de chaque vecteur
+    """
+    squared_norms = None if spherical else np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        products = vectors[start:start + ASSIGN_CHUNK] @ centroids.T
+        if spherical:
+            labels[start:start + ASSIGN_CHUNK] = products.argmax(axis=1)
+        else:
+            # ||x - c||² = ||x||² - 2 x.c + ||c||², ||x||² ne change pas l'argmin
+            products *= -2
+            products += squared_norms
+            labels[start:start + ASSIGN_CHUNK] = products.argmin(axis=1)
+    return labels
+
+
+def kmeans(vectors, k, n_iter=20, spherical=False, seed=0):
+    """
+    Partitionne des vecteurs en k groupes (algorithme de Lloyd).
+
+    Args:
+        vectors (numpy.ndarray): Vecteurs d'entraînement (n, d)
+        k (int): Nombre de centroïdes
+        n_iter (int): Nombre d'itérations
+        spherical (bool): Centroïdes normalisés et affectation par similarité cosinus
+        seed (int): Graine aléatoire
+
+    Returns:
+        numpy.ndarray: Centroïdes (k, d) en float32
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = _assign(vectors, centroids, spherical)
+        counts = np.bincount(labels, minlength=k)
+
+        # Sommes par groupe: vecteurs triés par groupe puis réduits par tranches
+        order = np.argsort(labels, kind="stable")
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts[present])[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[present] = np.add.reduceat(vectors[order], starts, axis=0)
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Un centroïde vide est replacé sur un vecteur tiré au hasard
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        if spherical:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.maximum(norms, 1e-12)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Index IVF (inverted file) des embeddings de CV normalisés.
+
+    Un k-means grossier partitionne l'espace en listes inversées; une requête
+    ne parcourt que les `nprobe` listes dont les centroïdes sont les plus
+    proches. Avec `pq_subvectors` > 0, les résidus (vecteur - centroïde) sont
+    compressés par produit de quantification (un octet par sous-vecteur) et les
+    similarités sont estimées par tables de correspondance.
+    """
+
+    def __init__(self, dim, n_lists=IVF_LISTS, nprobe=IVF_NPROBE, pq_subvectors=PQ_SUBVECTORS,
+                 path=ANN_INDEX_PATH, seed=0):
+        """
+        Initialise un index vide (à entraîner avant l'ajout de vecteurs).
+
+        Args:
+            dim (int): Dimension des embeddings
+            n_lists (int): Nombre de listes inversées (centroïdes grossiers)
+            nprobe (int): Nombre de listes parcourues par défaut par requête
+            pq_subvectors (int): Nombre de sous-vecteurs du produit de quantification
+                                 (0 = vecteurs complets en float32)
+            path (str): Chemin du fichier de persistance (.npz)
+            seed (int): Graine des k-means
+        """
+        if pq_subvectors and dim % pq_subvectors:
+            raise ValueError("dim doit être un multiple de pq_subvectors")
+
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.pq_subvectors = pq_subvectors
+        self.path = path
+        self.seed = seed
+        self.dirty = False
+
+        self.centroids = None
+        self.codebooks = None
+
+        # Lignes: index <-> clé du CV (None pour une ligne libérée, réutilisée au prochain ajout)
+        self.keys = []
+        self.key_index = {}
+        self._free_rows = []
+
+        # Données des lignes: vecteurs complets ou codes PQ des résidus
+        width = pq_subvectors or dim
+        self._data = np.zeros((64, width), dtype=np.uint8 if pq_subvectors else np.float32)
+        self._list_of = np.zeros(64, dtype=np.int32)
+
+        # Listes inversées: lignes de chaque liste (tableaux à capacité croissante)
+        self._lists = []
+        self._list_sizes = None
+
+    def __len__(self):
+        return len(self.key_index)
+
+    def __contains__(self, key):
+        return key in self.key_index
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, n_iter=20, max_training_points=256):
+        """
+        Entraîne les centroïdes grossiers et, si besoin, les dictionnaires PQ.
+
+        Args:
+            vectors (numpy.ndarray): Échantillon représentatif des embeddings (n, dim)
+            n_iter (int): Nombre d'itérations des k-means
+            max_training_points (int): Nombre maximal de points d'entraînement par centroïde
+
+        Raises:
+            ValueError: Si l'index contient déjà des vecteurs (leurs listes et
+                        codes dépendent des centroïdes actuels)
+        """
+        if len(self):
+            raise ValueError("L'index contient déjà des vecteurs: créer un nouvel index pour le réentraîner")
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        limit = max_training_points * max(self.n_lists, PQ_CENTROIDS if self.pq_subvectors else 0)
+        if len(vectors) > limit:
+            vectors = vectors[rng.choice(len(vectors), limit, replace=False)]
+
+        self.centroids = kmeans(vectors, self.n_lists, n_iter, spherical=True, seed=self.seed)
+        self.n_lists = len(self.centroids)
+        self._lists = [np.zeros(16, dtype=np.int64) for _ in range(self.n_lists)]
+        self._list_sizes = np.zeros(self.n_lists, dtype=np.int64)
+
+        if self.pq_subvectors:
+            residuals = vectors - self.centroids[_assign(vectors, self.centroids, True)]
+            sub_dim = self.dim // self.pq_subvectors
+            self.codebooks = np.stack([
+                kmeans(residuals[:, m * sub_dim:(m + 1) * sub_dim], PQ_CENTROIDS, n_iter, seed=self.seed + m)
+                for m in range(self.pq_subvectors)
+            ])
+
+        self.dirty = True
+        logger.info(
+            f"Index IVF entraîné: {self.n_lists} listes, "
+            f"{'PQ ' + str(self.pq_subvectors) + ' sous-vecteurs' if self.pq_subvectors else 'vecteurs complets'}"
+        )
+
+    def _encode(self, vectors, labels):
+        """
+        Encode des vecteurs pour le stockage (codes PQ des résidus ou vecteurs complets).
+
+        Args:
+            vectors (numpy.ndarray): Vecteurs (n, dim)
+            labels (numpy.ndarray): Liste inversée de chaque vecteur
+
+        Returns:
+            numpy.ndarray: Données stockées des vecteurs
+        """
+        if not self.pq_subvectors:
+            return vectors
+
+        residuals = vectors - self.centroids[labels]
+        sub_dim = self.dim // self.pq_subvectors
+        codes = np.empty((len(vectors), self.pq_subvectors), dtype=np.uint8)
+        for m in range(self.pq_subvectors):
+            sub_residuals = np.ascontiguousarray(residuals[:, m * sub_dim:(m + 1) * sub_dim])
+            codes[:, m] = _assign(sub_residuals, self.codebooks[m], False)
+        return codes
+
+    def _ensure_capacity(self, rows):
+        """
+        Agrandit le stockage des lignes pour contenir au moins `rows` lignes.
+
+        Args:
+            rows (int): Nombre de lignes requis
+        """
+        capacity = len(self._data)
+        if rows <= capacity:
+            return
+
+        new_capacity = max(rows, capacity * 2)
+        data = np.zeros((new_capacity, self._data.shape[1]), dtype=self._data.dtype)
+        data[:capacity] = self._data
+        list_of = np.zeros(new_capacity, dtype=np.int32)
+        list_of[:capacity] = self._list_of
+        self._data, self._list_of = data, list_of
+
+    def _append_to_list(self, list_id, rows):
+        """
+        Ajoute des lignes à une liste inversée, en doublant sa capacité si besoin.
+
+        Args:
+            list_id (int): Liste inversée
+            rows (numpy.ndarray): Lignes à ajouter
+        """
+        size = self._list_sizes[list_id]
+        needed = size + len(rows)
+        if needed > len(self._lists[list_id]):
+            grown = np.zeros(max(needed, 2 * len(self._lists[list_id])), dtype=np.int64)
+            grown[:size] = self._lists[list_id][:size]
+            self._lists[list_id] = grown
+        self._lists[list_id][size:needed] = rows
+        self._list_sizes[list_id] = needed
+
+    def _allocate_rows(self, count):
+        """
+        Réserve des lignes, en réutilisant d'abord celles des CVs retirés.
+
+        Args:
+            count (int): Nombre de lignes
+
+        Returns:
+            numpy.ndarray: Lignes réservées
+        """
+        reused = self._free_rows[len(self._free_rows) - min(count, len(self._free_rows)):]
+        del self._free_rows[len(self._free_rows) - len(reused):]
+
+        first_row = len(self.keys)
+        fresh = count - len(reused)
+        self._ensure_capacity(first_row + fresh)
+        self.keys.extend([None] * fresh)
+        return np.array(reused + list(range(first_row, first_row + fresh)), dtype=np.int64)
+
+    @staticmethod
+    def _group_by_list(labels):
+        """
+        Regroupe des positions par liste inversée.
+
+        Args:
+            labels (numpy.ndarray): Liste inversée de chaque position
+
+        Yields:
+            tuple: (liste inversée, positions de cette liste)
+        """
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                yield int(labels[group[0]]), group
+
+    def add(self, keys, vectors):
+        """
+        Ajoute (ou remplace) des CVs dans l'index. Une clé répétée dans le lot
+        garde son dernier vecteur.
+
+        Args:
+            keys (list): Identifiants des CVs
+            vectors (numpy.ndarray): Embeddings normalisés (n, dim)
+        """
+        if not self.is_trained:
+            raise ValueError("L'index doit être entraîné avant l'ajout de vecteurs")
+
+        keys = list(keys)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        last = {key: i for i, key in enumerate(keys)}
+        if len(last) < len(keys):
+            positions = sorted(last.values())
+            keys = [keys[i] for i in positions]
+            vectors = vectors[positions]
+
+        for key in keys:
+            self.remove(key)
+
+        # Un CV ré-indexé reprend sa ligne: le stockage reste à la taille du vivier
+        labels = _assign(vectors, self.centroids, True)
+        rows = self._allocate_rows(len(keys))
+
+        self._data[rows] = self._encode(vectors, labels)
+        self._list_of[rows] = labels
+        for key, row in zip(keys, rows):
+            self.keys[row] = key
+            self.key_index[key] = int(row)
+
+        for list_id, members in self._group_by_list(labels):
+            self._append_to_list(list_id, rows[members])
+
+        self.dirty = True
+
+    def remove(self, key):
+        """
+        Retire un CV de l'index (sa ligne est réutilisée par le prochain ajout).
+
+        Args:
+            key (str): Identifiant du CV
+
+        Returns:
+            bool: True si le CV était indexé
+        """
+        row = self.key_index.pop(key, None)
+        if row is None:
+            return False
+
+        list_id = self._list_of[row]
+        size = self._list_sizes[list_id]
+        members = self._lists[list_id]
+        position = np.flatnonzero(members[:size] == row)[0]
+        members[position] = members[size - 1]
+        self._list_sizes[list_id] = size - 1
+        self.keys[row] = None
+        self._free_rows.append(row)
+        self.dirty = True
+        return True
+
+    def search(self, query, k, nprobe=None):
+        """
+        Cherche les k CVs les plus similaires à une requête.
+
+        Args:
+            query (numpy.ndarray): Embedding normalisé de la requête
+            k (int): Nombre de résultats
+            nprobe (int, optional): Nombre de listes parcourues (par défaut celui de l'index)
+
+        Returns:
+            list: Tuples (clé du CV, similarité cosinus), par similarité décroissante
+        """
+        if not self.is_trained or not len(self):
+            return []
+
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+
+        coarse = self.centroids @ query
+        probed = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+        # Lignes triées: égalités départagées par ligne, comme après un rechargement
+        rows = np.sort(np.concatenate([self._lists[c][:self._list_sizes[c]] for c in probed]))
+        if not len(rows):
+            return []
+
+        if self.pq_subvectors:
+            # q.x = q.c + q.r, avec q.r estimé par table de correspondance par sous-espace
+            sub_queries = query.reshape(self.pq_subvectors, -1)
+            lookup = np.einsum("md,mjd->mj", sub_queries, self.codebooks)
+            codes = self._data[rows]
+            scores = coarse[self._list_of[rows]] + lookup[np.arange(self.pq_subvectors), codes].sum(axis=1)
+        else:
+            scores = self._data[rows] @ query
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.keys[rows[i]], float(scores[i])) for i in top]
+
+    def save(self, path=None):
+        """
+        Sauvegarde l'index sur disque (les lignes libres ne sont pas écrites).
+
+        Args:
+            path (str, optional): Chemin du fichier (.npz), par défaut celui de l'index
+        """
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Écriture dans un fichier temporaire puis remplacement atomique
+        rows = np.array(sorted(self.key_index.values()), dtype=np.int64)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                params=np.array([self.dim, self.n_lists, self.nprobe, self.pq_subvectors, self.seed]),
+                centroids=self.centroids if self.is_trained else np.zeros((0, self.dim), dtype=np.float32),
+                codebooks=self.codebooks if self.codebooks is not None else np.zeros(0, dtype=np.float32),
+                keys=np.array([self.keys[row] for row in rows], dtype=str),
+                data=self._data[rows],
+                lists=self._list_of[rows]
+            )
+        os.replace(tmp_path, path)
+        self.dirty = False
+        logger.info(f"Index IVF sauvegardé: {len(rows)} CVs dans {path}")
+
+    @classmethod
+    def load(cls, path=ANN_INDEX_PATH, dim=None, **kwargs):
+        """
+        Charge un index depuis le disque, ou en crée un vide si le fichier n'existe pas.
+
+        Args:
+            path (str): Chemin du fichier (.npz)
+            dim (int, optional): Dimension des embeddings d'un index vide
+            **kwargs: Paramètres d'un index vide (n_lists, nprobe, pq_subvectors)
+
+        Returns:
+            IVFIndex: Index chargé
+        """
+        if not os.path.exists(path):
+            return cls(dim, path=path, **kwargs)
+
+        with np.load(path, allow_pickle=False) as data:
+            dim, n_lists, nprobe, pq_subvectors, seed = (int(v) for v in data["params"])
+            index = cls(dim, n_lists=n_lists, nprobe=nprobe, pq_subvectors=pq_subvectors, path=path, seed=seed)
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                index.n_lists = len(index.centroids)
+                index.codebooks = data["codebooks"] if pq_subvectors else None
+
+                index.keys = data["keys"].tolist()
+                index.key_index = {key: row for row, key in enumerate(index.keys)}
+                index._data = data["data"]
+                index._list_of = data["lists"]
+                index._lists = [np.zeros(16, dtype=np.int64) for _ in range(index.n_lists)]
+                index._list_sizes = np.zeros(index.n_lists, dtype=np.int64)
+                for list_id, members in cls._group_by_list(index._list_of):
+                    index._append_to_list(list_id, members)
+        index.dirty = False
+
+        logger.info(f"Index IVF chargé: {len(index)} CVs depuis {path}")
+        return index
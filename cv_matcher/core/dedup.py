@@ -0,0 +1,286 @@
+"""
+Module de détection des CVs quasi-dupliqués (signatures MinHash et index LSH).
+"""
+import os
+import zlib
+import logging
+import threading
+from collections import defaultdict
+import numpy as np
+from config import (
+    DEDUP_THRESHOLD, MINHASH_PERMUTATIONS, MINHASH_BANDS, SHINGLE_SIZE, DEDUP_INDEX_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+# Nombre premier de Mersenne pour le hachage universel (a * x + b) mod p
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHasher:
+    """Calcule des signatures MinHash sur les shingles de mots d'un texte."""
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, shingle_size=SHINGLE_SIZE, seed=1):
+        """
+        Initialise les permutations aléatoires.
+
+        Args:
+            num_perm (int): Nombre de permutations (longueur de la signature)
+            shingle_size (int): Nombre de mots par shingle
+            seed (int): Graine des permutations
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        # a, b < 2^32 et x < 2^32: a * x + b tient sur 64 bits
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """
+        Découpe un texte en shingles de mots hachés.
+
+        Args:
+            text (str): Texte nettoyé (sortie de TextProcessor.clean_cv_text)
+
+        Returns:
+            numpy.ndarray: Hachages 32 bits uniques des shingles
+        """
+        words = text.split()
+        if len(words) < self.shingle_size:
+            grams = [" ".join(words)] if words else []
+        else:
+            grams = [
+                " ".join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            ]
+        return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64))
+
+    def signature(self, text):
+        """
+        Calcule la signature MinHash d'un texte.
+
+        Args:
+            text (str): Texte nettoyé
+
+        Returns:
+            numpy.ndarray: Signature (uint32) de longueur num_perm
+        """
+        hashes = self.shingles(text)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME
+        return (permuted & MAX_HASH).min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """
+        Estime la similarité de Jaccard entre deux signatures.
+
+        Args:
+            signature_a (numpy.ndarray): Première signature
+            signature_b (numpy.ndarray): Seconde signature
+
+        Returns:
+            float: Similarité estimée entre 0 et 1
+        """
+        return float(np.mean(signature_a == signature_b))
+
+
+class DuplicateIndex:
+    """
+    Index LSH des signatures MinHash des CVs connus.
+
+    Chaque CV indexé conserve son embedding, réutilisable par ses quasi-doublons,
+    son CV canonique (le premier exemplaire du groupe de doublons) et l'empreinte
+    du texte indexé, qui permet de réutiliser l'entrée d'un CV inchangé.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=MINHASH_PERMUTATIONS,
+                 bands=MINHASH_BANDS, path=DEDUP_INDEX_PATH):
+        """
+        Initialise un index vide.
+
+        Args:
+            threshold (float): Similarité de Jaccard minimale pour un quasi-doublon
+            num_perm (int): Longueur des signatures
+            bands (int): Nombre de bandes LSH (num_perm doit en être multiple)
+            path (str): Chemin du fichier de persistance (.npz)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.path = path
+        self.dirty = False
+
+        self.signatures = {}
+        self.embeddings = {}
+        self.canonical = {}
+        self.digests = {}
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, signature, embedding=None, canonical=None, digest=None):
+        """
+        Indexe (ou ré-indexe) un CV.
+
+        Args:
+            key (str): Identifiant du CV
+            signature (numpy.ndarray): Signature MinHash
+            embedding (numpy.ndarray, optional): Embedding du CV; sans nouvel embedding,
+                                                 celui d'un texte inchangé est conservé
+            canonical (str, optional): CV canonique si le CV est un quasi-doublon;
+                                       la clé du CV elle-même conserve son groupe actuel
+            digest (str, optional): Empreinte du texte indexé
+        """
+        previous_canonical = self.canonical.get(key)
+        previous_embedding = self.embeddings.get(key)
+        previous_digest = self.digests.get(key)
+        unchanged = digest is None or digest == previous_digest
+        self.remove(key)
+
+        self.signatures[key] = signature
+        if embedding is None and unchanged:
+            embedding, digest = previous_embedding, digest or previous_digest
+        if embedding is not None:
+            self.embeddings[key] = embedding
+        if digest is not None:
+            self.digests[key] = digest
+        if canonical == key:
+            # CV inchangé ré-indexé: il reste dans son groupe de doublons
+            self.canonical[key] = previous_canonical or key
+        else:
+            self.canonical[key] = self.canonical.get(canonical, canonical) if canonical else key
+
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band[band_key].add(key)
+        self.dirty = True
+
+    def remove(self, key):
+        """
+        Retire un CV de l'index.
+
+        Args:
+            key (str): Identifiant du CV
+        """
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band[band_key].discard(key)
+            if not band[band_key]:
+                del band[band_key]
+        self.embeddings.pop(key, None)
+        self.canonical.pop(key, None)
+        self.digests.pop(key, None)
+        self.dirty = True
+
+    def unchanged(self, key, digest):
+        """
+        Indique si un CV est indexé avec le même texte.
+
+        Args:
+            key (str): Identifiant du CV
+            digest (str): Empreinte du texte actuel
+
+        Returns:
+            bool: True si l'empreinte indexée est identique
+        """
+        return digest is not None and self.digests.get(key) == digest
+
+    def find_duplicate(self, signature, exclude=None):
+        """
+        Cherche le CV indexé le plus proche dépassant le seuil de similarité.
+
+        Args:
+            signature (numpy.ndarray): Signature MinHash du CV entrant
+            exclude (str, optional): Clé du CV entrant: son ancienne entrée (texte
+                                     éventuellement modifié depuis) n'est pas un doublon
+
+        Returns:
+            tuple: (clé du CV, similarité estimée), ou None si aucun quasi-doublon
+        """
+        candidates = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates |= band.get(band_key, set())
+        candidates.discard(exclude)
+
+        best = None
+        for key in sorted(candidates):
+            similarity = MinHasher.similarity(signature, self.signatures[key])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def save(self, path=None):
+        """
+        Sauvegarde l'index sur disque (écriture à côté puis renommage atomique).
+
+        Args:
+            path (str, optional): Chemin du fichier (.npz), par défaut celui de l'index
+        """
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        keys = sorted(self.signatures)
+        with_embedding = [key for key in keys if key in self.embeddings]
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(keys, dtype=str),
+                canonical=np.array([self.canonical[key] for key in keys], dtype=str),
+                digests=np.array([self.digests.get(key, "") for key in keys], dtype=str),
+                signatures=np.array([self.signatures[key] for key in keys], dtype=np.uint32).reshape(-1, self.num_perm),
+                embedding_keys=np.array(with_embedding, dtype=str),
+                embeddings=np.array([self.embeddings[key] for key in with_embedding], dtype=np.float32)
+            )
+        os.replace(tmp_path, path)
+        self.dirty = False
+        logger.info(f"Index des doublons sauvegardé: {len(keys)} CVs dans {path}")
+
+    @classmethod
+    def load(cls, path=DEDUP_INDEX_PATH, **kwargs):
+        """
+        Charge un index depuis le disque, ou en crée un vide si le fichier n'existe pas.
+
+        Args:
+            path (str): Chemin du fichier (.npz)
+            **kwargs: Paramètres de l'index (threshold, num_perm, bands)
+
+        Returns:
+            DuplicateIndex: Index chargé
+        """
+        index = cls(path=path, **kwargs)
+        if not os.path.exists(path):
+            return index
+
+        with np.load(path, allow_pickle=False) as data:
+            embeddings = dict(zip(data["embedding_keys"].tolist(), data["embeddings"]))
+            # Index sauvegardé avant l'ajout des empreintes: les CVs seront ré-encodés une fois
+            digests = data["digests"].tolist() if "digests" in data.files else [""] * len(data["keys"])
+            for key, canonical, signature, digest in zip(
+                data["keys"].tolist(), data["canonical"].tolist(), data["signatures"], digests
+            ):
+                index.add(key, signature, embeddings.get(key), digest=digest or None)
+                index.canonical[key] = canonical
+        index.dirty = False
+
+        logger.info(f"Index des doublons chargé: {len(index)} CVs depuis {path}")
+        return index
@@ -1,26 +1,261 @@
 """
 Module pour encoder les textes en embeddings avec Sentence-BERT.
 """
-from sentence_transformers import SentenceTransformer
+import os
+import re
+import unicodedata
 import numpy as np
 import logging
-from config import SENTENCE_TRANSFORMER_MODEL
+from collections import OrderedDict
+from config import SENTENCE_TRANSFORMER_MODEL, ENCODER_MODE, STATIC_EMBEDDINGS_PATH, PREFILTER_SIZE, STATIC_WORD_CACHE_SIZE
+from utils.profiling import profiled
 
 logger = logging.getLogger(__name__)
 
+# Découpage de base du tokenizer BERT: mots et signes de ponctuation isolés
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+class StaticEmbeddings:
+    """
+    Embeddings statiques de tokens distillés d'un modèle Sentence-BERT.
+    
+    Chaque token du vocabulaire WordPiece est encodé une fois par le modèle;
+    un texte est ensuite encodé par simple lecture de la table et moyenne
+    des vecteurs de ses tokens, sans passe transformer. Les vecteurs de
+    tokens ne sont pas normalisés: leur norme pondère la moyenne.
+    """
+    
+    def __init__(self, tokens, vectors, max_word_length=100, word_cache_size=STATIC_WORD_CACHE_SIZE):
+        """
+        Initialise la table.
+        
+        Args:
+            tokens (list): Vocabulaire WordPiece (les suffixes commencent par '##')
+            vectors (numpy.ndarray): Vecteur de chaque token, (len(tokens), dimension)
+            max_word_length (int): Longueur au-delà de laquelle un mot est ignoré
+            word_cache_size (int): Nombre de mots dont le découpage est gardé en cache
+        """
+        self.tokens = list(tokens)
+        self.vocab = {token: i for i, token in enumerate(self.tokens)}
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.dimension = self.vectors.shape[1]
+        self.max_word_length = max_word_length
+        self.word_cache_size = word_cache_size
+        self._word_ids = OrderedDict()
+        
+    @classmethod
+    def distill(cls, model, batch_size=512):
+        """
+        Distille la table d'un modèle Sentence-BERT: chaque token est encodé
+        seul, entre [CLS] et [SEP], et sa représentation de phrase est conservée.
+        
+        Args:
+            model (SentenceTransformer): Modèle chargé
+            batch_size (int): Tokens encodés par passe
+            
+        Returns:
+            StaticEmbeddings: Table distillée
+        """
+        import torch
+        
+        tokenizer = model.tokenizer
+        vocab = tokenizer.get_vocab()
+        tokens = sorted(vocab, key=vocab.get)
+        logger.info(f"Distillation de {len(tokens)} embeddings de tokens")
+        
+        vectors = []
+        with torch.no_grad():
+            for start in range(0, len(tokens), batch_size):
+                input_ids = torch.tensor(
+                    [[tokenizer.cls_token_id, vocab[token], tokenizer.sep_token_id] for token in tokens[start:start + batch_size]],
+                    device=model.device
+                )
+                features = {
+                    "input_ids": input_ids,
+                    "attention_mask": torch.ones_like(input_ids),
+                    "token_type_ids": torch.zeros_like(input_ids)
+                }
+                vectors.append(model(features)["sentence_embedding"].cpu().numpy())
+                
+        return cls(tokens, np.concatenate(vectors))
+        
+    @classmethod
+    def load(cls, path):
+        """
+        Charge une table sauvegardée.
+        
+        Args:
+            path (str): Chemin du fichier (.npz)
+            
+        Returns:
+            StaticEmbeddings: Table chargée
+        """
+        with np.load(path) as data:
+            return cls(data["tokens"].tolist(), data["vectors"])
+            
+    def save(self, path):
+        """
+        Sauvegarde la table (vecteurs en float16).
+        
+        Args:
+            path (str): Chemin du fichier (.npz)
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, tokens=np.array(self.tokens, dtype=str), vectors=self.vectors.astype(np.float16))
+        logger.info(f"Embeddings statiques sauvegardés: {len(self.tokens)} tokens dans {path}")
+        
+    def word_ids(self, word):
+        """
+        Découpe un mot en tokens WordPiece (plus long préfixe d'abord).
+        
+        Args:
+            word (str): Mot normalisé
+            
+        Returns:
+            list: Indices des tokens, vide si le mot ne peut pas être découpé
+        """
+        ids = self._word_ids.get(word)
+        if ids is not None:
+            self._word_ids.move_to_end(word)
+            return ids
+            
+        ids = []
+        start = 0
+        while start < len(word) and len(word) <= self.max_word_length:
+            end = len(word)
+            while end > start:
+                piece = word[start:end] if start == 0 else "##" + word[start:end]
+                if piece in self.vocab:
+                    ids.append(self.vocab[piece])
+                    break
+                end -= 1
+            if end == start:
+                # Mot inconnu ([UNK]): ignoré
+                ids = []
+                break
+            start = end
+            
+        self._word_ids[word] = ids
+        if len(self._word_ids) > self.word_cache_size:
+            self._word_ids.popitem(last=False)
+        return ids
+        
+    def token_ids(self, text):
+        """
+        Tokenise un texte comme le tokenizer (uncased) du modèle.
+        
+        Args:
+            text (str): Texte à tokeniser
+            
+        Returns:
+            list: Indices des tokens
+        """
+        text = unicodedata.normalize("NFD", text.lower())
+        text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+        
+        ids = []
+        for word in _WORD_PATTERN.findall(text):
+            ids.extend(self.word_ids(word))
+        return ids
+        
+    def encode(self, text):
+        """
+        Encode un texte: moyenne des vecteurs de ses tokens, normalisée.
+        
+        Args:
+            text (str): Texte à encoder
+            
+        Returns:
+            numpy.ndarray: Vecteur d'embeddings
+        """
+        ids = self.token_ids(text) if text else []
+        if not ids:
+            return np.zeros(self.dimension, dtype=np.float32)
+            
+        embedding = self.vectors[ids].mean(axis=0)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding /= norm
+        return embedding
+
 class TextEncoder:
-    """Classe pour encoder les textes en vecteurs avec Sentence-BERT."""
+    """
+    Classe pour encoder les textes en vecteurs avec Sentence-BERT.
     
-    def __init__(self, model_name=SENTENCE_TRANSFORMER_MODEL):
+    En mode 'fast', le modèle n'est pas chargé: les embeddings sont calculés
+    à partir des embeddings statiques distillés du même modèle. Ils ne sont
+    pas comparables à ceux du modèle complet et ne doivent pas être mélangés
+    avec eux (index des doublons, index IVF).
+    """
+    
+    def __init__(self, model_name=SENTENCE_TRANSFORMER_MODEL, mode=ENCODER_MODE, static_path=STATIC_EMBEDDINGS_PATH,
+                 preload_static=PREFILTER_SIZE > 0):
         """
         Initialise l'encodeur de texte avec un modèle Sentence-BERT.
         
         Args:
             model_name (str): Nom du modèle Sentence-BERT à utiliser
+            mode (str): 'full' (Sentence-BERT) ou 'fast' (embeddings statiques)
+            static_path (str): Table des embeddings statiques, distillée si absente
+            preload_static (bool): En mode 'full', charger (ou distiller) la table
+                                   dès maintenant pour le préfiltrage
         """
-        logger.info(f"Chargement du modèle Sentence-BERT: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        if mode not in ("full", "fast"):
+            raise ValueError(f"Mode d'encodage inconnu: {mode}")
+            
+        self.model_name = model_name
+        self.mode = mode
+        self.static_path = static_path
+        self.static = None
+        self.model = None
         
+        if mode == "fast":
+            logger.info(f"Encodeur statique (sans passe transformer) distillé de {model_name}")
+            self._load_static()
+        else:
+            from sentence_transformers import SentenceTransformer
+            
+            logger.info(f"Chargement du modèle Sentence-BERT: {model_name}")
+            self.model = SentenceTransformer(model_name)
+            if preload_static:
+                self._load_static()
+            
+    def _load_static(self):
+        """
+        Charge la table des embeddings statiques, en la distillant (une seule fois) si elle est absente.
+        
+        Returns:
+            StaticEmbeddings: Table des embeddings statiques
+        """
+        if self.static is None:
+            if os.path.exists(self.static_path):
+                self.static = StaticEmbeddings.load(self.static_path)
+            else:
+                from sentence_transformers import SentenceTransformer
+                
+                model = self.model or SentenceTransformer(self.model_name)
+                self.static = StaticEmbeddings.distill(model)
+                self.static.save(self.static_path)
+        return self.static
+        
+    def has_static_embeddings(self):
+        """
+        Indique si encode_fast est utilisable sans distillation.
+        
+        Returns:
+            bool: True si la table est chargée ou déjà sauvegardée
+        """
+        return self.static is not None or os.path.exists(self.static_path)
+        
+    @property
+    def dimension(self):
+        """Dimension des embeddings produits."""
+        if self.model is None:
+            return self.static.dimension
+        return self.model.get_sentence_embedding_dimension()
+        
+    @profiled("encoding")
     def encode_text(self, text):
         """
         Encode un texte en un vecteur d'embeddings.
@@ -33,12 +268,16 @@ class TextEncoder:
         """
         if not text:
             logger.warning("Tentative d'encodage d'un texte vide")
-            return np.zeros(self.model.get_sentence_embedding_dimension())
+            return np.zeros(self.dimension)
+            
+        if self.mode == "fast":
+            return self.static.encode(text)
         
         # Encode le texte et normalise le vecteur
         embedding = self.model.encode(text, normalize_embeddings=True)
         return embedding
     
+    @profiled("encoding")
     def encode_chunks(self, text, chunk_size=512, overlap=100):
         """
         Encode un texte long en le divisant en chunks et en faisant la moyenne des embeddings.
@@ -53,7 +292,11 @@ class TextEncoder:
         """
         if not text:
             logger.warning("Tentative d'encodage d'un texte vide")
-            return np.zeros(self.model.get_sentence_embedding_dimension())
+            return np.zeros(self.dimension)
+            
+        # Les embeddings statiques n'ont pas de longueur maximale: pas de découpage
+        if self.mode == "fast":
+            return self.static.encode(text)
         
         # Découper le texte en chunks avec chevauchement
         words = text.split()
@@ -78,4 +321,26 @@ class TextEncoder:
         if norm > 0:
             avg_embedding = avg_embedding / norm
             
-        return avg_embedding
\ No newline at end of file
+        return avg_embedding
+        
+    @profiled("prefilter")
+    def encode_fast(self, text):
+        """
+        Encode un texte avec les embeddings statiques, quel que soit le mode.
+        
+        Sert au premier étage du classement (préfiltrage): le résultat ne se
+        compare qu'à d'autres embeddings obtenus par encode_fast.
+        
+        Args:
+            text (str): Texte à encoder
+            
+        Returns:
+            numpy.ndarray: Vecteur d'embeddings
+        """
+        return self._load_static().encode(text)
+
+
+if __name__ == "__main__":
+    # Distillation hors service: python -m core.encoder
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    TextEncoder(mode="full", preload_static=True)
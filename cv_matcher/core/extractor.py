@@ -1,16 +1,83 @@
 """
-Module d'extraction de texte à partir de fichiers PDF.
+Module d'extraction de texte à partir de fichiers CV (PDF, DOCX et DOC).
 """
 import os
+import re
+import shutil
+import zipfile
+import subprocess
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
+from defusedxml import ElementTree as ET
 from pdfminer.high_level import extract_text as pdfminer_extract
 import logging
+from utils.profiling import profiled, profile_stage
+from config import ALLOWED_EXTENSIONS, EXTRACTION_WORKERS, EXTRACTION_CACHE_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Espace de noms WordprocessingML
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Séquences de texte dans un fichier Word binaire (.doc): UTF-16LE ou 8 bits
+DOC_UTF16_RUN = re.compile(rb'(?:[\x20-\x7e\xa0-\xff\t\r\n]\x00){4,}')
+DOC_8BIT_RUN = re.compile(rb'[\x20-\x7e\xa0-\xff\t\r\n]{8,}')
+
+# Cache LRU des textes extraits, indexé par (chemin, date de modification, taille)
+_text_cache = OrderedDict()
+
+
+def _file_signature(file_path):
+    """
+    Calcule la clé de cache d'un fichier.
+    
+    Args:
+        file_path (str): Chemin du fichier
+        
+    Returns:
+        tuple: (chemin absolu, date de modification en ns, taille)
+    """
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def _cache_get(key):
+    """
+    Retourne un texte du cache d'extraction.
+    
+    Args:
+        key (tuple): Clé de cache du fichier
+        
+    Returns:
+        str: Texte extrait, ou None si absent
+    """
+    text = _text_cache.get(key)
+    if text is not None:
+        _text_cache.move_to_end(key)
+    return text
+
+
+def _cache_put(key, text):
+    """
+    Ajoute un texte au cache d'extraction, en évinçant les plus anciens.
+    
+    Args:
+        key (tuple): Clé de cache du fichier
+        text (str): Texte extrait
+    """
+    _text_cache[key] = text
+    while len(_text_cache) > EXTRACTION_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+
+
 class CVExtractor:
     """Classe pour l'extraction de texte à partir de fichiers CV."""
     
+    # Pool de processus partagé pour l'extraction parallèle (créé à la demande)
+    _pool = None
+    _pool_workers = 0
+    
     @staticmethod
     def extract_from_pdf(pdf_path):
         """
@@ -50,28 +117,295 @@ class CVExtractor:
             return ""
 
     @staticmethod
-    def extract_all_from_directory(directory):
+    def extract_from_docx(docx_path):
         """
-        Extrait le texte de tous les fichiers PDF dans un répertoire.
+        Extrait le texte d'un fichier DOCX en lisant le XML du document en flux,
+        directement depuis l'archive zip, sans construire de modèle objet complet.
+        Le XML est lu avec defusedxml (entités et DTD refusées), et chaque élément
+        est détaché de son parent dès qu'il est lu: la mémoire reste bornée par
+        la profondeur du document.
         
         Args:
-            directory (str): Chemin vers le répertoire contenant les PDFs
+            docx_path (str): Chemin vers le fichier DOCX
             
         Returns:
-            dict: Dictionnaire avec les noms de fichiers comme clés et le texte extrait comme valeurs
+            str: Texte extrait du document
+        """
+        if not os.path.exists(docx_path):
+            logger.error(f"Le fichier {docx_path} n'existe pas")
+            return ""
+        
+        try:
+            parts = []
+            ancestors = []
+            with zipfile.ZipFile(docx_path) as archive:
+                with archive.open("word/document.xml") as document:
+                    for event, element in ET.iterparse(document, events=("start", "end")):
+                        if event == "start":
+                            ancestors.append(element)
+                            continue
+                        
+                        ancestors.pop()
+                        tag = element.tag
+                        if tag == W_NS + "t":
+                            parts.append(element.text or "")
+                        elif tag == W_NS + "tab":
+                            parts.append("\t")
+                        elif tag in (W_NS + "br", W_NS + "cr"):
+                            parts.append("\n")
+                        elif tag == W_NS + "p":
+                            parts.append("\n")
+                        
+                        # Libérer les éléments déjà lus (paragraphes, tableaux, propriétés...)
+                        element.clear()
+                        if ancestors:
+                            ancestors[-1].remove(element)
+            
+            text = "".join(parts)
+            logger.info(f"Texte extrait du DOCX: {len(text)} caractères")
+            return text
+        except Exception as e:
+            # Archive ou XML invalide, flux compressé corrompu (zlib.error, EOFError)...
+            logger.error(f"Échec de l'extraction du DOCX {docx_path}: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def extract_from_doc(doc_path):
+        """
+        Extrait le texte d'un fichier Word binaire (.doc) avec antiword ou catdoc
+        s'ils sont installés, sinon en récupérant les séquences de texte du fichier.
+        
+        Args:
+            doc_path (str): Chemin vers le fichier DOC
+            
+        Returns:
+            str: Texte extrait du document
+        """
+        if not os.path.exists(doc_path):
+            logger.error(f"Le fichier {doc_path} n'existe pas")
+            return ""
+        
+        # Certains fichiers .doc sont en réalité des DOCX renommés
+        if zipfile.is_zipfile(doc_path):
+            return CVExtractor.extract_from_docx(doc_path)
+        
+        for tool in ("antiword", "catdoc"):
+            if shutil.which(tool):
+                try:
+                    result = subprocess.run(
+                        [tool, doc_path], capture_output=True, timeout=30, check=True
+                    )
+                    text = result.stdout.decode("utf-8", errors="ignore")
+                    if text.strip():
+                        logger.info(f"Texte extrait avec {tool}: {len(text)} caractères")
+                        return text
+                except (subprocess.SubprocessError, OSError) as e:
+                    logger.warning(f"Échec de l'extraction avec {tool}: {str(e)}")
+        
+        # Fallback: séquences de texte UTF-16LE (Word 97+) ou 8 bits (anciens formats)
+        with open(doc_path, "rb") as f:
+            data = f.read()
+        
+        utf16_runs = [run.decode("utf-16-le") for run in DOC_UTF16_RUN.findall(data)]
+        if sum(len(run) for run in utf16_runs) >= 100:
+            runs = utf16_runs
+        else:
+            runs = [run.decode("cp1252", errors="ignore") for run in DOC_8BIT_RUN.findall(data)]
+        
+        text = "\n".join(run.replace("\r", "\n") for run in runs)
+        logger.info(f"Texte extrait du DOC (séquences brutes): {len(text)} caractères")
+        return text
+    
+    @staticmethod
+    def _extract_uncached(file_path):
+        """
+        Extrait le texte d'un fichier selon son extension, sans passer par le cache.
+        
+        Args:
+            file_path (str): Chemin vers le fichier CV
+            
+        Returns:
+            str: Texte extrait
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        try:
+            if extension == '.pdf':
+                return CVExtractor.extract_from_pdf(file_path)
+            if extension == '.docx':
+                return CVExtractor.extract_from_docx(file_path)
+            if extension == '.doc':
+                return CVExtractor.extract_from_doc(file_path)
+        except Exception as e:
+            # Un fichier illisible ne doit pas interrompre un lot
+            logger.error(f"Échec de l'extraction de {file_path}: {str(e)}")
+            return ""
+        
+        logger.warning(f"Extension non supportée: {file_path}")
+        return ""
+    
+    @staticmethod
+    @profiled("extraction")
+    def extract_text(file_path):
         """
-        results = {}
+        Extrait le texte d'un fichier CV (PDF, DOCX ou DOC), avec mise en cache
+        tant que le fichier n'est pas modifié.
         
+        Args:
+            file_path (str): Chemin vers le fichier CV
+            
+        Returns:
+            str: Texte extrait
+        """
+        if not os.path.exists(file_path):
+            logger.error(f"Le fichier {file_path} n'existe pas")
+            return ""
+        
+        key = _file_signature(file_path)
+        text = _cache_get(key)
+        if text is None:
+            text = CVExtractor._extract_uncached(file_path)
+            _cache_put(key, text)
+        return text
+    
+    @staticmethod
+    def _get_pool(max_workers):
+        """
+        Retourne le pool de processus d'extraction, recréé si sa taille change.
+        
+        Args:
+            max_workers (int): Nombre de processus
+            
+        Returns:
+            ProcessPoolExecutor: Pool partagé
+        """
+        if CVExtractor._pool is None or CVExtractor._pool_workers != max_workers:
+            if CVExtractor._pool is not None:
+                CVExtractor._pool.shutdown(wait=False)
+            CVExtractor._pool = ProcessPoolExecutor(max_workers=max_workers)
+            CVExtractor._pool_workers = max_workers
+        return CVExtractor._pool
+    
+    @staticmethod
+    def iter_from_paths(file_paths, max_workers=EXTRACTION_WORKERS):
+        """
+        Extrait le texte d'une liste de fichiers, dans l'ordre, sans conserver
+        les textes déjà produits. Avec plusieurs workers, les fichiers absents
+        du cache sont extraits en parallèle dans un pool de processus, avec un
+        nombre borné d'extractions en cours.
+        
+        Args:
+            file_paths (list): Tuples (nom du fichier, chemin du fichier)
+            max_workers (int): Nombre de processus d'extraction (1 = séquentiel)
+            
+        Yields:
+            tuple: (nom du fichier, chemin du fichier, texte extrait) pour chaque fichier lisible
+        """
+        if max_workers <= 1:
+            for filename, file_path in file_paths:
+                text = CVExtractor.extract_text(file_path)
+                if text:
+                    yield filename, file_path, text
+            return
+        
+        pool = CVExtractor._get_pool(max_workers)
+        pending = deque()
+        
+        def next_result():
+            filename, file_path, key, result = pending.popleft()
+            if isinstance(result, str):
+                return filename, file_path, result
+            try:
+                with profile_stage("extraction"):
+                    text = result.result()
+            except Exception as e:
+                # Processus d'extraction interrompu: le fichier est ignoré, sans mise en cache
+                logger.error(f"Échec de l'extraction de {file_path}: {str(e)}")
+                return filename, file_path, ""
+            _cache_put(key, text)
+            return filename, file_path, text
+        
+        for filename, file_path in file_paths:
+            if not os.path.exists(file_path):
+                logger.error(f"Le fichier {file_path} n'existe pas")
+                continue
+            
+            key = _file_signature(file_path)
+            text = _cache_get(key)
+            if text is None:
+                text = pool.submit(CVExtractor._extract_uncached, file_path)
+            pending.append((filename, file_path, key, text))
+            
+            if len(pending) >= 2 * max_workers:
+                result = next_result()
+                if result[2]:
+                    yield result
+        
+        while pending:
+            result = next_result()
+            if result[2]:
+                yield result
+    
+    @staticmethod
+    def list_directory(directory, root=None):
+        """
+        Liste les fichiers CV d'un répertoire (extensions de ALLOWED_EXTENSIONS), par nom.
+        
+        Args:
+            directory (str): Chemin vers le répertoire contenant les CVs
+            root (str, optional): Répertoire de référence des identifiants: chaque
+                                  fichier est désigné par son chemin relatif à root
+                                  (absolu s'il est en dehors), et non par son seul nom
+            
+        Returns:
+            list: Tuples (identifiant du fichier, chemin du fichier)
+        """
         if not os.path.isdir(directory):
             logger.error(f"Le répertoire {directory} n'existe pas")
-            return results
+            return []
         
-        for filename in os.listdir(directory):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(directory, filename)
-                text = CVExtractor.extract_from_pdf(file_path)
-                if text:
-                    results[filename] = text
+        files = []
+        for filename in sorted(os.listdir(directory)):
+            if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+                continue
+            file_path = os.path.join(directory, filename)
+            key = filename
+            if root is not None:
+                key = os.path.relpath(os.path.abspath(file_path), os.path.abspath(root))
+                if key.startswith(os.pardir + os.sep):
+                    key = os.path.abspath(file_path)
+            files.append((key, file_path))
+        return files
+    
+    @staticmethod
+    def iter_from_directory(directory, max_workers=EXTRACTION_WORKERS):
+        """
+        Parcourt les fichiers CV d'un répertoire (extensions de ALLOWED_EXTENSIONS)
+        et extrait leur texte un par un, sans conserver les textes déjà produits.
+        
+        Args:
+            directory (str): Chemin vers le répertoire contenant les CVs
+            max_workers (int): Nombre de processus d'extraction (1 = séquentiel)
+            
+        Yields:
+            tuple: (nom du fichier, chemin du fichier, texte extrait) pour chaque CV lisible
+        """
+        yield from CVExtractor.iter_from_paths(CVExtractor.list_directory(directory), max_workers)
+
+    @staticmethod
+    def extract_all_from_directory(directory):
+        """
+        Extrait le texte de tous les fichiers CV d'un répertoire.
+        
+        Args:
+            directory (str): Chemin vers le répertoire contenant les CVs
+            
+        Returns:
+            dict: Dictionnaire avec les noms de fichiers comme clés et le texte extrait comme valeurs
+        """
+        results = {
+            filename: text
+            for filename, _, text in CVExtractor.iter_from_directory(directory)
+        }
                     
         logger.info(f"Extraction terminée pour {len(results)} fichiers")
         return results
\ No newline at end of file
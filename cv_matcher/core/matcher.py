@@ -1,6 +1,7 @@
 """
 Module pour calculer la similarité entre les CVs et les offres d'emploi.
 """
+import heapq
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import logging
@@ -64,17 +65,19 @@ class CVMatcher:
         return int(round(score))
     
     @staticmethod
-    def rank_candidates(cv_embeddings, job_embedding):
+    def rank_candidates(cv_embeddings, job_embedding, duplicate_of=None):
         """
         Classe les CV par ordre de pertinence pour une offre d'emploi.
         
         Args:
             cv_embeddings (dict): Dictionnaire des embeddings de CV {filename: embedding}
             job_embedding (numpy.ndarray): Embedding de l'offre d'emploi
+            duplicate_of (dict, optional): Groupe de doublons de chaque CV {filename: canonique};
+                                           si fourni, seul le mieux classé de chaque groupe est gardé
             
         Returns:
             list: Liste de dictionnaires triés par score décroissant avec les clés:
-                  'filename', 'similarity', 'score'
+                  'filename', 'similarity', 'score' (et 'duplicates' si duplicate_of est fourni)
         """
         results = []
         
@@ -91,4 +94,119 @@ class CVMatcher:
         # Tri par score décroissant
         results.sort(key=lambda x: x['score'], reverse=True)
         
-        return results
\ No newline at end of file
+        if duplicate_of is not None:
+            results = CVMatcher.collapse_duplicates(results, duplicate_of)
+        
+        return results
+    
+    @staticmethod
+    def query_index(index, job_embedding, top_k, nprobe=None):
+        """
+        Classe les CV d'un index approximatif (IVFIndex) sans parcourir tout le vivier.
+        
+        Args:
+            index (IVFIndex): Index des embeddings de CV
+            job_embedding (numpy.ndarray): Embedding de l'offre d'emploi
+            top_k (int): Nombre de candidats retournés
+            nprobe (int, optional): Nombre de listes parcourues (par défaut celui de l'index)
+            
+        Returns:
+            list: Liste de dictionnaires triés par score décroissant avec les clés:
+                  'filename', 'similarity', 'score' (même format que rank_candidates)
+        """
+        return [
+            {
+                'filename': filename,
+                'similarity': similarity,
+                'score': CVMatcher.similarity_to_score(similarity)
+            }
+            for filename, similarity in index.search(job_embedding, top_k, nprobe=nprobe)
+        ]
+    
+    @staticmethod
+    def collapse_duplicates(results, duplicate_of):
+        """
+        Regroupe les quasi-doublons d'un classement: seul le mieux classé de chaque
+        groupe est conservé, avec la liste des autres dans 'duplicates'.
+        
+        Args:
+            results (list): Classement trié (dictionnaires avec la clé 'filename')
+            duplicate_of (dict): Groupe de doublons de chaque CV {filename: canonique}
+            
+        Returns:
+            list: Classement sans doublons
+        """
+        collapsed = []
+        representatives = {}
+        
+        for result in results:
+            group = duplicate_of.get(result['filename'], result['filename'])
+            if group in representatives:
+                representatives[group]['duplicates'].append(result['filename'])
+            else:
+                result['duplicates'] = []
+                representatives[group] = result
+                collapsed.append(result)
+                
+        return collapsed
+
+class TopKCandidates:
+    """
+    Tas borné conservant les k meilleurs candidats (et leur charge utile, ex. le texte du CV).
+    
+    L'ordre obtenu est identique à celui de CVMatcher.rank_candidates: score
+    décroissant, puis ordre d'arrivée en cas d'égalité.
+    """
+    
+    def __init__(self, k):
+        """
+        Initialise le tas.
+        
+        Args:
+            k (int): Nombre maximal de candidats conservés
+        """
+        self.k = k
+        self._heap = []
+        self._count = 0
+        
+    def __len__(self):
+        return len(self._heap)
+        
+    def push(self, filename, similarity, score, payload=None):
+        """
+        Propose un candidat; il n'est conservé que s'il fait partie des k meilleurs.
+        
+        Args:
+            filename (str): Nom du fichier CV
+            similarity (float): Similarité cosinus
+            score (int): Score de matching
+            payload (object, optional): Donnée associée, libérée si le candidat est écarté
+            
+        Returns:
+            bool: True si le candidat est conservé
+        """
+        # Le pire candidat est en tête: score le plus faible, puis arrivée la plus tardive
+        entry = (score, -self._count, filename, similarity, payload)
+        self._count += 1
+        
+        if self.k <= 0:
+            return False
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+        
+    def results(self):
+        """
+        Retourne les candidats conservés, du meilleur au moins bon.
+        
+        Returns:
+            list: Liste de dictionnaires avec les clés 'filename', 'similarity', 'score', 'payload'
+        """
+        return [
+            {'filename': filename, 'similarity': similarity, 'score': score, 'payload': payload}
+            for score, _, filename, similarity, payload in sorted(self._heap, reverse=True)
+        ]
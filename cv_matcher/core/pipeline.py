@@ -0,0 +1,801 @@
+"""
+Module du pipeline de matching en flux, à mémoire bornée.
+"""
+import time
+import uuid
+import logging
+import functools
+import threading
+import numpy as np
+from collections import OrderedDict
+from core.extractor import CVExtractor
+from core.matcher import CVMatcher, TopKCandidates
+from core.dedup import MinHasher
+from utils.profiling import profile_stage
+from config import MATCH_SESSION_CACHE_SIZE, ANALYSIS_BATCH_SIZE, EXTRACTION_WORKERS, NER_PROCESSES, PREFILTER_SIZE
+from config import ANN_MIN_TRAINING_SIZE, PERSIST_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def _locked(method):
+    """Exécute une méthode du pipeline sous son verrou."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MatchPipeline:
+    """
+    Pipeline de matching en flux.
+
+    Les CVs sont extraits, encodés et notés un par un: seuls les textes des
+    meilleurs candidats (offset + top_k) sont conservés dans un tas borné, et
+    seule la page demandée est résumée. Le classement compact (sans texte ni
+    embedding) est gardé en session pour résumer les pages suivantes à la demande.
+
+    Le stockage des candidats, l'index des doublons et les sessions sont
+    partagés entre les threads des requêtes (run_in_threadpool, flux NDJSON de
+    analyze_many): toute lecture-modification passe par `lock`, tenu le temps
+    de l'accès à l'état partagé seulement. Extraction, encodage et analyses
+    SpaCy s'exécutent hors verrou; les méthodes publiques sont bloquantes et
+    s'appellent hors de la boucle d'événements.
+
+    Avec un index approximatif (IVFIndex), les embeddings de CV connus de
+    l'index des doublons y sont reproduits dès qu'il est entraîné: `search`
+    classe alors tout le vivier sans le parcourir.
+
+    Le stockage et les index sont réécrits en entier à chaque sauvegarde: les
+    requêtes ne les sauvegardent qu'au plus une fois par `persist_interval`
+    secondes, et l'application force une dernière sauvegarde à l'arrêt.
+    """
+
+    def __init__(self, text_processor, text_encoder, entity_extractor, match_summarizer,
+                 candidate_store, duplicate_index, session_cache_size=MATCH_SESSION_CACHE_SIZE,
+                 extraction_workers=EXTRACTION_WORKERS, ner_processes=NER_PROCESSES, shard_executor=None,
+                 ann_index=None, persist_interval=PERSIST_INTERVAL):
+        """
+        Initialise le pipeline avec les composants partagés de l'application.
+
+        Args:
+            text_processor (TextProcessor): Nettoyage des textes
+            text_encoder (TextEncoder): Encodage des textes
+            entity_extractor (EntityExtractor): Extraction d'entités
+            match_summarizer (MatchSummarizer): Génération des résumés
+            candidate_store (CandidateStore): Stockage des analyses de CV
+            duplicate_index (DuplicateIndex): Index des quasi-doublons
+            session_cache_size (int): Nombre maximal de sessions de matching conservées
+            extraction_workers (int): Processus d'extraction de l'analyse groupée
+            ner_processes (int): Processus spaCy de l'analyse groupée
+            shard_executor (ShardExecutor, optional): Workers du matching partitionné
+            ann_index (IVFIndex, optional): Index approximatif des embeddings de CV
+            persist_interval (float): Secondes minimales entre deux sauvegardes (0 = à chaque appel de persist)
+        """
+        self.text_processor = text_processor
+        self.text_encoder = text_encoder
+        self.entity_extractor = entity_extractor
+        self.match_summarizer = match_summarizer
+        self.candidate_store = candidate_store
+        self.duplicate_index = duplicate_index
+        self.minhasher = MinHasher(duplicate_index.num_perm)
+        self.session_cache_size = session_cache_size
+        self.extraction_workers = extraction_workers
+        self.ner_processes = ner_processes
+        self.shard_executor = shard_executor
+        self.ann_index = ann_index
+        self.persist_interval = persist_interval
+        self._last_persist = time.monotonic()
+        self._sessions = OrderedDict()
+        self.lock = threading.RLock()
+
+    def encode_job(self, job_text):
+        """
+        Nettoie et encode le texte d'une offre d'emploi.
+
+        Args:
+            job_text (str): Texte de l'offre
+
+        Returns:
+            numpy.ndarray: Embedding de l'offre
+        """
+        processed_job_text = self.text_processor.clean_job_text(job_text)
+        return self.text_encoder.encode_chunks(processed_job_text)
+
+    @_locked
+    def index_cv(self, filename, signature, embedding=None, canonical=None, digest=None):
+        """
+        Indexe (ou ré-indexe) un CV dans l'index des doublons et, s'il est
+        entraîné, dans l'index approximatif.
+
+        Args:
+            filename (str): Identifiant du CV
+            signature (numpy.ndarray): Signature MinHash
+            embedding (numpy.ndarray, optional): Embedding du CV
+            canonical (str, optional): CV canonique si le CV est un quasi-doublon
+            digest (str, optional): Empreinte du texte du CV
+        """
+        self.duplicate_index.add(filename, signature, embedding, canonical=canonical, digest=digest)
+
+        if self.ann_index is None or not self.ann_index.is_trained:
+            return
+        # Sans nouvel embedding, un CV inchangé garde sa ligne; celle d'un texte
+        # modifié est retirée (l'index des doublons a déjà oublié son embedding)
+        if embedding is None:
+            if filename not in self.duplicate_index.embeddings:
+                self.ann_index.remove(filename)
+        else:
+            self.ann_index.add([filename], self._normalize(embedding))
+
+    @staticmethod
+    def _normalize(vectors):
+        """
+        Normalise des embeddings (l'index approximatif compare des vecteurs unitaires).
+
+        Args:
+            vectors (numpy.ndarray): Embedding (dim) ou embeddings (n, dim)
+
+        Returns:
+            numpy.ndarray: Embeddings normalisés (n, dim)
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    @_locked
+    def build_ann_index(self, min_size=ANN_MIN_TRAINING_SIZE):
+        """
+        Entraîne l'index approximatif sur les embeddings de l'index des doublons,
+        puis les y ajoute. Sans effet si l'index est déjà entraîné ou si trop
+        peu d'embeddings sont connus.
+
+        Args:
+            min_size (int): Nombre minimal d'embeddings connus
+
+        Returns:
+            bool: True si l'index a été construit
+        """
+        embeddings = self.duplicate_index.embeddings
+        if self.ann_index is None or self.ann_index.is_trained or len(embeddings) < min_size:
+            return False
+
+        keys = list(embeddings)
+        vectors = self._normalize(np.stack([embeddings[key] for key in keys]))
+        self.ann_index.train(vectors)
+        self.ann_index.add(keys, vectors)
+        self.ann_index.save()
+        return True
+
+    def search(self, job_text, top_k, nprobe=None):
+        """
+        Classe tout le vivier des CVs déjà encodés pour une offre, par l'index
+        approximatif s'il est entraîné, sinon par un parcours exact.
+
+        Args:
+            job_text (str): Texte de l'offre d'emploi
+            top_k (int): Nombre de candidats retournés
+            nprobe (int, optional): Nombre de listes parcourues (par défaut celui de l'index)
+
+        Returns:
+            list: Dictionnaires 'filename', 'similarity' et 'score', par score décroissant
+        """
+        job_embedding = self._normalize(self.encode_job(job_text))[0]
+        with self.lock, profile_stage("ranking"):
+            if self.ann_index is not None and self.ann_index.is_trained:
+                return CVMatcher.query_index(self.ann_index, job_embedding, top_k, nprobe=nprobe)
+            return CVMatcher.rank_candidates(self.duplicate_index.embeddings, job_embedding)[:top_k]
+
+    def find_duplicate(self, filename, cv_text, processed_cv_text):
+        """
+        Cherche un quasi-doublon connu d'un CV et, s'il existe, réutilise son analyse.
+
+        Args:
+            filename (str): Identifiant du CV
+            cv_text (str): Texte brut du CV
+            processed_cv_text (str): Texte nettoyé du CV
+
+        Returns:
+            tuple: (signature MinHash, clé du quasi-doublon ou None); un CV inchangé
+                   depuis son indexation est son propre quasi-doublon
+        """
+        signature = self.minhasher.signature(processed_cv_text)
+        if not processed_cv_text.strip():
+            return signature, None
+
+        digest = self.candidate_store.text_digest(cv_text)
+        with self.lock:
+            return signature, self._match_duplicate(filename, signature, digest)
+
+    def analyze(self, filename, cv_text):
+        """
+        Retourne l'analyse d'un CV, stockée si son texte n'a pas changé; sinon
+        le CV est analysé hors verrou puis l'analyse est stockée.
+
+        Args:
+            filename (str): Identifiant du CV
+            cv_text (str): Texte brut du CV (vide si le fichier est devenu illisible)
+
+        Returns:
+            dict: Analyse du CV, ou None pour un texte vide sans analyse stockée
+        """
+        if not cv_text:
+            with self.lock:
+                return self.candidate_store.get(filename)
+
+        digest = self.candidate_store.text_digest(cv_text)
+        with self.lock:
+            analysis = self.candidate_store.get(filename, digest)
+        if analysis is not None:
+            return analysis
+
+        analysis = self.entity_extractor.analyze_cv(cv_text)
+        with self.lock:
+            self.candidate_store.upsert(filename, analysis, digest)
+            return self.candidate_store.get(filename)
+
+    def analyze_file(self, filename, file_path):
+        """
+        Extrait, indexe et analyse un seul CV sans offre d'emploi.
+
+        Args:
+            filename (str): Identifiant du CV
+            file_path (str): Chemin du fichier
+
+        Returns:
+            dict: Analyse du CV, ou None si le texte n'a pas pu être extrait
+        """
+        cv_text = CVExtractor.extract_text(file_path)
+        if not cv_text:
+            return None
+
+        # Réutiliser l'analyse d'un quasi-doublon connu, puis indexer le CV
+        processed_cv_text = self.text_processor.clean_cv_text(cv_text)
+        signature, duplicate_key = self.find_duplicate(filename, cv_text, processed_cv_text)
+        self.index_cv(
+            filename,
+            signature,
+            self.duplicate_index.embeddings.get(duplicate_key) if duplicate_key else None,
+            canonical=duplicate_key,
+            digest=self.candidate_store.text_digest(cv_text)
+        )
+
+        # Analyse stockée réutilisée si le texte n'a pas changé
+        analysis = self.analyze(filename, cv_text)
+        self.persist()
+        return analysis
+
+    def _match_duplicate(self, filename, signature, digest):
+        """
+        Cherche un quasi-doublon connu d'après une signature et, s'il existe, réutilise son analyse.
+
+        Args:
+            filename (str): Identifiant du CV
+            signature (numpy.ndarray): Signature MinHash du CV
+            digest (str): Empreinte du texte du CV
+
+        Returns:
+            str: Clé du quasi-doublon (le CV lui-même s'il est inchangé), ou None
+        """
+        # CV inchangé: son embedding et son groupe de doublons sont réutilisés
+        if self.duplicate_index.unchanged(filename, digest):
+            return filename
+
+        # Un CV modifié ne se reconnaît pas dans sa propre entrée, qui décrit un texte périmé
+        duplicate = self.duplicate_index.find_duplicate(signature, exclude=filename)
+        if duplicate is None:
+            return None
+
+        duplicate_key = duplicate[0]
+        if self.candidate_store.get(filename, digest) is None:
+            self.candidate_store.copy(duplicate_key, filename, digest)
+
+        logger.info(f"{filename}: quasi-doublon de {duplicate_key} (similarité {duplicate[1]:.2f})")
+        return duplicate_key
+
+    def analyze_many(self, file_paths, batch_size=ANALYSIS_BATCH_SIZE):
+        """
+        Analyse un lot de CVs sans offre d'emploi, lot par lot.
+
+        Les textes sont extraits en parallèle (CVExtractor.iter_from_paths); les
+        analyses déjà stockées ou héritées d'un quasi-doublon sont réutilisées et
+        les CVs restants passent ensemble dans EntityExtractor.analyze_cvs.
+
+        Args:
+            file_paths (list): Tuples (nom du fichier, chemin du fichier ou None si introuvable)
+            batch_size (int): Nombre de CVs extraits avant chaque analyse groupée
+
+        Yields:
+            dict: Résultat par fichier, dans l'ordre: 'filename' et 'success', puis
+                  l'analyse ('skills', 'experience_years', 'experience_level',
+                  'education') ou 'error'
+        """
+        file_paths = list(file_paths)
+
+        for start in range(0, len(file_paths), batch_size):
+            batch = file_paths[start:start + batch_size]
+            readable = [(filename, file_path) for filename, file_path in batch if file_path]
+            # Textes indexés par chemin: deux fichiers de même nom ne se masquent pas
+            texts = {file_path: cv_text for _, file_path, cv_text in CVExtractor.iter_from_paths(readable, self.extraction_workers)}
+
+            # Réutiliser les analyses connues, puis indexer les CVs (verrou pris par accès)
+            pending = []
+            failed = {}
+            for filename, file_path in batch:
+                cv_text = texts.get(file_path)
+                if cv_text is None:
+                    continue
+
+                try:
+                    processed_cv_text = self.text_processor.clean_cv_text(cv_text)
+                    signature, duplicate_key = self.find_duplicate(filename, cv_text, processed_cv_text)
+                    digest = self.candidate_store.text_digest(cv_text)
+                    self.index_cv(
+                        filename,
+                        signature,
+                        self.duplicate_index.embeddings.get(duplicate_key) if duplicate_key else None,
+                        canonical=duplicate_key,
+                        digest=digest
+                    )
+                except Exception as e:
+                    logger.error(f"Échec de l'indexation du CV {filename}: {str(e)}")
+                    failed[filename] = "Impossible d'analyser le CV"
+                    continue
+
+                with self.lock:
+                    known = self.candidate_store.get(filename, digest) is not None
+                if not known:
+                    pending.append((filename, cv_text, digest))
+
+            # Une seule passe SpaCy pour les CVs restants du lot, hors verrou
+            analyses = self._analyze_pending(pending, failed)
+
+            # Le verrou n'est jamais conservé pendant un yield
+            results = []
+            with self.lock:
+                for (filename, _, digest), analysis in zip(pending, analyses):
+                    if analysis is not None:
+                        self.candidate_store.upsert(filename, analysis, digest)
+                self.persist()
+
+                for filename, file_path in batch:
+                    if filename in failed:
+                        results.append({"filename": filename, "success": False, "error": failed[filename]})
+                        continue
+
+                    if file_path not in texts:
+                        results.append({
+                            "filename": filename,
+                            "success": False,
+                            "error": "Impossible d'extraire le texte du CV" if file_path else "Document introuvable"
+                        })
+                        continue
+
+                    analysis = self.candidate_store.get(filename)
+                    results.append({
+                        "filename": filename,
+                        "success": True,
+                        "skills": analysis["skills"],
+                        "experience_years": analysis["experience_years"],
+                        "experience_level": analysis["experience_level"],
+                        "education": analysis["education"]
+                    })
+
+            yield from results
+
+        logger.info(f"Analyse groupée: {len(file_paths)} CVs traités")
+
+    def _analyze_pending(self, pending, failed):
+        """
+        Analyse les CVs d'un lot en une passe SpaCy; si la passe échoue, chaque
+        CV est analysé seul pour isoler ceux qui la font échouer.
+
+        Args:
+            pending (list): Tuples (nom du fichier, texte du CV, empreinte du texte)
+            failed (dict): Erreurs par nom de fichier, complété par les échecs
+
+        Returns:
+            list: Analyses dans l'ordre de pending (None pour un CV en échec)
+        """
+        if not pending:
+            return []
+
+        try:
+            return self.entity_extractor.analyze_cvs(
+                [cv_text for _, cv_text, _ in pending],
+                n_process=self.ner_processes
+            )
+        except Exception as e:
+            logger.error(f"Échec de l'analyse groupée, reprise CV par CV: {str(e)}")
+
+        analyses = []
+        for filename, cv_text, _ in pending:
+            try:
+                analyses.append(self.entity_extractor.analyze_cvs([cv_text], n_process=1)[0])
+            except Exception as e:
+                logger.error(f"Échec de l'analyse du CV {filename}: {str(e)}")
+                failed[filename] = "Impossible d'analyser le CV"
+                analyses.append(None)
+        return analyses
+
+    def run(self, job_text, cv_sources, top_k, offset=0, required_skills=None,
+            min_experience_years=None, collapse_duplicates=False, prefilter_size=PREFILTER_SIZE):
+        """
+        Classe un flux de CVs et résume la page demandée.
+
+        Avec un préfiltrage, chaque CV est d'abord noté avec les embeddings
+        statiques (encode_fast); seuls les prefilter_size meilleurs sont encodés
+        par le modèle complet et classés. Les deux familles d'embeddings ne sont
+        jamais comparées entre elles. 'total' compte alors tous les CVs retenus
+        par les filtres et 'ranked' les seuls CVs classés, donc paginables.
+        Sans table d'embeddings statiques (python -m core.encoder), le
+        préfiltrage est ignoré plutôt que distillé pendant la requête.
+
+        Args:
+            job_text (str): Texte de l'offre d'emploi
+            cv_sources (iterable): Tuples (nom du fichier, chemin du fichier, texte du CV)
+            top_k (int): Taille de la page
+            offset (int): Rang du premier candidat de la page
+            required_skills (list, optional): Compétences obligatoires (filtre strict)
+            min_experience_years (int, optional): Expérience minimale (filtre strict)
+            collapse_duplicates (bool): Ne garder que le mieux classé de chaque groupe de quasi-doublons
+            prefilter_size (int): Taille de la shortlist du préfiltrage (0 = pas de préfiltrage)
+
+        Returns:
+            dict: 'match_id', 'total', 'ranked' et 'results' (candidats résumés de la page)
+        """
+        job_embedding = self.encode_job(job_text)
+
+        ranking = []
+        duplicate_of = {}
+        top = TopKCandidates(offset + top_k)
+
+        if prefilter_size > 0 and not self.text_encoder.has_static_embeddings():
+            logger.warning("Préfiltrage ignoré: table des embeddings statiques absente (python -m core.encoder)")
+            prefilter_size = 0
+
+        shortlist = None
+        prefiltered = 0
+        if prefilter_size > 0:
+            shortlist = TopKCandidates(max(prefilter_size, offset + top_k))
+            job_fast_embedding = self.text_encoder.encode_fast(self.text_processor.clean_job_text(job_text))
+
+        screened = self._screen(cv_sources, required_skills, min_experience_years)
+        for position, filename, file_path, cv_text, processed_cv_text, signature, duplicate_key in screened:
+            # Un quasi-doublon réutilise l'embedding du CV connu
+            cv_embedding = None
+            if duplicate_key is not None:
+                cv_embedding = self.duplicate_index.embeddings.get(duplicate_key)
+
+            if shortlist is not None:
+                # Premier étage: seul l'embedding complet éventuel est indexé, jamais l'embedding statique
+                self.index_cv(filename, signature, cv_embedding, canonical=duplicate_key,
+                              digest=self.candidate_store.text_digest(cv_text))
+                # Embeddings normalisés: le produit scalaire est la similarité cosinus
+                fast_similarity = float(np.dot(self.text_encoder.encode_fast(processed_cv_text), job_fast_embedding))
+                shortlist.push(
+                    filename, fast_similarity, fast_similarity,
+                    payload=(position, file_path, cv_text, processed_cv_text, signature, duplicate_key, cv_embedding)
+                )
+                prefiltered += 1
+                continue
+
+            self._rank(filename, file_path, cv_text, processed_cv_text, signature, duplicate_key,
+                       cv_embedding, job_embedding, ranking, top, duplicate_of)
+
+        if shortlist is not None:
+            # Second étage dans l'ordre d'arrivée: même départage des égalités que sans préfiltrage
+            for candidate in sorted(shortlist.results(), key=lambda candidate: candidate['payload'][0]):
+                self._rank(candidate['filename'], *candidate['payload'][1:], job_embedding, ranking, top, duplicate_of)
+            logger.info(f"Préfiltrage: {len(ranking)} CVs réencodés sur {prefiltered}")
+
+        # CVs retenus par les filtres mais écartés par le préfiltrage: comptés, non classés
+        unranked = prefiltered - len(ranking) if shortlist is not None else 0
+
+        # Tri stable par score décroissant, comme CVMatcher.rank_candidates
+        with profile_stage("ranking"):
+            ranking.sort(key=lambda entry: entry['score'], reverse=True)
+            if collapse_duplicates:
+                ranking = CVMatcher.collapse_duplicates(ranking, duplicate_of)
+
+        total = len(ranking) + unranked
+        match_id = self._store_session(job_text, ranking, total)
+        logger.info(f"Matching {match_id}: {len(ranking)} CVs classés sur {total}")
+
+        texts = {candidate['filename']: candidate['payload'] for candidate in top.results()}
+        results = self._summarize(job_text, ranking[offset:offset + top_k], texts)
+
+        return {"match_id": match_id, "total": total, "ranked": len(ranking), "results": results}
+
+    def _screen(self, cv_sources, required_skills=None, min_experience_years=None, batch_size=ANALYSIS_BATCH_SIZE):
+        """
+        Cherche les quasi-doublons d'un flux de CVs et applique les filtres
+        stricts, évalués par lots sur le stockage colonnaire.
+
+        Args:
+            cv_sources (iterable): Tuples (nom du fichier, chemin du fichier, texte du CV)
+            required_skills (list, optional): Compétences obligatoires (filtre strict)
+            min_experience_years (int, optional): Expérience minimale (filtre strict)
+            batch_size (int): Nombre de CVs par évaluation des filtres
+
+        Yields:
+            tuple: (position dans le flux, nom du fichier, chemin, texte brut, texte
+                   nettoyé, signature MinHash, quasi-doublon ou None) des CVs retenus
+        """
+        has_filters = bool(required_skills) or min_experience_years is not None
+        batch = []
+
+        for position, (filename, file_path, cv_text) in enumerate(cv_sources):
+            processed_cv_text = self.text_processor.clean_cv_text(cv_text)
+            signature, duplicate_key = self.find_duplicate(filename, cv_text, processed_cv_text)
+            candidate = (position, filename, file_path, cv_text, processed_cv_text, signature, duplicate_key)
+            if not has_filters:
+                yield candidate
+                continue
+
+            self.analyze(filename, cv_text)
+            batch.append(candidate)
+            if len(batch) >= batch_size:
+                yield from self._apply_filters(batch, required_skills, min_experience_years)
+                batch = []
+
+        if batch:
+            yield from self._apply_filters(batch, required_skills, min_experience_years)
+
+    def _apply_filters(self, batch, required_skills, min_experience_years):
+        """
+        Évalue les filtres stricts en une passe sur un lot de CVs analysés.
+
+        Args:
+            batch (list): Tuples de _screen, dans l'ordre du flux
+            required_skills (list, optional): Compétences obligatoires
+            min_experience_years (int, optional): Expérience minimale
+
+        Returns:
+            list: Tuples des CVs retenus, dans le même ordre
+        """
+        with self.lock:
+            kept = set(self.candidate_store.filter(
+                required_skills=required_skills,
+                min_experience_years=min_experience_years,
+                keys=[candidate[1] for candidate in batch]
+            ))
+        return [candidate for candidate in batch if candidate[1] in kept]
+
+    def _rank(self, filename, file_path, cv_text, processed_cv_text, signature, duplicate_key,
+              cv_embedding, job_embedding, ranking, top, duplicate_of):
+        """
+        Encode (si besoin), indexe et note un CV, puis l'ajoute au classement.
+
+        Args:
+            filename (str): Identifiant du CV
+            file_path (str): Chemin du fichier
+            cv_text (str): Texte brut du CV
+            processed_cv_text (str): Texte nettoyé du CV
+            signature (numpy.ndarray): Signature MinHash du CV
+            duplicate_key (str): Quasi-doublon connu, ou None
+            cv_embedding (numpy.ndarray): Embedding réutilisé du quasi-doublon, ou None
+            job_embedding (numpy.ndarray): Embedding de l'offre
+            ranking (list): Classement compact, complété
+            top (TopKCandidates): Meilleurs candidats et leurs textes, complété
+            duplicate_of (dict): CV canonique de chaque CV classé, complété
+        """
+        if cv_embedding is None:
+            cv_embedding = self.text_encoder.encode_chunks(processed_cv_text)
+
+        with self.lock:
+            self.index_cv(filename, signature, cv_embedding, canonical=duplicate_key,
+                          digest=self.candidate_store.text_digest(cv_text))
+            duplicate_of[filename] = self.duplicate_index.canonical[filename]
+
+        with profile_stage("ranking"):
+            similarity = CVMatcher.calculate_similarity(cv_embedding, job_embedding)
+            score = CVMatcher.similarity_to_score(similarity)
+
+            ranking.append({'filename': filename, 'path': file_path, 'similarity': similarity, 'score': score})
+            top.push(filename, similarity, score, payload=cv_text)
+
+    def run_sharded(self, job_text, file_paths, top_k, offset=0, required_skills=None,
+                    min_experience_years=None, collapse_duplicates=False, shards=2):
+        """
+        Classe des CVs répartis en partitions notées en parallèle par les
+        workers, puis fusionne leurs meilleurs candidats.
+
+        Chaque worker garde ses offset + top_k meilleurs textes: la page
+        demandée en est forcément issue. Le classement, la session, l'index des
+        doublons et le résumé de la seule page demandée sont tenus par le
+        coordinateur, comme dans run. L'appel est bloquant: depuis la boucle
+        d'événements, il passe par un thread (run_in_threadpool).
+
+        Args:
+            job_text (str): Texte de l'offre d'emploi
+            file_paths (list): Tuples (nom du fichier, chemin du fichier)
+            top_k (int): Taille de la page
+            offset (int): Rang du premier candidat de la page
+            required_skills (list, optional): Compétences obligatoires (filtre strict)
+            min_experience_years (int, optional): Expérience minimale (filtre strict)
+            collapse_duplicates (bool): Ne garder que le mieux classé de chaque groupe de quasi-doublons
+            shards (int): Nombre de partitions
+
+        Returns:
+            dict: 'match_id', 'total', 'ranked' et 'results' (candidats résumés de la page)
+        """
+        file_paths = list(file_paths)
+        job_embedding = self.encode_job(job_text)
+
+        known_analyses = {}
+        with self.lock:
+            for filename, _ in file_paths:
+                analysis = self.candidate_store.get(filename)
+                if analysis is not None:
+                    known_analyses[filename] = (self.candidate_store.stored_digest(filename), analysis)
+
+        partitions = self.shard_executor.partition(file_paths, shards)
+        shard_results = self.shard_executor.map(
+            partitions,
+            job_text=job_text,
+            job_embedding=job_embedding,
+            k=offset + top_k,
+            required_skills=required_skills,
+            min_experience_years=min_experience_years,
+            known_analyses=known_analyses,
+            num_perm=self.duplicate_index.num_perm
+        )
+
+        # Fusion dans l'ordre des partitions: même classement qu'un parcours séquentiel
+        ranking = []
+        duplicate_of = {}
+        top = TopKCandidates(offset + top_k)
+
+        # Fusion sous verrou: stockage et index des doublons sont partagés
+        with self.lock:
+            for result in shard_results:
+                for filename, (digest, analysis) in result["analyses"].items():
+                    self.candidate_store.upsert(filename, analysis, digest)
+
+                blank = set(result["blank"])
+                for entry in result["ranking"]:
+                    filename = entry['filename']
+                    signature = result["signatures"][filename]
+                    duplicate_key = None
+                    if filename not in blank:
+                        duplicate_key = self._match_duplicate(filename, signature, result["digests"][filename])
+                    self.index_cv(filename, signature, result["embeddings"][filename], canonical=duplicate_key,
+                                  digest=result["digests"][filename])
+                    duplicate_of[filename] = self.duplicate_index.canonical[filename]
+                    ranking.append(entry)
+
+                for filename, similarity, score, cv_text in result["top"]:
+                    top.push(filename, similarity, score, payload=cv_text)
+
+        with profile_stage("ranking"):
+            ranking.sort(key=lambda entry: entry['score'], reverse=True)
+            if collapse_duplicates:
+                ranking = CVMatcher.collapse_duplicates(ranking, duplicate_of)
+
+        match_id = self._store_session(job_text, ranking, len(ranking))
+        logger.info(f"Matching {match_id}: {len(ranking)} CVs classés sur {len(partitions)} partitions")
+
+        texts = {candidate['filename']: candidate['payload'] for candidate in top.results()}
+        results = self._summarize(job_text, ranking[offset:offset + top_k], texts)
+
+        return {"match_id": match_id, "total": len(ranking), "ranked": len(ranking), "results": results}
+
+    def page(self, match_id, top_k, offset=0):
+        """
+        Résume une page d'un matching déjà classé, en relisant les CVs concernés.
+
+        Args:
+            match_id (str): Identifiant de la session de matching
+            top_k (int): Taille de la page
+            offset (int): Rang du premier candidat de la page
+
+        Returns:
+            dict: 'match_id', 'total', 'ranked' et 'results', ou None si la session a expiré
+        """
+        with self.lock:
+            session = self._sessions.get(match_id)
+            if session is None:
+                return None
+            self._sessions.move_to_end(match_id)
+
+        ranking = session["ranking"]
+        if offset + top_k > len(ranking) and session["total"] > len(ranking):
+            logger.warning(
+                f"Matching {match_id}: page au-delà des {len(ranking)} CVs préfiltrés "
+                f"({session['total']} CVs retenus)"
+            )
+        results = self._summarize(session["job_text"], ranking[offset:offset + top_k], {})
+
+        return {"match_id": match_id, "total": session["total"], "ranked": len(ranking), "results": results}
+
+    def _store_session(self, job_text, ranking, total):
+        """
+        Conserve le classement compact d'un matching (cache LRU borné).
+
+        Args:
+            job_text (str): Texte de l'offre
+            ranking (list): Classement (dictionnaires 'filename', 'path', 'similarity', 'score')
+            total (int): Nombre de CVs retenus, classés ou non (préfiltrage)
+
+        Returns:
+            str: Identifiant de la session
+        """
+        match_id = uuid.uuid4().hex
+        with self.lock:
+            self._sessions[match_id] = {"job_text": job_text, "ranking": ranking, "total": total}
+            while len(self._sessions) > self.session_cache_size:
+                self._sessions.popitem(last=False)
+        return match_id
+
+    def _summarize(self, job_text, entries, texts):
+        """
+        Génère les résumés d'une page de candidats.
+
+        Args:
+            job_text (str): Texte de l'offre
+            entries (list): Candidats de la page (dictionnaires du classement)
+            texts (dict): Textes déjà en mémoire; les autres sont relus depuis le disque
+
+        Returns:
+            list: Résumés (dict) avec les clés 'filename', 'score', 'summary' et 'duplicates';
+                  'summary' vaut None et 'error' est renseigné pour un CV devenu illisible
+        """
+        results = []
+        # Compétences de l'offre extraites une fois par page, hors verrou
+        job_skills = self.entity_extractor.extract_skills(job_text) if entries else []
+
+        for entry in entries:
+            filename = entry['filename']
+            cv_text = texts.get(filename) or CVExtractor.extract_text(entry['path'])
+            # Analyse calculée hors verrou: le résumé ne fait plus que la relire
+            if self.analyze(filename, cv_text) is None:
+                # Fichier modifié ou supprimé depuis le classement, sans analyse à réutiliser
+                logger.error(f"{filename}: CV illisible, pas de résumé")
+                results.append({
+                    "filename": filename,
+                    "score": entry['score'],
+                    "summary": None,
+                    "error": "Impossible de relire le CV",
+                    "duplicates": entry.get('duplicates', [])
+                })
+                continue
+            with self.lock, profile_stage("summary"):
+                summary = self.match_summarizer.generate_summary(
+                    cv_text,
+                    job_text,
+                    entry['similarity'],
+                    entry['score'],
+                    cv_key=filename,
+                    job_skills=job_skills
+                )
+            results.append({
+                "filename": filename,
+                "score": entry['score'],
+                "summary": summary,
+                "duplicates": entry.get('duplicates', [])
+            })
+
+        self.persist()
+
+        return results
+
+    @_locked
+    def persist(self, force=False):
+        """
+        Sauvegarde le stockage des candidats et les index s'ils ont changé, au
+        plus une fois par persist_interval secondes.
+
+        Args:
+            force (bool): Sauvegarder sans attendre (arrêt de l'application)
+        """
+        now = time.monotonic()
+        if not force and now - self._last_persist < self.persist_interval:
+            return
+        self._last_persist = now
+
+        if self.candidate_store.dirty:
+            self.candidate_store.save()
+        if self.duplicate_index.dirty:
+            self.duplicate_index.save()
+        if self.ann_index is not None and self.ann_index.dirty:
+            self.ann_index.save()
@@ -0,0 +1,214 @@
+"""
+Module de planification des ressources CPU entre les pools de calcul du service.
+"""
+import os
+import sys
+import logging
+from config import (
+    RESOURCE_POLICY, RESOURCE_POLICIES, EXTRACTION_WORKERS, NER_PROCESSES, API_WORKERS, SHARD_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# Racine du système de fichiers cgroup
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read_first_line(path):
+    """
+    Lit la première ligne d'un fichier, ou None s'il est illisible.
+
+    Args:
+        path (str): Chemin du fichier
+
+    Returns:
+        str: Première ligne sans espaces de fin, ou None
+    """
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_paths(proc_cgroup="/proc/self/cgroup"):
+    """
+    Retourne les chemins cgroup du processus, par contrôleur.
+
+    Args:
+        proc_cgroup (str): Fichier décrivant les cgroups du processus
+
+    Returns:
+        dict: Contrôleur ("" pour cgroup v2) -> chemin relatif à la racine cgroup
+    """
+    paths = {}
+    try:
+        with open(proc_cgroup) as f:
+            for line in f:
+                parts = line.strip().split(":", 2)
+                if len(parts) == 3:
+                    for controller in parts[1].split(","):
+                        paths[controller] = parts[2].lstrip("/")
+    except OSError:
+        pass
+    return paths
+
+
+def cgroup_cpu_quota(cgroup_root=CGROUP_ROOT, proc_cgroup="/proc/self/cgroup"):
+    """
+    Lit le quota CPU imposé par les cgroups (v2: cpu.max, v1: cpu.cfs_quota_us).
+
+    Args:
+        cgroup_root (str): Racine du système de fichiers cgroup
+        proc_cgroup (str): Fichier décrivant les cgroups du processus
+
+    Returns:
+        float: Nombre de CPUs alloués par le quota, ou None si aucun quota
+    """
+    paths = _cgroup_paths(proc_cgroup)
+
+    # cgroup v2: "quota période" ou "max période"
+    for directory in (os.path.join(cgroup_root, paths.get("", "")), cgroup_root):
+        line = _read_first_line(os.path.join(directory, "cpu.max"))
+        if line:
+            quota, _, period = line.partition(" ")
+            if quota == "max":
+                return None
+            return int(quota) / int(period or 100000)
+
+    # cgroup v1: quota et période en microsecondes (-1 = illimité)
+    for mount in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+        for directory in (os.path.join(cgroup_root, mount, paths.get("cpu", "")),
+                          os.path.join(cgroup_root, mount)):
+            quota = _read_first_line(os.path.join(directory, "cpu.cfs_quota_us"))
+            period = _read_first_line(os.path.join(directory, "cpu.cfs_period_us"))
+            if quota and period:
+                if int(quota) <= 0:
+                    return None
+                return int(quota) / int(period)
+
+    return None
+
+
+def detect_cpus(cgroup_root=CGROUP_ROOT, proc_cgroup="/proc/self/cgroup"):
+    """
+    Détecte les CPUs réellement utilisables par le processus.
+
+    Args:
+        cgroup_root (str): Racine du système de fichiers cgroup
+        proc_cgroup (str): Fichier décrivant les cgroups du processus
+
+    Returns:
+        dict: 'available' (CPUs utilisables), 'affinity' (CPUs autorisés par
+              sched_getaffinity), 'cgroup_quota' (quota en CPUs ou None) et
+              'os' (CPUs de la machine)
+    """
+    machine = os.cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        affinity = len(os.sched_getaffinity(0))
+    else:
+        affinity = machine
+
+    quota = cgroup_cpu_quota(cgroup_root, proc_cgroup)
+    available = affinity if quota is None else max(1, min(affinity, int(quota)))
+
+    return {"available": available, "affinity": affinity, "cgroup_quota": quota, "os": machine}
+
+
+def plan_resources(policy=RESOURCE_POLICY, cpus=None, shard_workers=SHARD_WORKERS):
+    """
+    Répartit les CPUs entre les workers uvicorn et, dans chaque worker, entre
+    l'encodeur (threads torch), spaCy (processus nlp.pipe) et l'extraction.
+
+    L'encodage et l'analyse spaCy s'enchaînent dans une requête: ils partagent
+    le budget de calcul du worker. L'extraction tourne en parallèle dans son
+    pool de processus: sa part est retirée de ce budget.
+
+    Le nombre de workers uvicorn du plan n'est appliqué que par le lancement
+    `python app.py`; un serveur démarré autrement garde son propre réglage.
+
+    Les processus du matching partitionné chargent chacun leurs modèles: ils
+    ne sont prévus que s'ils sont demandés (shard_workers) ou si une politique
+    donne plusieurs CPUs à chaque worker uvicorn.
+
+    Args:
+        policy (str): Nom d'une politique de RESOURCE_POLICIES, ou "none" pour
+                      laisser chaque pool se dimensionner seul (configuration)
+        cpus (dict, optional): Résultat de detect_cpus (détecté si absent)
+        shard_workers (int): Processus du matching partitionné demandés (0 = selon la politique)
+
+    Returns:
+        dict: Plan avec 'policy', 'cpus', 'serving_workers', 'cpus_per_worker',
+              'encoder_threads', 'ner_processes', 'extraction_workers' et
+              'shard_workers' (0 = matching partitionné désactivé)
+    """
+    cpus = cpus or detect_cpus()
+    available = cpus["available"]
+
+    if policy == "none":
+        # Dimensionnement indépendant: torch prend par défaut tous les CPUs visibles
+        return {
+            "policy": policy,
+            "cpus": cpus,
+            "serving_workers": API_WORKERS,
+            "cpus_per_worker": available,
+            "encoder_threads": cpus["affinity"],
+            "ner_processes": NER_PROCESSES,
+            "extraction_workers": EXTRACTION_WORKERS,
+            "shard_workers": shard_workers
+        }
+
+    if policy not in RESOURCE_POLICIES:
+        raise ValueError(f"Politique de ressources inconnue: {policy}")
+    settings = RESOURCE_POLICIES[policy]
+
+    cpus_per_worker = settings["cpus_per_worker"]
+    serving_workers = 1 if cpus_per_worker is None else max(1, available // cpus_per_worker)
+    budget = max(1, available // serving_workers)
+
+    # Une extraction à 1 worker est séquentielle, dans le processus du worker
+    extraction_workers = max(1, round(budget * settings["extraction_share"]))
+    compute = budget - extraction_workers if extraction_workers > 1 else budget
+    compute = max(1, compute)
+    ner_processes = max(1, round(compute * settings["ner_share"]))
+
+    return {
+        "policy": policy,
+        "cpus": cpus,
+        "serving_workers": serving_workers,
+        "cpus_per_worker": budget,
+        "encoder_threads": compute,
+        "ner_processes": ner_processes,
+        "extraction_workers": extraction_workers,
+        "shard_workers": shard_workers or (budget if budget > 1 else 0)
+    }
+
+
+def apply_plan(plan):
+    """
+    Applique un plan au processus courant (threads torch et bibliothèques BLAS).
+
+    Les pools spaCy et d'extraction reçoivent leur taille du plan à leur
+    création; les processus enfants héritent des limites de threads.
+
+    Args:
+        plan (dict): Plan produit par plan_resources
+    """
+    if plan["policy"] == "none":
+        return
+
+    threads = str(plan["encoder_threads"])
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(variable, threads)
+
+    # torch lit OMP_NUM_THREADS à son import; s'il est déjà chargé, on l'ajuste directement
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(plan["encoder_threads"])
+
+    logger.info(
+        f"Plan de ressources '{plan['policy']}': {plan['cpus']['available']} CPUs, "
+        f"{plan['serving_workers']} worker(s) de {plan['cpus_per_worker']} CPU(s), "
+        f"encodeur {plan['encoder_threads']} thread(s), spaCy {plan['ner_processes']} processus, "
+        f"extraction {plan['extraction_workers']} processus"
+    )
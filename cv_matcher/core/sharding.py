@@ -0,0 +1,268 @@
+"""
+Module de matching partitionné: chaque partition de CVs est notée dans un processus worker.
+"""
+import sys
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from core.extractor import CVExtractor
+from core.matcher import CVMatcher, TopKCandidates
+from core.store import CandidateStore
+from core.dedup import MinHasher
+from config import MINHASH_PERMUTATIONS, ANALYSIS_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Composants du worker (TextProcessor, TextEncoder, EntityExtractor), chargés
+# par le worker lui-même: un fork après le chargement de torch ou de spaCy
+# (pools de threads OpenMP) peut bloquer les processus enfants.
+_components = None
+
+
+def build_components(spacy_model, stub_backends):
+    """
+    Charge les composants d'un worker.
+
+    Args:
+        spacy_model (str): Modèle spaCy de l'extracteur d'entités
+        stub_backends (bool): Utiliser l'encodeur bouchon plutôt que Sentence-BERT
+
+    Returns:
+        dict: 'text_processor', 'text_encoder' et 'entity_extractor'
+    """
+    from core.processor import TextProcessor
+    from utils.ner import EntityExtractor
+    if stub_backends:
+        from benchmarks.stubs import StubTextEncoder as TextEncoder
+    else:
+        from core.encoder import TextEncoder
+
+    return {
+        "text_processor": TextProcessor(),
+        "text_encoder": TextEncoder(),
+        "entity_extractor": EntityExtractor(spacy_model)
+    }
+
+
+def _init_worker(spacy_model, stub_backends, encoder_threads):
+    """
+    Initialise un processus worker.
+
+    Args:
+        spacy_model (str): Modèle spaCy de l'extracteur d'entités
+        stub_backends (bool): Utiliser l'encodeur bouchon plutôt que Sentence-BERT
+        encoder_threads (int): Threads torch du worker
+    """
+    global _components
+    _components = build_components(spacy_model, stub_backends)
+
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(encoder_threads)
+
+
+def score_shard(shard, job_text, job_embedding, k, required_skills=None, min_experience_years=None,
+                known_analyses=None, num_perm=MINHASH_PERMUTATIONS):
+    """
+    Extrait, encode et note une partition de CVs, en ne gardant que ses k meilleurs textes.
+
+    Args:
+        shard (list): Tuples (nom du fichier, chemin du fichier) de la partition
+        job_text (str): Texte de l'offre d'emploi
+        job_embedding (numpy.ndarray): Embedding de l'offre
+        k (int): Nombre de meilleurs candidats conservés (offset + top_k)
+        required_skills (list, optional): Compétences obligatoires (filtre strict)
+        min_experience_years (int, optional): Expérience minimale (filtre strict)
+        known_analyses (dict, optional): Analyses déjà stockées {nom: (empreinte, analyse)}
+        num_perm (int): Longueur des signatures MinHash
+
+    Returns:
+        dict: 'ranking' (classement compact, dans l'ordre de la partition), 'top'
+              (tuples (nom, similarité, score, texte) des k meilleurs), 'signatures',
+              'embeddings', 'digests', 'blank' (CVs sans texte exploitable,
+              exclus de la détection des doublons) et 'analyses' (analyses calculées)
+    """
+    text_processor = _components["text_processor"]
+    text_encoder = _components["text_encoder"]
+    entity_extractor = _components["entity_extractor"]
+
+    known_analyses = known_analyses or {}
+    store = CandidateStore(path=None)
+    for filename, (digest, analysis) in known_analyses.items():
+        store.upsert(filename, analysis, digest)
+
+    minhasher = MinHasher(num_perm)
+    has_filters = bool(required_skills) or min_experience_years is not None
+
+    ranking = []
+    signatures, embeddings, digests = {}, {}, {}
+    blank = []
+    top = TopKCandidates(k)
+
+    def screened():
+        # Filtres stricts évalués par lots sur le stockage colonnaire
+        batch = []
+        for filename, file_path, cv_text in CVExtractor.iter_from_paths(shard, max_workers=1):
+            digests[filename] = store.text_digest(cv_text)
+            if not has_filters:
+                yield filename, file_path, cv_text
+                continue
+
+            store.get_or_analyze(filename, cv_text, entity_extractor)
+            batch.append((filename, file_path, cv_text))
+            if len(batch) >= ANALYSIS_BATCH_SIZE:
+                yield from apply_filters(batch)
+                batch = []
+        yield from apply_filters(batch)
+
+    def apply_filters(batch):
+        if not batch:
+            return []
+        kept = set(store.filter(
+            required_skills=required_skills,
+            min_experience_years=min_experience_years,
+            keys=[filename for filename, _, _ in batch]
+        ))
+        return [candidate for candidate in batch if candidate[0] in kept]
+
+    for filename, file_path, cv_text in screened():
+        processed_cv_text = text_processor.clean_cv_text(cv_text)
+
+        cv_embedding = text_encoder.encode_chunks(processed_cv_text)
+        signatures[filename] = minhasher.signature(processed_cv_text)
+        if not processed_cv_text.strip():
+            blank.append(filename)
+        embeddings[filename] = cv_embedding
+
+        similarity = CVMatcher.calculate_similarity(cv_embedding, job_embedding)
+        score = CVMatcher.similarity_to_score(similarity)
+        ranking.append({'filename': filename, 'path': file_path, 'similarity': similarity, 'score': score})
+        top.push(filename, similarity, score, payload=cv_text)
+
+    candidates = top.results()
+
+    # Analyses nouvelles ou recalculées, à reporter dans le stockage du coordinateur
+    analyses = {
+        filename: (store.stored_digest(filename), store.get(filename))
+        for filename in store.keys
+        if known_analyses.get(filename, (None,))[0] != store.stored_digest(filename)
+    }
+
+    return {
+        "ranking": ranking,
+        "top": [(c['filename'], c['similarity'], c['score'], c['payload']) for c in candidates],
+        "signatures": signatures,
+        "embeddings": embeddings,
+        "digests": digests,
+        "blank": blank,
+        "analyses": analyses
+    }
+
+
+class ShardExecutor:
+    """
+    Pool de processus qui note des partitions de CVs en parallèle.
+
+    Les partitions sont contiguës: en les fusionnant dans l'ordre, le classement
+    obtenu est identique à celui d'un parcours séquentiel (même départage des
+    égalités par ordre d'arrivée).
+
+    Les workers sont créés par fork et chargent leurs propres composants:
+    start() doit être appelé avant le chargement des modèles dans le parent.
+    """
+
+    def __init__(self, max_workers, spacy_model, stub_backends=False, encoder_threads=1):
+        """
+        Initialise l'exécuteur (le pool est créé par start ou à la première utilisation).
+
+        Args:
+            max_workers (int): Nombre de processus workers
+            spacy_model (str): Modèle spaCy des workers
+            stub_backends (bool): Utiliser l'encodeur bouchon dans les workers
+            encoder_threads (int): Threads torch par worker
+        """
+        self.max_workers = max_workers
+        self.spacy_model = spacy_model
+        self.stub_backends = stub_backends
+        self.encoder_threads = encoder_threads
+        self._pool = None
+
+    @staticmethod
+    def partition(file_paths, shards):
+        """
+        Découpe une liste de fichiers en partitions contiguës de tailles équilibrées.
+
+        Args:
+            file_paths (list): Tuples (nom du fichier, chemin du fichier)
+            shards (int): Nombre de partitions
+
+        Returns:
+            list: Partitions non vides, dans l'ordre des fichiers
+        """
+        shards = max(1, min(shards, len(file_paths)))
+        size, extra = divmod(len(file_paths), shards)
+        partitions, start = [], 0
+        for i in range(shards):
+            end = start + size + (1 if i < extra else 0)
+            partitions.append(file_paths[start:end])
+            start = end
+        return [shard for shard in partitions if shard]
+
+    def start(self):
+        """
+        Crée le pool et démarre tous ses workers immédiatement.
+
+        Avec fork, ProcessPoolExecutor lance tous ses processus à la première
+        soumission: une tâche vide les crée tant que le parent n'a encore
+        chargé aucun modèle.
+        """
+        pool = self._get_pool()
+        pool.submit(int).result()
+        logger.info(f"Matching partitionné: {self.max_workers} worker(s) démarré(s)")
+
+    def _get_pool(self):
+        """
+        Retourne le pool de workers (créé à la demande).
+
+        Returns:
+            ProcessPoolExecutor: Pool de workers
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=(self.spacy_model, self.stub_backends, self.encoder_threads)
+            )
+        return self._pool
+
+    def map(self, shards, **kwargs):
+        """
+        Note chaque partition dans un worker.
+
+        Args:
+            shards (list): Partitions produites par partition()
+            **kwargs: Paramètres de score_shard (hors partition); 'known_analyses'
+                      est restreint aux CVs de chaque partition
+
+        Returns:
+            list: Résultats de score_shard, dans l'ordre des partitions
+        """
+        known_analyses = kwargs.pop("known_analyses", None) or {}
+        pool = self._get_pool()
+        futures = [
+            pool.submit(
+                score_shard,
+                shard,
+                known_analyses={f: known_analyses[f] for f, _ in shard if f in known_analyses},
+                **kwargs
+            )
+            for shard in shards
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Arrête le pool de workers."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,414 @@
+"""
+Module de lecture des CVs déjà stockés, désignés par une clé (stockage objet ou local).
+"""
+import os
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from config import (
+    DOCUMENT_STORE, DOCUMENT_STORE_ROOT, DOCUMENT_STORE_URL,
+    DOCUMENT_FETCH_WORKERS, DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentStoreError(Exception):
+    """Le stockage de documents est injoignable ou a répondu en erreur."""
+
+
+class DocumentReader:
+    """
+    Interface de lecture des documents stockés.
+
+    Une implémentation fournit `etag` et `read`. `fetch` rend le document
+    disponible sous forme de fichier local (nécessaire à CVExtractor), dans un
+    cache indexé par (clé, ETag): un document inchangé n'est téléchargé qu'une
+    fois, et le cache d'extraction de texte reste valide pour lui. La taille
+    du cache est bornée: les copies les moins récemment utilisées sont
+    supprimées après chaque écriture.
+    """
+
+    def __init__(self, cache_dir=DOCUMENT_CACHE_DIR, max_workers=DOCUMENT_FETCH_WORKERS,
+                 cache_max_bytes=DOCUMENT_CACHE_MAX_BYTES):
+        """
+        Initialise le lecteur.
+
+        Args:
+            cache_dir (str): Répertoire des copies locales des documents
+            max_workers (int): Nombre de lectures simultanées dans fetch_many
+            cache_max_bytes (int): Taille maximale du cache en octets
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.cache_max_bytes = cache_max_bytes
+        self._cache_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def etag(self, key):
+        """
+        Retourne la version courante d'un document.
+
+        Args:
+            key (str): Clé du document
+
+        Returns:
+            str: ETag du document, ou None s'il n'existe pas
+        """
+        raise NotImplementedError
+
+    def read(self, key):
+        """
+        Lit le contenu d'un document.
+
+        Args:
+            key (str): Clé du document
+
+        Returns:
+            bytes: Contenu du document
+        """
+        raise NotImplementedError
+
+    def _cache_path(self, key, etag):
+        """
+        Calcule le chemin de la copie locale d'une version de document.
+
+        Args:
+            key (str): Clé du document
+            etag (str): Version du document
+
+        Returns:
+            str: Chemin du fichier (l'extension de la clé est conservée)
+        """
+        name = hashlib.sha1(f"{key}\0{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + os.path.splitext(key)[1].lower())
+
+    def _write_cache(self, path, content):
+        """
+        Écrit une copie locale de manière atomique.
+
+        Args:
+            path (str): Chemin du fichier
+            content (bytes): Contenu du document
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self._evict_cache(keep=path)
+
+    def _touch_cache(self, path):
+        """
+        Marque une copie locale comme récemment utilisée.
+
+        Args:
+            path (str): Chemin du fichier
+        """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict_cache(self, keep=None):
+        """
+        Supprime les copies locales les moins récemment utilisées jusqu'à
+        repasser sous cache_max_bytes.
+
+        Args:
+            keep (str): Chemin à conserver (copie qui vient d'être écrite)
+        """
+        with self._cache_lock:
+            entries = []
+            total = 0
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or entry.name.endswith(".tmp"):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.cache_max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def fetch(self, key):
+        """
+        Rend un document disponible sous forme de fichier local.
+
+        Args:
+            key (str): Clé du document
+
+        Returns:
+            str: Chemin du fichier local, ou None si le document n'existe pas
+        """
+        etag = self.etag(key)
+        if etag is None:
+            logger.error(f"Le document {key} n'existe pas")
+            return None
+
+        path = self._cache_path(key, etag)
+        if os.path.exists(path):
+            self._touch_cache(path)
+        else:
+            self._write_cache(path, self.read(key))
+        return path
+
+    def _safe_fetch(self, key):
+        """
+        Variante de fetch qui journalise les erreurs propres à un document au
+        lieu de les propager. Une erreur du stockage lui-même est propagée.
+
+        Args:
+            key (str): Clé du document
+
+        Returns:
+            str: Chemin du fichier local, ou None en cas d'échec
+
+        Raises:
+            DocumentStoreError: Si le stockage est injoignable ou en erreur
+        """
+        try:
+            return self.fetch(key)
+        except DocumentStoreError:
+            raise
+        except Exception as e:
+            logger.error(f"Échec de la lecture du document {key}: {str(e)}")
+            return None
+
+    def _get_pool(self):
+        """
+        Retourne le pool de threads de lecture (créé à la demande).
+
+        Returns:
+            ThreadPoolExecutor: Pool partagé par les appels à fetch_many
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def fetch_many(self, keys):
+        """
+        Rend plusieurs documents disponibles localement, avec des lectures
+        simultanées en nombre borné.
+
+        Args:
+            keys (iterable): Clés des documents
+
+        Yields:
+            tuple: (clé, chemin du fichier local ou None), dans l'ordre des clés
+
+        Raises:
+            DocumentStoreError: Si le stockage est injoignable ou en erreur
+        """
+        if self.max_workers <= 1:
+            for key in keys:
+                yield key, self._safe_fetch(key)
+            return
+
+        pool = self._get_pool()
+        pending = deque()
+
+        for key in keys:
+            pending.append((key, pool.submit(self._safe_fetch, key)))
+            if len(pending) >= 2 * self.max_workers:
+                key, future = pending.popleft()
+                yield key, future.result()
+
+        while pending:
+            key, future = pending.popleft()
+            yield key, future.result()
+
+    def close(self):
+        """Libère le pool de lecture."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+class LocalDocumentReader(DocumentReader):
+    """
+    Lecteur de documents sur le système de fichiers, en remplacement local du
+    stockage objet. Les clés sont des chemins relatifs à un répertoire racine.
+    """
+
+    def __init__(self, root=DOCUMENT_STORE_ROOT, **kwargs):
+        """
+        Initialise le lecteur.
+
+        Args:
+            root (str): Répertoire racine des documents
+            **kwargs: Paramètres de DocumentReader (cache_dir, max_workers)
+        """
+        super().__init__(**kwargs)
+        self.root = os.path.abspath(root)
+
+    def resolve(self, key):
+        """
+        Convertit une clé en chemin sous le répertoire racine.
+
+        Args:
+            key (str): Clé du document
+
+        Returns:
+            str: Chemin absolu du document
+
+        Raises:
+            ValueError: Si la clé sort du répertoire racine
+        """
+        path = os.path.abspath(os.path.join(self.root, key.lstrip("/\\")))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Clé de document invalide: {key}")
+        return path
+
+    def etag(self, key):
+        try:
+            stat = os.stat(self.resolve(key))
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def read(self, key):
+        with open(self.resolve(key), "rb") as f:
+            return f.read()
+
+    def fetch(self, key):
+        # Le fichier est déjà local: pas de copie, le cache d'extraction
+        # l'indexe directement par (chemin, date de modification, taille)
+        path = self.resolve(key)
+        if not os.path.isfile(path):
+            logger.error(f"Le document {key} n'existe pas")
+            return None
+        return path
+
+
+class HTTPDocumentReader(DocumentReader):
+    """
+    Lecteur de documents servis en HTTP (stockage objet compatible S3 derrière
+    une URL de base). Un client httpx unique garde les connexions ouvertes
+    entre les requêtes, et les documents déjà en cache sont revalidés par une
+    requête conditionnelle (If-None-Match) sans être retéléchargés.
+    """
+
+    def __init__(self, base_url=DOCUMENT_STORE_URL, timeout=30.0, **kwargs):
+        """
+        Initialise le lecteur.
+
+        Args:
+            base_url (str): URL de base du stockage (la clé y est ajoutée)
+            timeout (float): Délai maximal d'une requête en secondes
+            **kwargs: Paramètres de DocumentReader (cache_dir, max_workers)
+        """
+        import httpx
+
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max(self.max_workers, 1),
+                max_keepalive_connections=max(self.max_workers, 1)
+            )
+        )
+        # Dernier ETag connu par clé
+        self._etags = {}
+
+    def _url(self, key):
+        return f"{self.base_url}/{quote(key.lstrip('/'))}"
+
+    def _request(self, method, key, headers=None):
+        """
+        Envoie une requête au stockage.
+
+        Args:
+            method (str): Méthode HTTP
+            key (str): Clé du document
+            headers (dict): En-têtes de la requête
+
+        Returns:
+            httpx.Response: Réponse (404 et 304 sont laissés à l'appelant)
+
+        Raises:
+            DocumentStoreError: Si le stockage est injoignable ou répond en erreur
+        """
+        import httpx
+
+        try:
+            response = self.client.request(method, self._url(key), headers=headers)
+            if response.status_code not in (304, 404):
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise DocumentStoreError(f"Échec de la lecture du document {key}: {str(e)}") from e
+        return response
+
+    def etag(self, key):
+        response = self._request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        return response.headers.get("etag", "").strip('"') or None
+
+    def read(self, key):
+        response = self._request("GET", key)
+        if response.status_code == 404:
+            raise FileNotFoundError(f"Le document {key} n'existe plus")
+        return response.content
+
+    def fetch(self, key):
+        headers = {}
+        known_etag = self._etags.get(key)
+        if known_etag is not None and os.path.exists(self._cache_path(key, known_etag)):
+            headers["If-None-Match"] = f'"{known_etag}"'
+
+        response = self._request("GET", key, headers=headers)
+        if response.status_code == 304:
+            path = self._cache_path(key, known_etag)
+            self._touch_cache(path)
+            return path
+        if response.status_code == 404:
+            logger.error(f"Le document {key} n'existe pas")
+            return None
+
+        etag = response.headers.get("etag", "").strip('"') or hashlib.sha1(response.content).hexdigest()
+        path = self._cache_path(key, etag)
+        if os.path.exists(path):
+            self._touch_cache(path)
+        else:
+            self._write_cache(path, response.content)
+        self._etags[key] = etag
+        return path
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+def create_document_reader(backend=DOCUMENT_STORE):
+    """
+    Crée le lecteur de documents configuré.
+
+    Args:
+        backend (str): "local" (système de fichiers) ou "http" (stockage objet)
+
+    Returns:
+        DocumentReader: Lecteur de documents
+    """
+    if backend == "local":
+        return LocalDocumentReader()
+    if backend == "http":
+        return HTTPDocumentReader()
+    raise ValueError(f"Stockage de documents inconnu: {backend}")
@@ -0,0 +1,402 @@
+"""
+Module de stockage colonnaire des attributs extraits des CVs.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from config import COMPETENCES_PATTERNS, CANDIDATE_STORE_PATH, SKILL_TAXONOMY_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Niveaux d'expérience, dans l'ordre de leur code numérique
+EXPERIENCE_LEVELS = ["débutant", "confirmé", "expert"]
+
+# Nombre de compétences encodées par mot du bitset
+WORD_BITS = 64
+
+
+class CandidateStore:
+    """
+    Stockage colonnaire (NumPy) des analyses de CV.
+
+    Chaque CV occupe une ligne. Les compétences sont encodées en bitsets sur la
+    taxonomie de compétences, ce qui permet d'évaluer les filtres stricts sur
+    tout le vivier avec des opérations bit à bit vectorisées.
+
+    Seule l'indexation des CVs (upsert) étend la taxonomie, dans la limite de
+    max_skills; les compétences des offres et des filtres sont cherchées en
+    lecture seule, une compétence inconnue n'étant détenue par aucun CV.
+    """
+
+    def __init__(self, taxonomy=None, path=CANDIDATE_STORE_PATH, capacity=64, max_skills=SKILL_TAXONOMY_MAX_SIZE):
+        """
+        Initialise un stockage vide.
+
+        Args:
+            taxonomy (list, optional): Compétences initiales de la taxonomie
+            path (str): Chemin du fichier de persistance (.npz)
+            capacity (int): Nombre de lignes pré-allouées
+            max_skills (int): Taille maximale de la taxonomie
+        """
+        self.path = path
+        self.dirty = False
+        self.max_skills = max_skills
+
+        # Taxonomie: index de bit <-> compétence
+        self.skills = []
+        self.skill_index = {}
+
+        # Lignes: index <-> clé du CV
+        self.keys = []
+        self.key_index = {}
+
+        # Colonnes
+        self._bits = np.zeros((capacity, 1), dtype=np.uint64)
+        self._years = np.full(capacity, -1, dtype=np.int32)
+        self._levels = np.zeros(capacity, dtype=np.int8)
+        self._education = []
+        self._digests = []
+
+        for skill in (taxonomy if taxonomy is not None else COMPETENCES_PATTERNS):
+            self._skill_bit(skill)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.key_index
+
+    @staticmethod
+    def text_digest(text):
+        """
+        Calcule l'empreinte d'un texte de CV, utilisée pour détecter les modifications.
+
+        Args:
+            text (str): Texte du CV
+
+        Returns:
+            str: Empreinte hexadécimale
+        """
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _skill_bit(self, skill):
+        """
+        Retourne l'index de bit d'une compétence, en l'ajoutant à la taxonomie si besoin.
+
+        Args:
+            skill (str): Compétence
+
+        Returns:
+            int: Index de bit, ou None si la taxonomie est pleine
+        """
+        skill = skill.lower()
+        bit = self.skill_index.get(skill)
+        if bit is None:
+            if len(self.skills) >= self.max_skills:
+                logger.warning(f"Taxonomie pleine ({self.max_skills} compétences): '{skill}' ignorée")
+                return None
+            bit = len(self.skills)
+            self.skills.append(skill)
+            self.skill_index[skill] = bit
+
+            # Élargir les bitsets si la taxonomie dépasse leur largeur
+            n_words = bit // WORD_BITS + 1
+            if n_words > self._bits.shape[1]:
+                extra = np.zeros((self._bits.shape[0], n_words - self._bits.shape[1]), dtype=np.uint64)
+                self._bits = np.hstack([self._bits, extra])
+        return bit
+
+    def _ensure_capacity(self, rows):
+        """
+        Agrandit les colonnes pour contenir au moins `rows` lignes.
+
+        Args:
+            rows (int): Nombre de lignes requis
+        """
+        capacity = self._bits.shape[0]
+        if rows <= capacity:
+            return
+
+        new_capacity = max(rows, capacity * 2)
+        extra = new_capacity - capacity
+        self._bits = np.vstack([self._bits, np.zeros((extra, self._bits.shape[1]), dtype=np.uint64)])
+        self._years = np.concatenate([self._years, np.full(extra, -1, dtype=np.int32)])
+        self._levels = np.concatenate([self._levels, np.zeros(extra, dtype=np.int8)])
+
+    def encode_skills(self, skills, extend=True):
+        """
+        Encode une liste de compétences en bitset.
+
+        Args:
+            skills (list): Liste de compétences
+            extend (bool): Ajouter les compétences inconnues à la taxonomie
+                           (sinon, elles sont ignorées)
+
+        Returns:
+            numpy.ndarray: Bitset (uint64) sur la taxonomie
+        """
+        if extend:
+            bits = [self._skill_bit(skill) for skill in skills]
+        else:
+            bits = [self.skill_index.get(skill.lower()) for skill in skills]
+        mask = np.zeros(self._bits.shape[1], dtype=np.uint64)
+        for bit in bits:
+            if bit is not None:
+                mask[bit // WORD_BITS] |= np.uint64(1) << np.uint64(bit % WORD_BITS)
+        return mask
+
+    def unknown_skills(self, skills):
+        """
+        Retourne les compétences absentes de la taxonomie.
+
+        Args:
+            skills (list): Liste de compétences
+
+        Returns:
+            list: Compétences inconnues (en minuscules), dans l'ordre donné
+        """
+        return [skill.lower() for skill in skills if skill.lower() not in self.skill_index]
+
+    def decode_skills(self, mask):
+        """
+        Décode un bitset en liste de compétences (dans l'ordre de la taxonomie).
+
+        Args:
+            mask (numpy.ndarray): Bitset (uint64)
+
+        Returns:
+            list: Liste des compétences
+        """
+        flags = np.unpackbits(mask.astype("<u8").view(np.uint8), bitorder="little")
+        return [self.skills[bit] for bit in np.flatnonzero(flags) if bit < len(self.skills)]
+
+    def upsert(self, key, analysis, digest=None):
+        """
+        Ajoute ou remplace l'analyse d'un CV.
+
+        Args:
+            key (str): Identifiant du CV (nom de fichier)
+            analysis (dict): Résultat de EntityExtractor.analyze_cv
+            digest (str, optional): Empreinte du texte analysé
+
+        Returns:
+            int: Index de la ligne
+        """
+        row = self.key_index.get(key)
+        if row is None:
+            row = len(self.keys)
+            self._ensure_capacity(row + 1)
+            self.keys.append(key)
+            self.key_index[key] = row
+            self._education.append([])
+            self._digests.append("")
+
+        mask = self.encode_skills(analysis["skills"])
+        self._bits[row] = mask
+        years = analysis["experience_years"]
+        self._years[row] = -1 if years is None else years
+        self._levels[row] = EXPERIENCE_LEVELS.index(analysis["experience_level"])
+        self._education[row] = list(analysis["education"] or [])
+        self._digests[row] = digest or ""
+        self.dirty = True
+
+        return row
+
+    def copy(self, source_key, key, digest=None):
+        """
+        Réutilise l'analyse d'un CV pour un autre (ex. un quasi-doublon).
+
+        Args:
+            source_key (str): CV dont l'analyse est copiée
+            key (str): CV destinataire
+            digest (str, optional): Empreinte du texte du CV destinataire
+
+        Returns:
+            int: Index de la ligne, ou None si le CV source est inconnu
+        """
+        analysis = self.get(source_key)
+        if analysis is None:
+            return None
+        return self.upsert(key, analysis, digest)
+
+    def get(self, key, digest=None):
+        """
+        Retourne l'analyse stockée d'un CV.
+
+        Args:
+            key (str): Identifiant du CV
+            digest (str, optional): Empreinte attendue; l'analyse est ignorée si elle diffère
+
+        Returns:
+            dict: Analyse au format de EntityExtractor.analyze_cv, ou None
+        """
+        row = self.key_index.get(key)
+        if row is None or (digest is not None and self._digests[row] != digest):
+            return None
+
+        years = int(self._years[row])
+        return {
+            "skills": self.decode_skills(self._bits[row]),
+            "experience_years": None if years < 0 else years,
+            "education": list(self._education[row]),
+            "experience_level": EXPERIENCE_LEVELS[self._levels[row]]
+        }
+
+    def stored_digest(self, key):
+        """
+        Retourne l'empreinte du texte dont l'analyse est stockée.
+
+        Args:
+            key (str): Identifiant du CV
+
+        Returns:
+            str: Empreinte, ou None si le CV est inconnu
+        """
+        row = self.key_index.get(key)
+        return None if row is None else self._digests[row]
+
+    def get_or_analyze(self, key, text, entity_extractor):
+        """
+        Retourne l'analyse d'un CV, en ne la calculant que si le texte a changé.
+
+        Un texte vide (fichier devenu illisible) n'est jamais analysé: l'analyse
+        stockée est conservée.
+
+        Args:
+            key (str): Identifiant du CV
+            text (str): Texte du CV
+            entity_extractor (EntityExtractor): Extracteur utilisé en cas d'absence
+
+        Returns:
+            dict: Analyse du CV, ou None pour un texte vide sans analyse stockée
+        """
+        if not text:
+            return self.get(key)
+
+        digest = self.text_digest(text)
+        analysis = self.get(key, digest)
+        if analysis is None:
+            analysis = entity_extractor.analyze_cv(text)
+            self.upsert(key, analysis, digest)
+            analysis = self.get(key)
+        return analysis
+
+    def filter(self, required_skills=None, min_experience_years=None,
+               experience_levels=None, keys=None):
+        """
+        Évalue des filtres stricts sur le vivier avec des opérations vectorisées.
+
+        Args:
+            required_skills (list, optional): Compétences toutes obligatoires
+            min_experience_years (int, optional): Années d'expérience minimales
+            experience_levels (list, optional): Niveaux d'expérience acceptés
+            keys (list, optional): Restreindre l'évaluation à ces CVs
+
+        Returns:
+            list: Clés des CVs satisfaisant tous les filtres
+        """
+        if keys is None:
+            rows = np.arange(len(self.keys))
+        else:
+            rows = np.array([self.key_index[k] for k in keys if k in self.key_index], dtype=np.intp)
+
+        selected = np.ones(len(rows), dtype=bool)
+
+        if required_skills:
+            # Une compétence inconnue de la taxonomie n'est détenue par aucun CV
+            if self.unknown_skills(required_skills):
+                return []
+            mask = self.encode_skills(required_skills, extend=False)
+            selected &= ((self._bits[rows] & mask) == mask).all(axis=1)
+
+        if min_experience_years is not None:
+            selected &= self._years[rows] >= min_experience_years
+
+        if experience_levels:
+            codes = [EXPERIENCE_LEVELS.index(level) for level in experience_levels]
+            selected &= np.isin(self._levels[rows], codes)
+
+        return [self.keys[row] for row in rows[selected]]
+
+    def compare_skills(self, key, job_skills):
+        """
+        Compare les compétences d'un CV avec celles d'une offre par opérations bit à bit.
+
+        Args:
+            key (str): Identifiant du CV
+            job_skills (list): Compétences requises par l'offre
+
+        Returns:
+            tuple: (compétences correspondantes, compétences manquantes); les
+                   compétences inconnues de la taxonomie sont manquantes
+        """
+        job_mask = self.encode_skills(job_skills, extend=False)
+        cv_mask = self._bits[self.key_index[key]]
+
+        matched = self.decode_skills(cv_mask & job_mask)
+        missing = self.decode_skills(job_mask & ~cv_mask)
+        for skill in self.unknown_skills(job_skills):
+            if skill not in missing:
+                missing.append(skill)
+        return matched, missing
+
+    def save(self, path=None):
+        """
+        Sauvegarde le stockage sur disque.
+
+        Le fichier est écrit à côté puis renommé: une écriture interrompue ou
+        concurrente ne laisse jamais un fichier tronqué au chemin du stockage.
+
+        Args:
+            path (str, optional): Chemin du fichier (.npz), par défaut celui du stockage
+        """
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        n = len(self.keys)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                skills=np.array(self.skills, dtype=str),
+                keys=np.array(self.keys, dtype=str),
+                bits=self._bits[:n],
+                years=self._years[:n],
+                levels=self._levels[:n],
+                education=np.array([json.dumps(e, ensure_ascii=False) for e in self._education], dtype=str),
+                digests=np.array(self._digests, dtype=str)
+            )
+        os.replace(tmp_path, path)
+        self.dirty = False
+        logger.info(f"Stockage des candidats sauvegardé: {n} CVs dans {path}")
+
+    @classmethod
+    def load(cls, path=CANDIDATE_STORE_PATH):
+        """
+        Charge un stockage depuis le disque, ou en crée un vide si le fichier n'existe pas.
+
+        Args:
+            path (str): Chemin du fichier (.npz)
+
+        Returns:
+            CandidateStore: Stockage chargé
+        """
+        if not os.path.exists(path):
+            return cls(path=path)
+
+        with np.load(path, allow_pickle=False) as data:
+            store = cls(taxonomy=data["skills"].tolist(), path=path, capacity=max(len(data["keys"]), 64))
+            n = len(data["keys"])
+            store.keys = data["keys"].tolist()
+            store.key_index = {key: row for row, key in enumerate(store.keys)}
+            store._bits[:n, :data["bits"].shape[1]] = data["bits"]
+            store._years[:n] = data["years"]
+            store._levels[:n] = data["levels"]
+            store._education = [json.loads(e) for e in data["education"].tolist()]
+            store._digests = data["digests"].tolist()
+
+        logger.info(f"Stockage des candidats chargé: {len(store)} CVs depuis {path}")
+        return store
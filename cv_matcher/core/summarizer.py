@@ -10,16 +10,18 @@ logger = logging.getLogger(__name__)
 class MatchSummarizer:
     """Classe pour générer des résumés explicatifs du matching entre CV et offre."""
     
-    def __init__(self, entity_extractor=None):
+    def __init__(self, entity_extractor=None, candidate_store=None):
         """
         Initialise le générateur de résumés.
         
         Args:
             entity_extractor (EntityExtractor, optional): Extracteur d'entités à utiliser
+            candidate_store (CandidateStore, optional): Stockage des analyses de CV déjà calculées
         """
         self.entity_extractor = entity_extractor or EntityExtractor(SPACY_MODEL)
+        self.candidate_store = candidate_store
         
-    def generate_summary(self, cv_text, job_text, similarity_score, matching_score):
+    def generate_summary(self, cv_text, job_text, similarity_score, matching_score, cv_key=None, job_skills=None):
         """
         Génère un résumé explicatif du matching entre un CV et une offre d'emploi.
         
@@ -28,18 +30,27 @@ class MatchSummarizer:
             job_text (str): Texte de l'offre d'emploi
             similarity_score (float): Score de similarité brut (0-1)
             matching_score (int): Score de matching (0-100)
+            cv_key (str, optional): Identifiant du CV dans le stockage des candidats
+            job_skills (list, optional): Compétences de l'offre déjà extraites
             
         Returns:
             dict: Résumé du matching avec les explications
         """
-        # Analyser le CV pour extraire les informations clés
-        cv_analysis = self.entity_extractor.analyze_cv(cv_text)
-        
         # Extraire les compétences requises de l'offre
-        job_skills = self.entity_extractor.extract_skills(job_text)
+        if job_skills is None:
+            job_skills = self.entity_extractor.extract_skills(job_text)
         
-        # Calculer les compétences communes
-        matched_skills = [skill for skill in cv_analysis["skills"] if skill in job_skills]
+        if self.candidate_store is not None and cv_key is not None:
+            # Réutiliser l'analyse stockée et comparer les compétences par bitsets
+            cv_analysis = self.candidate_store.get_or_analyze(cv_key, cv_text, self.entity_extractor)
+            matched_skills, missing_skills = self.candidate_store.compare_skills(cv_key, job_skills)
+        else:
+            # Analyser le CV pour extraire les informations clés
+            cv_analysis = self.entity_extractor.analyze_cv(cv_text)
+            
+            # Calculer les compétences communes et manquantes
+            matched_skills = [skill for skill in cv_analysis["skills"] if skill in job_skills]
+            missing_skills = [skill for skill in job_skills if skill not in cv_analysis["skills"]]
         
         # Calculer le pourcentage de compétences correspondantes
         skill_match_percentage = 0
@@ -62,7 +73,7 @@ class MatchSummarizer:
             "matching_score": matching_score,
             "skill_match_percentage": skill_match_percentage,
             "matched_skills": matched_skills,
-            "missing_skills": [skill for skill in job_skills if skill not in cv_analysis["skills"]],
+            "missing_skills": missing_skills,
             "experience_years": cv_analysis["experience_years"],
             "experience_level": cv_analysis["experience_level"],
             "education": cv_analysis["education"] if cv_analysis["education"] else []
@@ -0,0 +1,13 @@
+"""
+Configuration commune des tests: modèles bouchons et répertoires temporaires,
+fixés avant le premier import de config.
+"""
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="cv_matcher_tests_")
+os.environ.setdefault("USE_STUB_BACKENDS", "true")
+os.environ.setdefault("CV_UPLOAD_DIR", os.path.join(_TEST_DIR, "uploads"))
+os.environ.setdefault("CV_MATCHER_DATA_DIR", os.path.join(_TEST_DIR, "data"))
+# Le matching partitionné n'est actif que si des workers sont demandés
+os.environ.setdefault("SHARD_WORKERS", "2")
@@ -0,0 +1,129 @@
+"""
+Tests de l'index approximatif des plus proches voisins.
+"""
+import numpy as np
+import pytest
+from core.ann import IVFIndex
+from core.matcher import CVMatcher
+
+
+def _clustered(n, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def _exact_top(vectors, query, k):
+    return set(np.argsort(-(vectors @ query))[:k].tolist())
+
+
+@pytest.mark.parametrize("pq_subvectors, min_recall", [(0, 0.95), (16, 0.6)])
+def test_recall_against_exact_search(pq_subvectors, min_recall):
+    vectors = _clustered(3020)
+    vectors, queries = vectors[:3000], vectors[3000:]
+    index = IVFIndex(32, n_lists=16, nprobe=4, pq_subvectors=pq_subvectors, path=None)
+    index.train(vectors)
+    index.add(list(range(len(vectors))), vectors)
+
+    recalls = [
+        len({key for key, _ in index.search(query, 10)} & _exact_top(vectors, query, 10)) / 10
+        for query in queries
+    ]
+    assert np.mean(recalls) >= min_recall
+
+
+def test_full_probe_is_exact():
+    vectors = _clustered(500)
+    query = _clustered(1, seed=1)[0]
+    index = IVFIndex(32, n_lists=8, path=None)
+    index.train(vectors)
+    index.add([f"cv_{i}.pdf" for i in range(len(vectors))], vectors)
+
+    results = index.search(query, 5, nprobe=8)
+
+    expected = np.argsort(-(vectors @ query))[:5]
+    assert [key for key, _ in results] == [f"cv_{i}.pdf" for i in expected]
+    assert np.allclose([similarity for _, similarity in results], (vectors @ query)[expected], atol=1e-5)
+
+
+def test_remove_replace_and_persist(tmp_path):
+    vectors = _clustered(200)
+    index = IVFIndex(32, n_lists=4, nprobe=4, path=str(tmp_path / "ann.npz"))
+    index.train(vectors)
+    index.add([f"cv_{i}" for i in range(200)], vectors)
+
+    assert index.remove("cv_0")
+    assert "cv_0" not in index
+    index.add(["cv_1"], vectors[5:6])
+    assert len(index) == 199
+    assert all(key != "cv_0" for key, _ in index.search(vectors[0], 200))
+
+    index.save()
+    loaded = IVFIndex.load(str(tmp_path / "ann.npz"))
+    assert len(loaded) == 199
+    assert loaded.search(vectors[5], 2) == index.search(vectors[5], 2)
+
+    loaded.add(["cv_new"], vectors[7:8])
+    assert loaded.search(vectors[7], 1)[0][0] in {"cv_7", "cv_new"}
+
+
+def test_reindexing_reuses_rows():
+    vectors = _clustered(100)
+    index = IVFIndex(32, n_lists=4, nprobe=4, path=None)
+    index.train(vectors)
+    keys = [f"cv_{i}" for i in range(6)]
+    index.add(keys, vectors[:6])
+
+    for step in range(5):
+        index.add(keys, vectors[step + 1:step + 7])
+        index.remove("cv_0")
+        index.add(["cv_0"], vectors[step:step + 1])
+
+    assert len(index.keys) == len(index) == 6
+    assert sorted(index.keys) == sorted(keys)
+    assert index.search(vectors[4], 1)[0][0] == "cv_0"
+
+
+def test_train_refuses_a_filled_index():
+    vectors = _clustered(100)
+    index = IVFIndex(32, n_lists=4, path=None)
+    index.train(vectors)
+    index.add(["cv"], vectors[:1])
+
+    with pytest.raises(ValueError):
+        index.train(vectors)
+    assert index.search(vectors[0], 1)[0][0] == "cv"
+
+
+def test_add_keeps_the_last_vector_of_a_repeated_key():
+    vectors = _clustered(100)
+    index = IVFIndex(32, n_lists=4, nprobe=4, path=None)
+    index.train(vectors)
+
+    index.add(["a", "b", "a"], vectors[:3])
+
+    assert len(index) == 2
+    results = index.search(vectors[2], 10)
+    assert sorted(key for key, _ in results) == ["a", "b"]
+    assert results[0][0] == "a"
+    assert index.remove("a") and index.remove("b")
+
+
+def test_matcher_queries_index():
+    vectors = _clustered(100)
+    index = IVFIndex(32, n_lists=4, nprobe=4, path=None)
+    index.train(vectors)
+    index.add([f"cv_{i}.pdf" for i in range(100)], vectors)
+
+    results = CVMatcher.query_index(index, vectors[3], 3)
+
+    assert results[0]['filename'] == "cv_3.pdf"
+    assert results[0]['score'] == CVMatcher.similarity_to_score(results[0]['similarity'])
+    assert [r['score'] for r in results] == sorted((r['score'] for r in results), reverse=True)
+
+
+def test_add_requires_training():
+    with pytest.raises(ValueError):
+        IVFIndex(4, path=None).add(["cv"], np.ones((1, 4)))
@@ -0,0 +1,196 @@
+"""
+Tests des endpoints de l'API (modèles bouchons, voir conftest.py).
+"""
+import os
+import json
+import fitz  # PyMuPDF
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import app as api
+from core.ann import IVFIndex
+from core.storage import HTTPDocumentReader
+
+JOB_OFFER = json.dumps({"title": "Développeur Python", "description": "Django, Docker et PostgreSQL"})
+
+CV_TEXTS = [
+    "Développeur Python Django Docker PostgreSQL",
+    "Comptable, gestion de la paie",
+    "Développeur Java Spring et Docker",
+    "Data scientist Python et pandas",
+]
+
+
+def _pdf(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 50), text)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def files():
+    return [("files", (f"api_cv_{i}.pdf", _pdf(text), "application/pdf")) for i, text in enumerate(CV_TEXTS)]
+
+
+def test_match_pages_through_session(client, files):
+    response = client.post("/api/match/", data={"job_offer": JOB_OFFER, "top_k": 2}, files=files)
+    assert response.status_code == 200
+    first = response.json()
+
+    response = client.get(f"/api/match/{first['match_id']}", params={"top_k": 2, "offset": 2})
+    assert response.status_code == 200
+    second = response.json()
+
+    names = [r["filename"] for r in first["results"] + second["results"]]
+    assert first["total"] == second["total"] == len(CV_TEXTS)
+    assert sorted(names) == sorted(name for _, (name, _, _) in files)
+    assert client.get("/api/match/inconnu").status_code == 404
+
+
+def test_prefiltered_match_counts_every_retained_cv(client, files):
+    response = client.post("/api/match/", data={"job_offer": JOB_OFFER, "top_k": 1, "prefilter_size": 2}, files=files)
+
+    assert response.status_code == 200
+    assert (response.json()["total"], response.json()["ranked"]) == (len(CV_TEXTS), 2)
+
+
+def test_sharded_match_ranks_like_streaming(client, files):
+    streamed = client.post("/api/match/", data={"job_offer": JOB_OFFER, "top_k": 3}, files=files).json()
+    sharded = client.post("/api/match/", data={"job_offer": JOB_OFFER, "top_k": 3, "shards": 2}, files=files).json()
+
+    assert sharded["total"] == streamed["total"] == len(CV_TEXTS)
+    assert [r["filename"] for r in sharded["results"]] == [r["filename"] for r in streamed["results"]]
+    assert [r["summary"] for r in sharded["results"]] == [r["summary"] for r in streamed["results"]]
+
+
+def test_sharded_match_falls_back_to_streaming_without_workers(client, files, monkeypatch):
+    monkeypatch.setattr(api, "shard_executor", None)
+    monkeypatch.setattr(api.match_pipeline, "shard_executor", None)
+
+    response = client.post("/api/match/", data={"job_offer": JOB_OFFER, "top_k": 3, "shards": 2}, files=files)
+
+    assert response.status_code == 200
+    assert response.json()["total"] == len(CV_TEXTS)
+
+
+@pytest.mark.parametrize("params", [{"top_k": 0}, {"offset": -1}])
+def test_match_rejects_invalid_page(client, files, params):
+    response = client.post("/api/match/", data={"job_offer": JOB_OFFER, **params}, files=files)
+    assert response.status_code == 422
+
+    response = client.get("/api/match/inconnu", params=params)
+    assert response.status_code == 422
+
+
+def test_analyze_cv_upload_and_reupload(client):
+    response = client.post("/api/analyze_cv/", files={"file": ("api_single.pdf", _pdf("Comptable, gestion de la paie"), "application/pdf")})
+    assert response.status_code == 200
+    assert response.json()["filename"] == "api_single.pdf"
+    assert response.json()["skills"] == []
+
+    # Même nom, contenu modifié: l'analyse stockée n'est pas réutilisée
+    response = client.post("/api/analyze_cv/", files={"file": ("api_single.pdf", _pdf("Développeur Python et Docker"), "application/pdf")})
+    assert response.status_code == 200
+    assert response.json()["skills"] != []
+    assert api.candidate_store.stored_digest("api_single.pdf") is not None
+
+
+def test_analyze_cv_from_file_key(client):
+    directory = os.path.join(api.CV_UPLOAD_DIR, "stockes")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "api_key.pdf"), "wb") as f:
+        f.write(_pdf(CV_TEXTS[0]))
+
+    response = client.post("/api/analyze_cv/", data={"file_key": "stockes/api_key.pdf"})
+    assert response.status_code == 200
+    assert response.json()["filename"] == "stockes/api_key.pdf"
+
+    assert client.post("/api/analyze_cv/", data={"file_key": "stockes/absent.pdf"}).status_code == 404
+    assert client.post("/api/analyze_cv/", data={"file_key": "../secret.pdf"}).status_code == 400
+    assert client.post("/api/analyze_cv/").status_code == 400
+
+
+def test_analyze_cvs_streams_one_line_per_file(client):
+    files = [
+        ("files", ("api_batch_1.pdf", _pdf(CV_TEXTS[1]), "application/pdf")),
+        ("files", ("api_batch_broken.pdf", b"%PDF-1.4 illisible", "application/pdf")),
+        ("files", ("api_batch_3.pdf", _pdf(CV_TEXTS[3]), "application/pdf")),
+    ]
+
+    response = client.post("/api/analyze_cvs/", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["filename"], line["success"]) for line in lines] == [
+        ("api_batch_1.pdf", True), ("api_batch_broken.pdf", False), ("api_batch_3.pdf", True)
+    ]
+    assert lines[0]["skills"] == []
+    assert "python" in lines[2]["skills"]
+    assert "error" in lines[1]
+
+
+def test_uploads_stay_in_upload_dir_and_names_are_unique(client):
+    files = [
+        ("files", ("same.pdf", _pdf(CV_TEXTS[0]), "application/pdf")),
+        ("files", ("same.pdf", _pdf(CV_TEXTS[1]), "application/pdf")),
+    ]
+    assert client.post("/api/analyze_cvs/", files=files).status_code == 400
+    response = client.post("/api/match/", data={"job_offer": JOB_OFFER}, files=files)
+    assert response.status_code == 400
+
+    upload = {"file": ("../../api_evade.pdf", _pdf(CV_TEXTS[1]), "application/pdf")}
+    response = client.post("/api/analyze_cv/", files=upload)
+    assert response.status_code == 200
+    assert response.json()["filename"] == "api_evade.pdf"
+    assert os.path.exists(os.path.join(api.CV_UPLOAD_DIR, "api_evade.pdf"))
+    assert not os.path.exists(os.path.join(api.CV_UPLOAD_DIR, "..", "..", "api_evade.pdf"))
+
+
+def test_document_store_errors_map_to_bad_gateway(client, monkeypatch, tmp_path):
+    def handler(request):
+        raise httpx.ConnectError("connexion refusée", request=request)
+
+    reader = HTTPDocumentReader(base_url="http://store", cache_dir=str(tmp_path))
+    reader.client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(api, "document_reader", reader)
+
+    assert client.post("/api/analyze_cv/", data={"file_key": "cv.pdf"}).status_code == 502
+    assert client.post("/api/analyze_cvs/", data={"file_keys": ["cv.pdf"]}).status_code == 502
+    response = client.post("/api/match/", data={"job_offer": JOB_OFFER, "file_keys": ["cv.pdf"]})
+    assert response.status_code == 502
+    reader.close()
+
+
+def test_search_candidate_pool(client, files, monkeypatch, tmp_path):
+    assert client.post("/api/search/", data={"job_offer": JOB_OFFER}).status_code == 404
+
+    ann_index = IVFIndex(api.text_encoder.dimension, n_lists=2, path=str(tmp_path / "ann.npz"))
+    monkeypatch.setattr(api, "ann_index", ann_index)
+    monkeypatch.setattr(api.match_pipeline, "ann_index", ann_index)
+    assert client.post("/api/match/", data={"job_offer": JOB_OFFER}, files=files).status_code == 200
+
+    response = client.post("/api/search/", data={"job_offer": JOB_OFFER, "top_k": 2})
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == 2
+    assert "api_cv_0.pdf" in [r["filename"] for r in results]
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_shutdown_saves_pending_changes(monkeypatch):
+    saved = []
+    monkeypatch.setattr(api.match_pipeline, "persist", lambda force=False: saved.append(force))
+    monkeypatch.setattr(api, "shard_executor", None)
+
+    with TestClient(api.app) as client:
+        assert client.get("/api/resources/plan").status_code == 200
+
+    assert saved == [True]
@@ -0,0 +1,89 @@
+"""
+Tests de la détection des CVs quasi-dupliqués.
+"""
+import numpy as np
+from core.dedup import MinHasher, DuplicateIndex
+from core.matcher import CVMatcher
+
+BASE_CV = " ".join(
+    f"experience {i} developpeur python docker kubernetes projet {i * 7} equipe agile" for i in range(40)
+)
+
+
+def test_near_duplicate_is_found_and_distinct_cv_is_not():
+    hasher = MinHasher()
+    index = DuplicateIndex(path=None)
+    index.add("original.pdf", hasher.signature(BASE_CV), embedding=np.ones(4))
+
+    edited = BASE_CV.replace("projet 7 ", "projet 8 ")
+    other = " ".join(f"comptable {i} fiscalite audit bilan {i * 3}" for i in range(60))
+
+    key, similarity = index.find_duplicate(hasher.signature(edited))
+    assert key == "original.pdf"
+    assert similarity >= 0.9
+    assert index.find_duplicate(hasher.signature(other)) is None
+
+
+def test_queried_key_is_not_its_own_duplicate():
+    hasher = MinHasher()
+    index = DuplicateIndex(path=None)
+    index.add("cv.pdf", hasher.signature(BASE_CV))
+
+    edited = hasher.signature(BASE_CV.replace("projet 7 ", "projet 8 "))
+
+    assert index.find_duplicate(edited, exclude="cv.pdf") is None
+    index.add("copie.pdf", hasher.signature(BASE_CV))
+    assert index.find_duplicate(edited, exclude="cv.pdf")[0] == "copie.pdf"
+
+
+def test_canonical_groups_and_persistence(tmp_path):
+    hasher = MinHasher()
+    signature = hasher.signature(BASE_CV)
+    index = DuplicateIndex(path=str(tmp_path / "index.npz"))
+    index.add("a.pdf", signature, embedding=np.arange(4, dtype=np.float32))
+    index.add("b.pdf", signature, canonical="a.pdf")
+    index.add("c.pdf", signature, canonical="b.pdf")
+    index.save()
+
+    loaded = DuplicateIndex.load(index.path)
+
+    assert loaded.canonical == {"a.pdf": "a.pdf", "b.pdf": "a.pdf", "c.pdf": "a.pdf"}
+    np.testing.assert_array_equal(loaded.embeddings["a.pdf"], np.arange(4))
+    assert loaded.find_duplicate(signature)[0] in {"a.pdf", "b.pdf", "c.pdf"}
+
+    loaded.remove("a.pdf")
+    assert "a.pdf" not in loaded
+    assert loaded.find_duplicate(signature)[0] in {"b.pdf", "c.pdf"}
+
+
+def test_reindexed_cv_keeps_its_group_and_digest(tmp_path):
+    hasher = MinHasher()
+    signature = hasher.signature(BASE_CV)
+    index = DuplicateIndex(path=str(tmp_path / "index.npz"))
+    index.add("a.pdf", signature, digest="a1")
+    index.add("b.pdf", signature, canonical="a.pdf", digest="b1")
+
+    # Ré-indexé sous sa propre clé, le CV reste dans son groupe
+    index.add("b.pdf", signature, canonical="b.pdf", digest="b1")
+    index.add("a.pdf", signature, canonical="a.pdf", digest="a1")
+    assert index.canonical == {"a.pdf": "a.pdf", "b.pdf": "a.pdf"}
+
+    index.save()
+    loaded = DuplicateIndex.load(index.path)
+    assert loaded.unchanged("b.pdf", "b1")
+    assert not loaded.unchanged("b.pdf", "b2")
+    assert not loaded.unchanged("c.pdf", None)
+
+
+def test_rank_candidates_collapses_duplicates():
+    job = np.array([1.0, 0.0])
+    embeddings = {
+        "a.pdf": np.array([0.6, 0.8]),
+        "a_copie.pdf": np.array([0.6, 0.8]),
+        "b.pdf": np.array([1.0, 0.0]),
+    }
+
+    ranking = CVMatcher.rank_candidates(embeddings, job, duplicate_of={"a_copie.pdf": "a.pdf"})
+
+    assert [r['filename'] for r in ranking] == ["b.pdf", "a.pdf"]
+    assert ranking[1]['duplicates'] == ["a_copie.pdf"]
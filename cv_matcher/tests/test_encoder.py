@@ -0,0 +1,62 @@
+"""
+Tests de l'encodeur statique (embeddings de tokens distillés).
+"""
+import numpy as np
+from core.encoder import StaticEmbeddings, TextEncoder
+
+TOKENS = ["[PAD]", "[UNK]", "python", "dev", "##elo", "##ppeur", "docker", ",", "e", "##te"]
+
+
+def _table():
+    rng = np.random.default_rng(0)
+    return StaticEmbeddings(TOKENS, rng.normal(size=(len(TOKENS), 8)))
+
+
+def test_wordpiece_tokenization():
+    table = _table()
+
+    assert table.token_ids("Développeur Python, Docker") == [3, 4, 5, 2, 7, 6]
+    # Mot impossible à découper: ignoré comme [UNK]
+    assert table.token_ids("Été xyz") == [8, 9]
+
+
+def test_encode_is_normalized_mean_of_tokens():
+    table = _table()
+
+    embedding = table.encode("python docker")
+
+    expected = table.vectors[[2, 6]].mean(axis=0)
+    assert np.allclose(embedding, expected / np.linalg.norm(expected))
+    assert not table.encode("xyz").any()
+
+
+def test_save_and_load(tmp_path):
+    table = _table()
+    path = str(tmp_path / "static.npz")
+
+    table.save(path)
+    loaded = StaticEmbeddings.load(path)
+
+    assert loaded.tokens == TOKENS
+    assert np.allclose(loaded.encode("développeur"), table.encode("développeur"), atol=1e-3)
+
+
+def test_word_cache_is_bounded():
+    rng = np.random.default_rng(0)
+    table = StaticEmbeddings(TOKENS, rng.normal(size=(len(TOKENS), 8)), word_cache_size=2)
+
+    table.token_ids("python docker")
+    table.token_ids("python dev")
+
+    assert list(table._word_ids) == ["python", "dev"]
+
+
+def test_fast_mode_runs_without_sentence_bert(tmp_path):
+    path = str(tmp_path / "static.npz")
+    _table().save(path)
+
+    encoder = TextEncoder(mode="fast", static_path=path)
+
+    assert encoder.model is None and encoder.has_static_embeddings()
+    assert encoder.dimension == 8
+    assert np.allclose(encoder.encode_chunks("python docker"), encoder.encode_fast("python docker"))
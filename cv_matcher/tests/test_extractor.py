@@ -0,0 +1,144 @@
+"""
+Tests de l'extraction de texte des CVs.
+"""
+import os
+import zipfile
+import fitz  # PyMuPDF
+from core import extractor
+from core.extractor import CVExtractor
+
+DOCUMENT_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:body>
+    <w:p><w:r><w:t>Jean Dupont</w:t></w:r></w:p>
+    <w:p><w:r><w:t xml:space="preserve">Compétences: </w:t></w:r><w:r><w:t>Python</w:t><w:tab/><w:t>Docker</w:t></w:r></w:p>
+    <w:p><w:r><w:t>2015 - 2020</w:t><w:br/><w:t>Développeur</w:t></w:r></w:p>
+  </w:body>
+</w:document>
+"""
+
+
+def _write_docx(path, document_xml=DOCUMENT_XML):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", document_xml)
+
+
+def _write_corrupt_docx(path):
+    _write_docx(path, DOCUMENT_XML.replace("<w:body>", "<w:body>" + "<w:p><w:r><w:t>Python</w:t></w:r></w:p>" * 500))
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        # Flux deflate de word/document.xml corrompu (zlib.error à la lecture)
+        start = data.index(b"word/document.xml") + len("word/document.xml") + 5
+        for i in range(start, start + 40):
+            data[i] = (data[i] * 7 + 13) & 0xff
+        f.seek(0)
+        f.write(data)
+
+
+def _write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 50), text)
+    doc.save(path)
+    doc.close()
+
+
+def test_extract_from_docx(tmp_path):
+    path = str(tmp_path / "cv.docx")
+    _write_docx(path)
+
+    text = CVExtractor.extract_from_docx(path)
+
+    assert text == "Jean Dupont\nCompétences: Python\tDocker\n2015 - 2020\nDéveloppeur\n"
+
+
+def test_extract_from_docx_reads_tables(tmp_path):
+    path = str(tmp_path / "cv.docx")
+    _write_docx(path, DOCUMENT_XML.replace("<w:body>", """<w:body>
+    <w:tbl><w:tr><w:tc><w:p><w:r><w:t>Python</w:t></w:r></w:p></w:tc>
+    <w:tc><w:p><w:r><w:t>5 ans</w:t></w:r></w:p></w:tc></w:tr></w:tbl>""").replace(
+        "</w:body>", "<w:sectPr><w:pgSz/></w:sectPr></w:body>"))
+
+    text = CVExtractor.extract_from_docx(path)
+
+    assert text.startswith("Python\n5 ans\nJean Dupont\n")
+
+
+def test_extract_from_docx_refuses_entity_expansion(tmp_path):
+    path = str(tmp_path / "bomb.docx")
+    _write_docx(path, """<?xml version="1.0"?>
+<!DOCTYPE lolz [<!ENTITY lol "lol"><!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;">]>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:body><w:p><w:r><w:t>&lol2;</w:t></w:r></w:p></w:body>
+</w:document>
+""")
+
+    assert CVExtractor.extract_from_docx(path) == ""
+
+
+def test_extract_from_corrupt_docx(tmp_path):
+    path = str(tmp_path / "corrupt.docx")
+    _write_corrupt_docx(path)
+
+    assert CVExtractor.extract_from_docx(path) == ""
+    assert CVExtractor.extract_text(path) == ""
+
+
+def test_extract_from_doc_falls_back_to_text_runs(tmp_path):
+    path = str(tmp_path / "cv.doc")
+    body = "Jean Dupont, développeur Python avec 5 ans d'expérience. " * 3
+    with open(path, "wb") as f:
+        f.write(b"\xd0\xcf\x11\xe0\x00\x01\x02" + body.encode("utf-16-le") + b"\x00\x05\x06")
+
+    assert "développeur Python avec 5 ans d'expérience" in CVExtractor.extract_from_doc(path)
+
+
+def test_extract_from_doc_accepts_renamed_docx(tmp_path):
+    path = str(tmp_path / "cv.doc")
+    _write_docx(path)
+
+    assert CVExtractor.extract_from_doc(path).startswith("Jean Dupont")
+
+
+def test_extract_text_dispatches_and_caches(tmp_path, monkeypatch):
+    path = str(tmp_path / "cv.docx")
+    _write_docx(path)
+    calls = []
+    original = CVExtractor.extract_from_docx
+    monkeypatch.setattr(CVExtractor, "extract_from_docx", staticmethod(lambda p: calls.append(p) or original(p)))
+
+    assert CVExtractor.extract_text(path) == CVExtractor.extract_text(path)
+    assert len(calls) == 1
+    assert CVExtractor.extract_text(str(tmp_path / "cv.txt")) == ""
+
+
+def test_iter_from_directory_parallel_matches_sequential(tmp_path):
+    for i in range(5):
+        _write_pdf(str(tmp_path / f"cv_{i}.pdf"), f"CV numero {i} python docker")
+        _write_docx(str(tmp_path / f"cv_{i}.docx"))
+    (tmp_path / "notes.txt").write_text("ignoré")
+
+    sequential = list(CVExtractor.iter_from_directory(str(tmp_path), max_workers=1))
+    extractor._text_cache.clear()
+    parallel = list(CVExtractor.iter_from_directory(str(tmp_path), max_workers=2))
+
+    assert [name for name, _, _ in sequential] == sorted(
+        name for name in os.listdir(tmp_path) if not name.endswith(".txt")
+    )
+    assert parallel == sequential
+
+
+def test_list_directory_keys_relative_to_root(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        _write_pdf(str(tmp_path / folder / "cv.pdf"), f"CV {folder}")
+    outside = tmp_path / "ailleurs"
+    outside.mkdir()
+    _write_pdf(str(outside / "cv.pdf"), "CV ailleurs")
+
+    root = str(tmp_path / "a" / "..")
+    keys = [key for key, _ in CVExtractor.list_directory(str(tmp_path / "a"), root=root)]
+    keys += [key for key, _ in CVExtractor.list_directory(str(tmp_path / "b"), root=root)]
+
+    assert keys == [os.path.join("a", "cv.pdf"), os.path.join("b", "cv.pdf")]
+    assert CVExtractor.list_directory(str(outside), root=str(tmp_path / "a"))[0][0] == str(outside / "cv.pdf")
@@ -0,0 +1,64 @@
+"""
+Tests des statistiques et du nettoyage du test de charge.
+"""
+import os
+import pytest
+from benchmarks.load_test import summarize_samples, find_knee, cleanup_workload
+
+
+def test_summarize_samples():
+    samples = [
+        ("analyze_cv", 0.010, True),
+        ("analyze_job", 0.040, False),
+        ("match", 0.020, True),
+        ("analyze_cv", 0.030, True),
+    ]
+
+    stats = summarize_samples(samples, duration=2)
+
+    # Percentiles interpolés sur [10, 20, 30, 40] ms: rangs 1.5, 2.7 et 2.97
+    assert stats == {
+        "requests": 4,
+        "throughput_rps": 2.0,
+        "error_rate": 0.25,
+        "p50_ms": 25.0,
+        "p90_ms": 37.0,
+        "p99_ms": 39.7
+    }
+
+
+def test_summarize_no_samples():
+    stats = summarize_samples([], duration=2)
+
+    assert stats["requests"] == 0
+    assert stats["p50_ms"] is None
+
+
+@pytest.mark.parametrize("throughputs, knee", [
+    # 19 -> 20 req/s: moins de 10% de gain en doublant la concurrence
+    ([10, 19, 20, 30], 2),
+    ([10, 12, 14], None),
+    ([10, 9], 1),
+    ([10], None),
+])
+def test_find_knee(throughputs, knee):
+    levels = [
+        {"concurrency": 2 ** i, "throughput_rps": throughput}
+        for i, throughput in enumerate(throughputs)
+    ]
+
+    assert find_knee(levels) == knee
+
+
+def test_cleanup_removes_uploaded_cvs(tmp_path):
+    directory = tmp_path / "loadtest_abc"
+    directory.mkdir()
+    (directory / "cv_0000.pdf").write_bytes(b"%PDF")
+    (tmp_path / "loadtest_abc_small_42.pdf").write_bytes(b"%PDF")
+    (tmp_path / "loadtest_abd_small_42.pdf").write_bytes(b"%PDF")
+    (tmp_path / "candidat.pdf").write_bytes(b"%PDF")
+
+    cleanup_workload({"directory": "loadtest_abc", "path": str(directory), "upload_dir": str(tmp_path)})
+
+    # Seuls le répertoire et les uploads de cette charge sont supprimés
+    assert sorted(os.listdir(tmp_path)) == ["candidat.pdf", "loadtest_abd_small_42.pdf"]
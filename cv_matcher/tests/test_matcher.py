@@ -0,0 +1,39 @@
+"""
+Tests du calcul de similarité et du classement des candidats.
+"""
+import numpy as np
+from core.matcher import CVMatcher, TopKCandidates
+
+
+def _embeddings(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return {f"cv_{i}.pdf": vector for i, vector in enumerate(vectors)}
+
+
+def test_top_k_matches_full_ranking():
+    cv_embeddings = _embeddings(200)
+    job_embedding = next(iter(_embeddings(1, seed=1).values()))
+
+    ranking = CVMatcher.rank_candidates(cv_embeddings, job_embedding)
+
+    top = TopKCandidates(15)
+    for filename, embedding in cv_embeddings.items():
+        similarity = CVMatcher.calculate_similarity(embedding, job_embedding)
+        top.push(filename, similarity, CVMatcher.similarity_to_score(similarity), payload=filename)
+
+    results = top.results()
+    assert len(top) == 15
+    assert [r['filename'] for r in results] == [r['filename'] for r in ranking[:15]]
+    assert all(r['payload'] == r['filename'] for r in results)
+
+
+def test_top_k_keeps_arrival_order_on_ties():
+    top = TopKCandidates(2)
+    for name in ["a", "b", "c"]:
+        top.push(name, 0.5, 50)
+
+    assert [r['filename'] for r in top.results()] == ["a", "b"]
+    assert not top.push("d", 0.5, 50)
+    assert TopKCandidates(0).push("a", 0.5, 50) is False
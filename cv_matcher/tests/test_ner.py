@@ -0,0 +1,103 @@
+"""
+Tests de l'analyseur de CV en une seule passe.
+"""
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from utils.ner import EntityExtractor, experience_level_from_years
+
+CV_TEXTS = [
+    """Jean Dupont
+Développeur Full Stack - 7 ans d'expérience
+
+COMPÉTENCES
+Python, Django, React Native, React.js, Node.js, Docker, Kubernetes, CI/CD, C++
+
+EXPÉRIENCE
+2015 - 2018 Développeur chez Acme
+2018 à présent Lead developer chez Globex
+
+FORMATION
+Master Informatique, Université de Lyon
+Baccalauréat scientifique
+""",
+    """Senior engineer with 12 years of experience in machine learning and NLP.
+
+
+Experience: 3 years at Initech (AWS, Azure)
+2010-2015-2020 consultant, 1999 – 2003 stagiaire
+
+
+Diplôme d'ingénieur, École Centrale
+MBA
+""",
+    """Expérience professionnelle : 4 ans
+Expérience: 2 ans en scrum et agile
+Certifications AWS\n \n\nbts sio\n\nintelligence artificielle, vue.js, typescript""",
+    """Profil junior, stage de 6 mois.
+Projets: développement web, html, css, javascript.
+
+Formation en cours.""",
+    """Aucune date ici.
+2012 - 2010 période invalide
+Actuel: 2019 — aujourd'hui chez Hooli""",
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = EntityExtractor("blank:fr")
+    ruler = extractor.nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([
+        {"label": "ORG", "pattern": "acme"},
+        {"label": "ORG", "pattern": "initech"},
+        {"label": "ORG", "pattern": "hooli"},
+    ])
+    return extractor
+
+
+def _reference_analysis(extractor, text):
+    experience_years = extractor.extract_experience_years(text)
+    return {
+        "skills": extractor.extract_skills(text),
+        "experience_years": experience_years,
+        "education": extractor.extract_education(text),
+        "experience_level": experience_level_from_years(experience_years),
+    }
+
+
+@pytest.mark.parametrize("text", CV_TEXTS)
+def test_fused_analysis_matches_reference(extractor, text):
+    fused = extractor.analyze_cv(text)
+    reference = _reference_analysis(extractor, text)
+
+    assert sorted(fused.pop("skills")) == sorted(reference.pop("skills"))
+    assert fused == reference
+
+
+def test_fused_analysis_details(extractor):
+    analysis = extractor.analyze_cv(CV_TEXTS[0])
+
+    assert {"react native", "react.js", "node.js", "docker", "acme"} <= set(analysis["skills"])
+    assert analysis["experience_years"] == 7
+    assert analysis["experience_level"] == "confirmé"
+    assert analysis["education"] == [
+        "formation master informatique, université de lyon baccalauréat scientifique"
+    ]
+
+
+def test_employment_periods_do_not_overlap(extractor):
+    # "2010-2015" est retenu, puis "2015-2020" est ignoré comme avec re.finditer
+    assert extractor.analyze_cv("2010-2015-2020")["experience_years"] == 5
+
+
+def test_batched_analysis_matches_single(extractor):
+    batched = extractor.analyze_cvs(CV_TEXTS)
+
+    assert len(batched) == len(CV_TEXTS)
+    for text, analysis in zip(CV_TEXTS, batched):
+        single = extractor.analyze_cv(text)
+        assert sorted(analysis.pop("skills")) == sorted(single.pop("skills"))
+        assert analysis == single
@@ -0,0 +1,411 @@
+"""
+Tests du pipeline de matching en flux.
+"""
+import os
+import threading
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+from core.ann import IVFIndex
+from core.dedup import DuplicateIndex
+from core.pipeline import MatchPipeline
+from core.processor import TextProcessor
+from core.store import CandidateStore
+from core.summarizer import MatchSummarizer
+from benchmarks.stubs import StubTextEncoder
+from utils.ner import EntityExtractor
+
+JOB_TEXT = "Développeur Python\nAPI Django, Docker et PostgreSQL"
+
+CV_TEXTS = [
+    "Développeur Python Django Docker PostgreSQL depuis 2015",
+    "Comptable, gestion de la paie et des bilans",
+    "Développeur Java Spring et Docker",
+    "Data scientist Python, pandas et PostgreSQL",
+    "Chef de projet marketing digital",
+    "Ingénieur DevOps Docker Kubernetes et Python",
+]
+
+
+class ShortTextFastEncoder(StubTextEncoder):
+    """Encodeur dont l'embedding de préfiltrage ne favorise que les textes courts."""
+
+    def encode_fast(self, text):
+        return np.array([1.0 / (1 + len(text.split()))])
+
+
+@pytest.fixture(scope="module")
+def text_processor():
+    return TextProcessor()
+
+
+@pytest.fixture(scope="module")
+def entity_extractor():
+    return EntityExtractor("blank:fr")
+
+
+def _pipeline(text_processor, text_encoder, entity_extractor, data_dir, session_cache_size=100, ann_index=None,
+              persist_interval=0):
+    store = CandidateStore(path=str(data_dir / "candidates.npz"))
+    return MatchPipeline(
+        text_processor,
+        text_encoder,
+        entity_extractor,
+        MatchSummarizer(entity_extractor, store),
+        store,
+        DuplicateIndex(path=str(data_dir / "dedup.npz")),
+        session_cache_size=session_cache_size,
+        extraction_workers=1,
+        ann_index=ann_index,
+        persist_interval=persist_interval
+    )
+
+
+def _sources():
+    return [(f"cv_{i}.txt", f"cv_{i}.txt", text) for i, text in enumerate(CV_TEXTS)]
+
+
+def test_pages_follow_the_full_ranking(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    everything = pipeline.run(JOB_TEXT, _sources(), top_k=len(CV_TEXTS))
+
+    first = pipeline.run(JOB_TEXT, _sources(), top_k=2)
+    second = pipeline.page(first["match_id"], top_k=2, offset=2)
+    last = pipeline.page(first["match_id"], top_k=10, offset=4)
+
+    ranked = [r['filename'] for r in everything["results"]]
+    assert [r['filename'] for r in first["results"]] == ranked[:2]
+    assert [r['filename'] for r in second["results"]] == ranked[2:4]
+    assert [r['filename'] for r in last["results"]] == ranked[4:]
+    assert first["total"] == second["total"] == len(CV_TEXTS)
+    assert pipeline.page(first["match_id"], top_k=2, offset=len(CV_TEXTS))["results"] == []
+
+
+def test_sessions_are_evicted_least_recently_used(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path, session_cache_size=2)
+
+    first = pipeline.run(JOB_TEXT, _sources(), top_k=1)["match_id"]
+    second = pipeline.run(JOB_TEXT, _sources(), top_k=1)["match_id"]
+    # Consulter la première session la rend la plus récente
+    assert pipeline.page(first, top_k=1) is not None
+    third = pipeline.run(JOB_TEXT, _sources(), top_k=1)["match_id"]
+
+    assert pipeline.page(second, top_k=1) is None
+    assert pipeline.page(first, top_k=1) is not None
+    assert pipeline.page(third, top_k=1) is not None
+
+
+def test_edited_cv_is_not_matched_against_its_stale_entry(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    base = " ".join(f"Expérience {i} développeur python chez client {i * 7} en équipe agile." for i in range(40))
+    edited = base + " Déploiement avec kubernetes."
+
+    first = pipeline.run(JOB_TEXT, [("cv.pdf", "cv.pdf", base)], top_k=1, required_skills=["python"])
+    stale_embedding = pipeline.duplicate_index.embeddings["cv.pdf"]
+    # Même fichier, contenu modifié: quasi-identique au précédent mais avec une compétence de plus
+    second = pipeline.run(JOB_TEXT, [("cv.pdf", "cv.pdf", edited)], top_k=1, required_skills=["kubernetes"])
+
+    assert first["total"] == second["total"] == 1
+    assert "kubernetes" in pipeline.candidate_store.get("cv.pdf")["skills"]
+    assert pipeline.duplicate_index.canonical["cv.pdf"] == "cv.pdf"
+    assert not np.allclose(pipeline.duplicate_index.embeddings["cv.pdf"], stale_embedding)
+
+
+def test_unchanged_cv_reuses_its_embedding_and_group(text_processor, entity_extractor, tmp_path, monkeypatch):
+    text_encoder = StubTextEncoder()
+    pipeline = _pipeline(text_processor, text_encoder, entity_extractor, tmp_path)
+    base = " ".join(f"Expérience {i} développeur python chez client {i * 7} en équipe agile." for i in range(40))
+    sources = [
+        ("a.pdf", "a.pdf", base),
+        ("b.pdf", "b.pdf", base + " Docker."),
+        ("c.pdf", "c.pdf", CV_TEXTS[1]),
+    ]
+    first = pipeline.run(JOB_TEXT, sources, top_k=3)
+    groups = dict(pipeline.duplicate_index.canonical)
+    assert groups["b.pdf"] == "a.pdf"
+
+    # Second matching des mêmes fichiers: aucun CV n'est ré-encodé
+    encoded = []
+    encode_chunks = text_encoder.encode_chunks
+    monkeypatch.setattr(text_encoder, "encode_chunks", lambda text: encoded.append(text) or encode_chunks(text))
+    second = pipeline.run(JOB_TEXT, sources, top_k=3)
+
+    assert len(encoded) == 1  # l'offre seule
+    assert pipeline.duplicate_index.canonical == groups
+    assert [(r["filename"], r["score"]) for r in second["results"]] == [(r["filename"], r["score"]) for r in first["results"]]
+
+
+def test_large_prefilter_keeps_full_ranking(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+
+    expected = pipeline.run(JOB_TEXT, _sources(), top_k=3, prefilter_size=0)
+    page = pipeline.run(JOB_TEXT, _sources(), top_k=3, prefilter_size=len(CV_TEXTS))
+
+    assert page["total"] == expected["total"] == len(CV_TEXTS)
+    assert [r['filename'] for r in page["results"]] == [r['filename'] for r in expected["results"]]
+    assert [r['score'] for r in page["results"]] == [r['score'] for r in expected["results"]]
+
+
+def test_prefilter_reencodes_shortlist_only(text_processor, entity_extractor, tmp_path):
+    text_encoder = ShortTextFastEncoder()
+    pipeline = _pipeline(text_processor, text_encoder, entity_extractor, tmp_path)
+
+    page = pipeline.run(JOB_TEXT, _sources(), top_k=2, prefilter_size=3)
+
+    # Seuls les trois CVs les plus courts sont classés par l'encodeur complet,
+    # mais tous les CVs retenus sont comptés
+    assert (page["total"], page["ranked"]) == (len(CV_TEXTS), 3)
+    assert [r['filename'] for r in page["results"]] == ["cv_3.txt", "cv_2.txt"]
+
+    # Au-delà de la shortlist, les pages sont vides mais le total est conservé
+    beyond = pipeline.page(page["match_id"], top_k=2, offset=3)
+    assert (beyond["total"], beyond["ranked"], beyond["results"]) == (len(CV_TEXTS), 3, [])
+
+    # Tous les CVs sont indexés, mais seuls ceux de la shortlist ont un embedding (complet)
+    assert len(pipeline.duplicate_index) == len(CV_TEXTS)
+    assert len(pipeline.duplicate_index.embeddings) == 3
+    for filename, embedding in pipeline.duplicate_index.embeddings.items():
+        cv_text = CV_TEXTS[int(filename[3])]
+        full = text_encoder.encode_chunks(text_processor.clean_cv_text(cv_text))
+        assert np.allclose(embedding, full)
+
+
+
+def test_prefilter_keeps_embeddings_outside_the_shortlist(text_processor, entity_extractor, tmp_path):
+    encoder = ShortTextFastEncoder()
+    ann_index = IVFIndex(encoder.dimension, n_lists=2, nprobe=2, path=str(tmp_path / "ann.npz"))
+    pipeline = _pipeline(text_processor, encoder, entity_extractor, tmp_path, ann_index=ann_index)
+    pipeline.run(JOB_TEXT, _sources(), top_k=2)
+    assert pipeline.build_ann_index(min_size=len(CV_TEXTS))
+
+    pipeline.run(JOB_TEXT, _sources(), top_k=2, prefilter_size=2)
+
+    # Les CVs hors shortlist gardent leur embedding complet et leur ligne approximative
+    assert len(pipeline.duplicate_index.embeddings) == len(CV_TEXTS)
+    assert len(ann_index) == len(CV_TEXTS)
+
+    # Ré-indexé sans embedding, un CV inchangé le garde; un texte modifié le perd
+    signature = pipeline.duplicate_index.signatures["cv_0.txt"]
+    digest = pipeline.candidate_store.text_digest(CV_TEXTS[0])
+    pipeline.index_cv("cv_0.txt", signature, digest=digest)
+    assert "cv_0.txt" in pipeline.duplicate_index.embeddings
+    assert len(ann_index) == len(CV_TEXTS)
+
+    pipeline.index_cv("cv_0.txt", signature, digest=pipeline.candidate_store.text_digest("texte modifié"))
+    assert "cv_0.txt" not in pipeline.duplicate_index.embeddings
+    assert len(ann_index) == len(CV_TEXTS) - 1
+
+def test_prefilter_is_skipped_without_static_table(text_processor, entity_extractor, tmp_path):
+    class NoStaticEncoder(ShortTextFastEncoder):
+        def has_static_embeddings(self):
+            return False
+
+    pipeline = _pipeline(text_processor, NoStaticEncoder(), entity_extractor, tmp_path)
+
+    page = pipeline.run(JOB_TEXT, _sources(), top_k=2, prefilter_size=3)
+
+    assert page["total"] == page["ranked"] == len(CV_TEXTS)
+    assert len(pipeline.duplicate_index.embeddings) == len(CV_TEXTS)
+
+
+def _write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 50), text)
+    doc.save(path)
+    doc.close()
+
+
+def test_filters_are_evaluated_per_batch(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    calls = []
+    filter_pool = pipeline.candidate_store.filter
+
+    def counting_filter(**kwargs):
+        calls.append(kwargs["keys"])
+        return filter_pool(**kwargs)
+
+    pipeline.candidate_store.filter = counting_filter
+    page = pipeline.run(JOB_TEXT, _sources(), top_k=10, required_skills=["python"])
+
+    assert calls == [[f"cv_{i}.txt" for i in range(len(CV_TEXTS))]]
+    assert sorted(r['filename'] for r in page["results"]) == ["cv_0.txt", "cv_3.txt", "cv_5.txt"]
+
+
+def test_unreadable_cv_keeps_its_stored_analysis(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    file_paths = []
+    for i, text in enumerate(CV_TEXTS[:3]):
+        path = str(tmp_path / f"cv_{i}.pdf")
+        _write_pdf(path, text)
+        file_paths.append((f"cv_{i}.pdf", path, text))
+    first = pipeline.run(JOB_TEXT, file_paths, top_k=1)
+    analyses = {
+        name: pipeline.candidate_store.get_or_analyze(name, text, entity_extractor)
+        for name, _, text in file_paths
+    }
+
+    for _, path, _ in file_paths:
+        os.remove(path)
+    page = pipeline.page(first["match_id"], top_k=3)
+
+    # Les analyses stockées servent au résumé et ne sont pas écrasées
+    assert len(page["results"]) == 3
+    assert all(r["summary"] is not None for r in page["results"])
+    assert {name: pipeline.candidate_store.get(name) for name in analyses} == analyses
+
+    # Sans analyse stockée, le CV devenu illisible produit une entrée d'erreur
+    pipeline.candidate_store = CandidateStore(path=None)
+    pipeline.match_summarizer.candidate_store = pipeline.candidate_store
+    page = pipeline.page(first["match_id"], top_k=3)
+    assert [r["error"] for r in page["results"]] == ["Impossible de relire le CV"] * 3
+    assert len(pipeline.candidate_store) == 0
+
+
+def test_analyze_many_reports_failures_per_file(text_processor, entity_extractor, tmp_path, monkeypatch):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    file_paths = []
+    for i, text in enumerate(CV_TEXTS[:3]):
+        path = str(tmp_path / f"cv_{i}.pdf")
+        _write_pdf(path, text)
+        file_paths.append((f"cv_{i}.pdf", path))
+    broken = tmp_path / "broken.docx"
+    broken.write_bytes(b"PK\x03\x04" + os.urandom(64))
+    file_paths.insert(1, ("broken.docx", str(broken)))
+
+    # La passe groupée échoue à cause d'un seul CV: il est isolé, les autres sont analysés
+    analyze_cvs = entity_extractor.analyze_cvs
+
+    def failing_analyze_cvs(texts, n_process=1):
+        if any("Comptable" in text for text in texts):
+            raise ValueError("analyse impossible")
+        return analyze_cvs(texts, n_process=n_process)
+
+    monkeypatch.setattr(entity_extractor, "analyze_cvs", failing_analyze_cvs)
+
+    results = list(pipeline.analyze_many(file_paths, batch_size=4))
+
+    assert [(r["filename"], r["success"]) for r in results] == [
+        ("cv_0.pdf", True), ("broken.docx", False), ("cv_1.pdf", False), ("cv_2.pdf", True)
+    ]
+    assert pipeline.candidate_store.get("cv_1.pdf") is None
+
+
+def test_analyze_many_releases_lock_between_results(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    file_paths = []
+    for i, text in enumerate(CV_TEXTS):
+        path = str(tmp_path / f"cv_{i}.pdf")
+        _write_pdf(path, text)
+        file_paths.append((f"cv_{i}.pdf", path))
+
+    results = pipeline.analyze_many(file_paths, batch_size=2)
+    assert next(results)["success"]
+
+    # Pendant que le flux est suspendu, un autre thread peut prendre le verrou
+    acquired = []
+
+    def acquire():
+        acquired.append(pipeline.lock.acquire(timeout=5))
+        if acquired[-1]:
+            pipeline.lock.release()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    thread.join()
+    assert acquired == [True]
+
+    assert len(list(results)) == len(CV_TEXTS) - 1
+
+
+def test_run_encodes_and_analyzes_outside_the_lock(text_processor, entity_extractor, tmp_path, monkeypatch):
+    text_encoder = StubTextEncoder()
+    pipeline = _pipeline(text_processor, text_encoder, entity_extractor, tmp_path)
+    held = []
+
+    def lock_is_free():
+        # Un autre thread (autre requête, flux NDJSON) doit pouvoir prendre le verrou
+        acquired = []
+
+        def acquire():
+            acquired.append(pipeline.lock.acquire(timeout=0.5))
+            if acquired[-1]:
+                pipeline.lock.release()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        thread.join()
+        held.append(not acquired[0])
+
+    encode_chunks = text_encoder.encode_chunks
+    analyze_cv = entity_extractor.analyze_cv
+    monkeypatch.setattr(text_encoder, "encode_chunks", lambda text: lock_is_free() or encode_chunks(text))
+    monkeypatch.setattr(entity_extractor, "analyze_cv", lambda text: lock_is_free() or analyze_cv(text))
+
+    pipeline.run(JOB_TEXT, _sources(), top_k=2, required_skills=["python"])
+
+    assert held and not any(held)
+
+
+def test_concurrent_analysis_and_matching(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path)
+    file_paths = []
+    for i, text in enumerate(CV_TEXTS * 3):
+        path = str(tmp_path / f"batch_{i}.pdf")
+        _write_pdf(path, text)
+        file_paths.append((f"batch_{i}.pdf", path))
+    errors = []
+
+    def analyze():
+        try:
+            for _ in range(3):
+                assert all(result["success"] for result in pipeline.analyze_many(file_paths, batch_size=4))
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=analyze)
+    thread.start()
+    for _ in range(5):
+        pipeline.run(JOB_TEXT, _sources(), top_k=2, required_skills=["python"])
+    thread.join()
+
+    assert errors == []
+    assert all(f"batch_{i}.pdf" in pipeline.candidate_store for i in range(len(file_paths)))
+    assert CandidateStore.load(pipeline.candidate_store.path).keys == pipeline.candidate_store.keys
+
+
+def test_saves_are_throttled_until_forced(text_processor, entity_extractor, tmp_path):
+    pipeline = _pipeline(text_processor, StubTextEncoder(), entity_extractor, tmp_path, persist_interval=3600)
+    pipeline.run(JOB_TEXT, _sources(), top_k=2, required_skills=["python"])
+    pipeline.page(pipeline.run(JOB_TEXT, _sources(), top_k=1)["match_id"], top_k=1, offset=1)
+
+    # Aucune requête ne réécrit le stockage avant l'intervalle
+    assert not os.path.exists(pipeline.candidate_store.path)
+    assert not os.path.exists(pipeline.duplicate_index.path)
+
+    pipeline.persist(force=True)
+    assert CandidateStore.load(pipeline.candidate_store.path).keys == pipeline.candidate_store.keys
+    assert len(DuplicateIndex.load(pipeline.duplicate_index.path)) == len(CV_TEXTS)
+
+
+def test_search_uses_the_ann_index_once_built(text_processor, entity_extractor, tmp_path):
+    encoder = StubTextEncoder()
+    ann_index = IVFIndex(encoder.dimension, n_lists=2, nprobe=2, path=str(tmp_path / "ann.npz"))
+    pipeline = _pipeline(text_processor, encoder, entity_extractor, tmp_path, ann_index=ann_index)
+    pipeline.run(JOB_TEXT, _sources(), top_k=2)
+
+    # Avant l'entraînement: parcours exact des embeddings connus
+    assert not pipeline.build_ann_index(min_size=len(CV_TEXTS) + 1)
+    exact = pipeline.search(JOB_TEXT, top_k=3)
+
+    assert pipeline.build_ann_index(min_size=len(CV_TEXTS))
+    assert len(ann_index) == len(CV_TEXTS)
+    approximate = pipeline.search(JOB_TEXT, top_k=3, nprobe=2)
+
+    assert [r['filename'] for r in approximate] == [r['filename'] for r in exact]
+    assert [r['score'] for r in approximate] == [r['score'] for r in exact]
+
+    # Les CVs encodés ensuite sont ajoutés à l'index, sans doublon
+    pipeline.run(JOB_TEXT, _sources() + [("cv_new.txt", "cv_new.txt", "Développeur Python Django")], top_k=2)
+    assert len(ann_index) == len(CV_TEXTS) + 1
+    pipeline.persist()
+    assert len(IVFIndex.load(str(tmp_path / "ann.npz"))) == len(CV_TEXTS) + 1
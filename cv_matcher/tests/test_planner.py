@@ -0,0 +1,81 @@
+"""
+Tests de la planification des CPUs.
+"""
+import pytest
+from config import API_WORKERS, EXTRACTION_WORKERS, NER_PROCESSES
+from core.planner import cgroup_cpu_quota, plan_resources
+
+
+def _cpus(available):
+    return {"available": available, "affinity": available, "cgroup_quota": None, "os": available}
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    _write(tmp_path / "proc", "0::/app\n")
+    _write(tmp_path / "cg" / "app" / "cpu.max", "250000 100000\n")
+
+    assert cgroup_cpu_quota(str(tmp_path / "cg"), str(tmp_path / "proc")) == 2.5
+
+
+def test_cgroup_v2_unlimited(tmp_path):
+    _write(tmp_path / "proc", "0::/\n")
+    _write(tmp_path / "cg" / "cpu.max", "max 100000\n")
+
+    assert cgroup_cpu_quota(str(tmp_path / "cg"), str(tmp_path / "proc")) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    _write(tmp_path / "proc", "2:cpu,cpuacct:/docker/abc\n0::/\n")
+    _write(tmp_path / "cg" / "cpu,cpuacct" / "docker" / "abc" / "cpu.cfs_quota_us", "300000\n")
+    _write(tmp_path / "cg" / "cpu,cpuacct" / "docker" / "abc" / "cpu.cfs_period_us", "100000\n")
+
+    assert cgroup_cpu_quota(str(tmp_path / "cg"), str(tmp_path / "proc")) == 3.0
+
+
+@pytest.mark.parametrize("policy", ["latency", "balanced", "throughput"])
+@pytest.mark.parametrize("available", [1, 2, 4, 16])
+def test_plan_does_not_oversubscribe(policy, available):
+    plan = plan_resources(policy, _cpus(available))
+
+    assert plan["serving_workers"] * plan["cpus_per_worker"] <= available
+    extraction = plan["extraction_workers"] if plan["extraction_workers"] > 1 else 0
+    assert extraction + plan["encoder_threads"] <= max(plan["cpus_per_worker"], 1)
+    assert 1 <= plan["ner_processes"] <= plan["encoder_threads"]
+
+
+def test_plan_policies():
+    latency = plan_resources("latency", _cpus(16))
+    assert (latency["serving_workers"], latency["extraction_workers"], latency["encoder_threads"]) == (1, 4, 12)
+
+    balanced = plan_resources("balanced", _cpus(16))
+    assert (balanced["serving_workers"], balanced["cpus_per_worker"]) == (4, 4)
+
+    throughput = plan_resources("throughput", _cpus(16))
+    assert (throughput["serving_workers"], throughput["encoder_threads"]) == (16, 1)
+
+
+def test_default_policy_keeps_configured_pools():
+    plan = plan_resources(cpus=_cpus(16))
+
+    assert plan["policy"] == "none"
+    assert (plan["serving_workers"], plan["ner_processes"], plan["extraction_workers"]) == (
+        API_WORKERS, NER_PROCESSES, EXTRACTION_WORKERS
+    )
+
+
+def test_shard_workers_are_opt_in():
+    assert plan_resources("none", _cpus(16), shard_workers=0)["shard_workers"] == 0
+    assert plan_resources("none", _cpus(16), shard_workers=3)["shard_workers"] == 3
+    assert plan_resources("balanced", _cpus(16), shard_workers=0)["shard_workers"] == 4
+    # Un CPU par worker uvicorn: pas de processus supplémentaires
+    assert plan_resources("throughput", _cpus(16), shard_workers=0)["shard_workers"] == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        plan_resources("inconnue", _cpus(4))
@@ -0,0 +1,118 @@
+"""
+Tests du profilage à la demande.
+"""
+import asyncio
+import json
+import os
+import pstats
+import pytest
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from utils.profiling import ProfilingMiddleware, profile_stage, profiled, profiled_call, profiled_iter
+
+
+@profiled("encoding")
+def _encode(n):
+    return [0] * n
+
+
+async def _app(scope, receive, send):
+    with profile_stage("ranking"):
+        _encode(10000)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _pooled_work(n):
+    return sum(range(n))
+
+
+def _pooled_items(n):
+    for i in range(n):
+        yield _pooled_work(i)
+
+
+async def _threadpool_app(scope, receive, send):
+    await run_in_threadpool(profiled_call(_pooled_work), 1000)
+    async for _ in iterate_in_threadpool(profiled_iter(_pooled_items(3))):
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _request(middleware, headers):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/match/", "headers": headers}
+    asyncio.run(middleware(scope, None, send))
+    return dict(messages[0]["headers"])
+
+
+def test_profiled_request_writes_stage_report(tmp_path):
+    middleware = ProfilingMiddleware(_app, admin_token="secret", output_dir=str(tmp_path))
+
+    headers = _request(middleware, [(b"x-profile", b"1"), (b"x-admin-token", b"secret")])
+
+    output_dir = tmp_path / headers[b"x-profile-id"].decode()
+    assert {"profile.prof", "profile.txt", "memory.txt", "stages.json"} <= set(os.listdir(output_dir))
+
+    report = json.loads((output_dir / "stages.json").read_text())
+    assert report["label"] == "POST /api/match/"
+    assert report["stages"]["encoding"]["calls"] == 1
+    assert report["stages"]["ranking"]["peak_memory_bytes"] >= report["stages"]["encoding"]["peak_memory_bytes"] > 0
+
+
+@pytest.mark.parametrize("token", [b"wrong", "sécurité".encode("utf-8"), b"\xff\xfe"])
+def test_profiling_requires_admin_token(tmp_path, token):
+    middleware = ProfilingMiddleware(_app, admin_token="secret", output_dir=str(tmp_path))
+
+    headers = _request(middleware, [(b"x-profile", b"1"), (b"x-admin-token", token)])
+
+    assert b"x-profile-id" not in headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_threadpool_work_is_merged_into_profile(tmp_path):
+    middleware = ProfilingMiddleware(_threadpool_app, admin_token="secret", output_dir=str(tmp_path))
+
+    headers = _request(middleware, [(b"x-profile", b"1"), (b"x-admin-token", b"secret")])
+
+    stats = pstats.Stats(str(tmp_path / headers[b"x-profile-id"].decode() / "profile.prof"))
+    calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+    # Un appel direct et trois éléments du générateur, exécutés hors de la boucle
+    assert calls["_pooled_work"] == 4
+
+
+def test_profiled_request_runs_alone(tmp_path):
+    events = []
+
+    async def app(scope, receive, send):
+        events.append(f"start {scope['path']}")
+        await asyncio.sleep(0.05)
+        events.append(f"end {scope['path']}")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = ProfilingMiddleware(app, admin_token="secret", output_dir=str(tmp_path))
+
+    async def send(message):
+        pass
+
+    async def run():
+        def scope(path, headers):
+            return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+        profiled = [(b"x-profile", b"1"), (b"x-admin-token", b"secret")]
+        first = asyncio.create_task(middleware(scope("/a", []), None, send))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(middleware(scope("/profiled", profiled), None, send))
+        await asyncio.sleep(0.01)
+        third = asyncio.create_task(middleware(scope("/b", []), None, send))
+        await asyncio.gather(first, second, third)
+
+    asyncio.run(run())
+
+    # La requête profilée attend /a, puis /b attend la fin du profilage
+    assert events == ["start /a", "end /a", "start /profiled", "end /profiled", "start /b", "end /b"]
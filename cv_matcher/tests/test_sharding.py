@@ -0,0 +1,123 @@
+"""
+Tests du matching partitionné entre processus workers.
+"""
+import fitz  # PyMuPDF
+import pytest
+from core import sharding
+from core.dedup import DuplicateIndex
+from core.extractor import CVExtractor
+from core.pipeline import MatchPipeline
+from core.processor import TextProcessor
+from core.sharding import ShardExecutor
+from core.store import CandidateStore
+from core.summarizer import MatchSummarizer
+from benchmarks.stubs import StubTextEncoder
+from utils.ner import EntityExtractor
+
+JOB_TEXT = "Développeur Python\nAPI Django, Docker et PostgreSQL"
+
+CV_TEXTS = [
+    "Développeur Python Django Docker PostgreSQL depuis 2015",
+    "Comptable, gestion de la paie et des bilans",
+    "Développeur Java Spring et Docker",
+    "Développeur Python Django Docker PostgreSQL depuis 2015",
+    "Data scientist Python, pandas et PostgreSQL",
+    "Chef de projet marketing digital",
+    "Ingénieur DevOps Docker Kubernetes et Python",
+]
+
+
+def _write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 50), text)
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture(scope="module")
+def components():
+    return {
+        "text_processor": TextProcessor(),
+        "text_encoder": StubTextEncoder(),
+        "entity_extractor": EntityExtractor("blank:fr")
+    }
+
+
+@pytest.fixture
+def file_paths(tmp_path):
+    paths = []
+    for i, text in enumerate(CV_TEXTS):
+        path = str(tmp_path / f"cv_{i}.pdf")
+        _write_pdf(path, text)
+        paths.append((f"cv_{i}.pdf", path))
+    return paths
+
+
+def _pipeline(components, data_dir, shard_executor=None):
+    store = CandidateStore(path=str(data_dir / "candidates.npz"))
+    return MatchPipeline(
+        components["text_processor"],
+        components["text_encoder"],
+        components["entity_extractor"],
+        MatchSummarizer(components["entity_extractor"], store),
+        store,
+        DuplicateIndex(path=str(data_dir / "dedup.npz")),
+        extraction_workers=1,
+        shard_executor=shard_executor
+    )
+
+
+def test_partition_is_contiguous_and_balanced():
+    items = list(range(10))
+
+    partitions = ShardExecutor.partition(items, 4)
+
+    assert [len(p) for p in partitions] == [3, 3, 2, 2]
+    assert [i for p in partitions for i in p] == items
+    assert ShardExecutor.partition(items[:2], 4) == [[0], [1]]
+    assert ShardExecutor.partition([], 3) == []
+
+
+def test_sharded_run_matches_sequential_ranking(components, file_paths, tmp_path):
+    sequential = _pipeline(components, tmp_path / "sequential")
+    expected = sequential.run(JOB_TEXT, CVExtractor.iter_from_paths(file_paths, 1), top_k=3, offset=1)
+
+    executor = ShardExecutor(max_workers=2, spacy_model="blank:fr", stub_backends=True)
+    executor.start()
+    try:
+        # Tous les workers existent avant la première partition
+        assert len(executor._pool._processes) == 2
+        sharded = _pipeline(components, tmp_path / "sharded", executor)
+        page = sharded.run_sharded(JOB_TEXT, file_paths, top_k=3, offset=1, shards=3)
+    finally:
+        executor.close()
+
+    assert page["total"] == expected["total"] == len(CV_TEXTS)
+    assert [r['filename'] for r in page["results"]] == [r['filename'] for r in expected["results"]]
+    assert [r['score'] for r in page["results"]] == [r['score'] for r in expected["results"]]
+    assert [r['summary'] for r in page["results"]] == [r['summary'] for r in expected["results"]]
+
+    # Le coordinateur tient l'index des doublons et le stockage des analyses
+    assert sharded.duplicate_index.canonical["cv_3.pdf"] == "cv_0.pdf"
+    assert all(r['filename'] in sharded.candidate_store for r in page["results"])
+
+
+def test_score_shard_skips_known_analyses(components, file_paths):
+    sharding._components = components
+    store = CandidateStore(path=None)
+    filename, path = file_paths[0]
+    text = CVExtractor.extract_text(path)
+    analysis = store.get_or_analyze(filename, text, components["entity_extractor"])
+    job_embedding = components["text_encoder"].encode_text(
+        components["text_processor"].clean_job_text(JOB_TEXT)
+    )
+
+    result = sharding.score_shard(
+        file_paths[:2], JOB_TEXT, job_embedding, k=1,
+        known_analyses={filename: (store.stored_digest(filename), analysis)}
+    )
+
+    assert [entry['filename'] for entry in result["ranking"]] == ["cv_0.pdf", "cv_1.pdf"]
+    assert [t[0] for t in result["top"]] == ["cv_0.pdf"]
+    assert "summaries" not in result
+    assert filename not in result["analyses"]
@@ -0,0 +1,135 @@
+"""
+Tests de la lecture des CVs stockés.
+"""
+import os
+import httpx
+import pytest
+from core.storage import DocumentReader, DocumentStoreError, HTTPDocumentReader, LocalDocumentReader
+
+
+class CountingReader(DocumentReader):
+    """Stockage en mémoire qui compte les téléchargements."""
+
+    def __init__(self, documents, **kwargs):
+        super().__init__(**kwargs)
+        self.documents = documents
+        self.reads = 0
+
+    def etag(self, key):
+        content = self.documents.get(key)
+        return None if content is None else str(hash(content))
+
+    def read(self, key):
+        self.reads += 1
+        return self.documents[key]
+
+
+def test_local_reader_resolves_keys_under_root(tmp_path):
+    (tmp_path / "cvs").mkdir()
+    (tmp_path / "cvs" / "a.pdf").write_bytes(b"a")
+    reader = LocalDocumentReader(root=str(tmp_path), cache_dir=str(tmp_path / "cache"))
+
+    assert reader.fetch("cvs/a.pdf") == str(tmp_path / "cvs" / "a.pdf")
+    assert reader.fetch("cvs/absent.pdf") is None
+    with pytest.raises(ValueError):
+        reader.fetch("../secret.pdf")
+
+
+def test_local_reader_etag_changes_with_content(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"a")
+    reader = LocalDocumentReader(root=str(tmp_path))
+    before = reader.etag("a.pdf")
+
+    path.write_bytes(b"ab")
+
+    assert reader.etag("a.pdf") != before
+    assert reader.etag("absent.pdf") is None
+
+
+def test_fetch_caches_by_key_and_etag(tmp_path):
+    reader = CountingReader({"cv.pdf": b"v1"}, cache_dir=str(tmp_path))
+
+    first = reader.fetch("cv.pdf")
+    assert reader.fetch("cv.pdf") == first
+    assert reader.reads == 1
+    assert first.endswith(".pdf")
+
+    reader.documents["cv.pdf"] = b"v2"
+    second = reader.fetch("cv.pdf")
+    assert second != first
+    assert reader.reads == 2
+    with open(second, "rb") as f:
+        assert f.read() == b"v2"
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_fetch_many_keeps_order_and_reports_missing(tmp_path, max_workers):
+    documents = {f"{i}.pdf": str(i).encode() for i in range(10)}
+    reader = CountingReader(documents, cache_dir=str(tmp_path), max_workers=max_workers)
+    keys = list(documents) + ["absent.pdf"]
+
+    results = list(reader.fetch_many(keys))
+    reader.close()
+
+    assert [key for key, _ in results] == keys
+    assert results[-1][1] is None
+    for key, path in results[:-1]:
+        assert os.path.exists(path)
+
+
+def _http_reader(tmp_path, handler, **kwargs):
+    reader = HTTPDocumentReader(base_url="http://store", cache_dir=str(tmp_path), **kwargs)
+    reader.client = httpx.Client(transport=httpx.MockTransport(handler))
+    return reader
+
+
+def test_http_reader_revalidates_cached_documents(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"v1", headers={"etag": '"v1"'})
+
+    reader = _http_reader(tmp_path, handler)
+
+    first = reader.fetch("cv.pdf")
+    assert reader.fetch("cv.pdf") == first
+    assert requests == [None, '"v1"']
+
+
+def test_http_reader_reports_store_errors(tmp_path):
+    def handler(request):
+        if request.url.path == "/absent.pdf":
+            return httpx.Response(404)
+        if request.url.path == "/down.pdf":
+            raise httpx.ConnectError("connexion refusée", request=request)
+        return httpx.Response(503)
+
+    reader = _http_reader(tmp_path, handler, max_workers=2)
+
+    assert reader.fetch("absent.pdf") is None
+    for key in ["down.pdf", "busy.pdf"]:
+        with pytest.raises(DocumentStoreError):
+            reader.fetch(key)
+    with pytest.raises(DocumentStoreError):
+        list(reader.fetch_many(["absent.pdf", "down.pdf"]))
+    reader.close()
+
+
+def test_cache_evicts_least_recently_used_copies(tmp_path):
+    documents = {f"{i}.pdf": bytes(10) for i in range(4)}
+    reader = CountingReader(documents, cache_dir=str(tmp_path), cache_max_bytes=25)
+
+    first = reader.fetch("0.pdf")
+    second = reader.fetch("1.pdf")
+    os.utime(first, ns=(1, 1))
+    os.utime(second, ns=(2, 2))
+    reader.fetch("0.pdf")  # Copie réutilisée: redevient la plus récente
+    third = reader.fetch("2.pdf")
+
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 25
@@ -0,0 +1,114 @@
+"""
+Tests du stockage colonnaire des analyses de CV.
+"""
+import numpy as np
+from core.store import CandidateStore
+
+
+def _analysis(skills, years=None, level="débutant"):
+    return {"skills": skills, "experience_years": years, "education": [], "experience_level": level}
+
+
+def _store():
+    store = CandidateStore(taxonomy=["python", "docker", "kubernetes", "sql"], path=None)
+    store.upsert("a.pdf", _analysis(["python", "docker", "kubernetes"], 7, "confirmé"))
+    store.upsert("b.pdf", _analysis(["docker", "kubernetes"], 3))
+    store.upsert("c.pdf", _analysis(["python", "sql"], 12, "expert"))
+    return store
+
+
+def test_filter_required_skills_and_experience():
+    store = _store()
+
+    assert store.filter(required_skills=["docker", "kubernetes"]) == ["a.pdf", "b.pdf"]
+    assert store.filter(required_skills=["docker", "kubernetes"], min_experience_years=5) == ["a.pdf"]
+    assert store.filter(experience_levels=["expert"]) == ["c.pdf"]
+    assert store.filter(required_skills=["python"], keys=["b.pdf", "c.pdf"]) == ["c.pdf"]
+
+
+def test_compare_skills_with_unknown_job_skills():
+    store = _store()
+
+    matched, missing = store.compare_skills("a.pdf", ["python", "sql", "rust"])
+
+    assert matched == ["python"]
+    assert missing == ["sql", "rust"]
+
+
+def test_job_skills_do_not_grow_the_taxonomy():
+    store = _store()
+    width = store._bits.shape[1]
+
+    store.compare_skills("a.pdf", [f"Entreprise {i}" for i in range(100)])
+    assert store.filter(required_skills=["python", "inconnue"]) == []
+
+    assert store.skills == ["python", "docker", "kubernetes", "sql"]
+    assert store._bits.shape[1] == width
+
+
+def test_taxonomy_is_capped():
+    store = CandidateStore(taxonomy=["python"], path=None, max_skills=2)
+    store.upsert("a.pdf", _analysis(["python", "docker", "rust"]))
+
+    assert store.skills == ["python", "docker"]
+    assert store.get("a.pdf")["skills"] == ["python", "docker"]
+
+
+def test_taxonomy_grows_beyond_one_word():
+    store = CandidateStore(taxonomy=[f"skill{i}" for i in range(100)], path=None)
+    store.upsert("a.pdf", _analysis(["skill3", "skill99", "nouvelle"]))
+
+    assert store.get("a.pdf")["skills"] == ["skill3", "skill99", "nouvelle"]
+    assert store.filter(required_skills=["skill99", "nouvelle"]) == ["a.pdf"]
+
+
+def test_get_or_analyze_only_recomputes_changed_text():
+    class Extractor:
+        calls = 0
+
+        def analyze_cv(self, text):
+            self.calls += 1
+            return _analysis(["python"], 2)
+
+    store = CandidateStore(path=None)
+    extractor = Extractor()
+
+    store.get_or_analyze("a.pdf", "texte", extractor)
+    store.get_or_analyze("a.pdf", "texte", extractor)
+    assert extractor.calls == 1
+
+    store.get_or_analyze("a.pdf", "texte modifié", extractor)
+    assert extractor.calls == 2
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    store = _store()
+    path = str(tmp_path / "store.npz")
+    store.save(path)
+
+    loaded = CandidateStore.load(path)
+
+    assert loaded.keys == store.keys
+    for key in store.keys:
+        assert loaded.get(key) == store.get(key)
+    np.testing.assert_array_equal(loaded._years[:3], [7, 3, 12])
+
+
+def test_interrupted_save_keeps_previous_file(tmp_path, monkeypatch):
+    store = _store()
+    path = str(tmp_path / "store.npz")
+    store.save(path)
+
+    def failing_savez(f, **arrays):
+        f.write(b"partiel")
+        raise OSError("disque plein")
+
+    store.upsert("d.pdf", _analysis(["sql"]))
+    monkeypatch.setattr(np, "savez", failing_savez)
+    try:
+        store.save(path)
+    except OSError:
+        pass
+    monkeypatch.undo()
+
+    assert CandidateStore.load(path).keys == ["a.pdf", "b.pdf", "c.pdf"]
@@ -4,10 +4,55 @@ Module pour l'extraction d'entités nommées à partir des CV et offres d'emploi
 import re
 import spacy
 import logging
-from config import SPACY_MODEL, COMPETENCES_PATTERNS
+from datetime import datetime
+from config import SPACY_MODEL, COMPETENCES_PATTERNS, NER_BATCH_SIZE, NER_PROCESSES
+from utils.profiling import profiled
 
 logger = logging.getLogger(__name__)
 
+# Patterns pour les années d'expérience, par ordre de priorité
+EXPERIENCE_PATTERNS = [
+    r'(\d+)\s*ans?\s+d\'expérience',
+    r'expérience\s*:?\s*(\d+)\s*ans?',
+    r'expérience\s*professionnelle\s*:?\s*(\d+)\s*ans?',
+    r'(\d+)\s*ans?\s+d\'expérience\s*professionnelle',
+    r'(\d+)\s*years?\s+of\s+experience',
+    r'experience\s*:?\s*(\d+)\s*years?'
+]
+
+# Périodes du type "2015-2020" ou "2015 - 2020" ou "2015 à 2020"
+PERIOD_PATTERN = r'((?:19|20)\d{2})\s*[\-–—à]\s*((?:19|20)\d{2}|présent|present|aujourd\'hui|actuel)'
+PRESENT_PATTERN = r'présent|present|aujourd\'hui|actuel'
+
+# Séparateur de paragraphes
+PARAGRAPH_SEPARATOR = r'\n\s*\n'
+
+# Liste de diplômes et niveaux d'éducation à rechercher
+DIPLOMAS = [
+    "bac", "baccalauréat", "bts", "dut", "licence", "master", "doctorat", "phd",
+    "diplôme", "diplome", "ingénieur", "ingenieur", "mba", "formation",
+    "certificat", "certification", "école", "ecole", "université", "universite"
+]
+
+
+def experience_level_from_years(experience_years):
+    """
+    Détermine le niveau d'expérience à partir du nombre d'années.
+    
+    Args:
+        experience_years (int): Nombre d'années d'expérience, ou None
+        
+    Returns:
+        str: Niveau d'expérience
+    """
+    experience_level = "débutant"
+    if experience_years:
+        if experience_years > 5:
+            experience_level = "confirmé"
+        if experience_years > 10:
+            experience_level = "expert"
+    return experience_level
+
 class EntityExtractor:
     """Classe pour extraire des entités nommées des textes."""
     
@@ -28,7 +73,9 @@ class EntityExtractor:
             
         # Ajouter les patterns pour les compétences
         self.competences_patterns = COMPETENCES_PATTERNS
+        self.fused_analyzer = FusedCVAnalyzer(self.nlp, self.competences_patterns)
         
+    @profiled("ner")
     def extract_skills(self, text):
         """
         Extrait les compétences techniques mentionnées dans le texte.
@@ -56,6 +103,7 @@ class EntityExtractor:
                 
         return list(skills)
     
+    @profiled("ner")
     def extract_experience_years(self, text):
         """
         Extrait le nombre d'années d'expérience mentionné dans le texte.
@@ -66,17 +114,7 @@ class EntityExtractor:
         Returns:
             int: Nombre estimé d'années d'expérience, ou None si non détecté
         """
-        # Patterns pour les années d'expérience
-        patterns = [
-            r'(\d+)\s*ans?\s+d\'expérience',
-            r'expérience\s*:?\s*(\d+)\s*ans?',
-            r'expérience\s*professionnelle\s*:?\s*(\d+)\s*ans?',
-            r'(\d+)\s*ans?\s+d\'expérience\s*professionnelle',
-            r'(\d+)\s*years?\s+of\s+experience',
-            r'experience\s*:?\s*(\d+)\s*years?'
-        ]
-        
-        for pattern in patterns:
+        for pattern in EXPERIENCE_PATTERNS:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
                 try:
@@ -97,13 +135,10 @@ class EntityExtractor:
         Returns:
             int: Nombre estimé d'années d'expérience, ou None si non détecté
         """
-        # Recherche des périodes du type "2015-2020" ou "2015 - 2020" ou "2015 à 2020"
-        period_pattern = r'((?:19|20)\d{2})\s*[\-–—à]\s*((?:19|20)\d{2}|présent|present|aujourd\'hui|actuel)'
-        
         total_years = 0
-        matches = re.finditer(period_pattern, text, re.IGNORECASE)
+        matches = re.finditer(PERIOD_PATTERN, text, re.IGNORECASE)
         
-        current_year = 2023  # À remplacer par datetime.now().year dans un contexte réel
+        current_year = datetime.now().year
         
         for match in matches:
             try:
@@ -111,7 +146,7 @@ class EntityExtractor:
                 
                 # Traitement de la date de fin
                 end_str = match.group(2)
-                if re.match(r'présent|present|aujourd\'hui|actuel', end_str, re.IGNORECASE):
+                if re.match(PRESENT_PATTERN, end_str, re.IGNORECASE):
                     end_year = current_year
                 else:
                     end_year = int(end_str)
@@ -124,6 +159,7 @@ class EntityExtractor:
                 
         return total_years if total_years > 0 else None
     
+    @profiled("ner")
     def extract_education(self, text):
         """
         Extrait les informations d'éducation du texte.
@@ -134,21 +170,14 @@ class EntityExtractor:
         Returns:
             list: Liste des diplômes/formations détectés
         """
-        # Liste de diplômes et niveaux d'éducation à rechercher
-        diplomas = [
-            "bac", "baccalauréat", "bts", "dut", "licence", "master", "doctorat", "phd",
-            "diplôme", "diplome", "ingénieur", "ingenieur", "mba", "formation",
-            "certificat", "certification", "école", "ecole", "université", "universite"
-        ]
-        
         education_info = []
         
         # Découpage en paragraphes pour isoler la section éducation
-        paragraphs = re.split(r'\n\s*\n', text.lower())
+        paragraphs = re.split(PARAGRAPH_SEPARATOR, text.lower())
         
         for paragraph in paragraphs:
             # Vérifier si le paragraphe parle d'éducation
-            is_education = any(re.search(r'\b' + re.escape(d) + r'\b', paragraph) for d in diplomas)
+            is_education = any(re.search(r'\b' + re.escape(d) + r'\b', paragraph) for d in DIPLOMAS)
             
             if is_education:
                 # Nettoyer et ajouter à la liste
@@ -157,36 +186,278 @@ class EntityExtractor:
                 
         return education_info
         
+    @profiled("ner")
     def analyze_cv(self, text):
         """
         Analyse complète d'un CV pour en extraire les informations clés.
         
+        Le texte est parcouru en une seule passe par FusedCVAnalyzer, avec un
+        résultat identique à celui de extract_skills, extract_experience_years
+        et extract_education.
+        
         Args:
             text (str): Texte du CV
             
         Returns:
             dict: Dictionnaire des informations extraites
         """
-        # Extraire les compétences
-        skills = self.extract_skills(text)
+        return self.fused_analyzer.analyze(text)
+        
+    @profiled("ner")
+    def analyze_cvs(self, texts, n_process=NER_PROCESSES):
+        """
+        Analyse un lot de CVs (passes SpaCy regroupées avec nlp.pipe).
+        
+        Args:
+            texts (list): Textes des CVs
+            n_process (int): Nombre de processus SpaCy
+            
+        Returns:
+            list: Analyses des CVs, dans l'ordre des textes
+        """
+        return list(self.fused_analyzer.analyze_many(texts, n_process=n_process))
+
+
+class FusedCVAnalyzer:
+    """
+    Analyseur de CV en une seule passe.
+    
+    Le texte est normalisé une fois, puis un unique scanner combiné détecte à
+    chaque position les compétences et diplômes, les mentions d'années
+    d'expérience, les périodes d'emploi et les séparateurs de paragraphes.
+    """
+    
+    def __init__(self, nlp, competences_patterns=COMPETENCES_PATTERNS, diplomas=DIPLOMAS):
+        """
+        Initialise l'analyseur et compile le scanner combiné.
+        
+        Args:
+            nlp (spacy.language.Language): Pipeline spaCy pour les entités ORG
+            competences_patterns (list): Compétences à détecter
+            diplomas (list): Diplômes et formations à détecter
+        """
+        self.nlp = nlp
+        self.competences_patterns = competences_patterns
+        self.diplomas = set(diplomas)
+        
+        keywords = sorted(set(competences_patterns) | self.diplomas, key=len, reverse=True)
+        self._keyword_regexes = {
+            keyword: re.compile(r'\b' + re.escape(keyword) + r'\b') for keyword in keywords
+        }
         
-        # Extraire les années d'expérience
-        experience_years = self.extract_experience_years(text)
+        # Le scanner ne retient que le mot-clé le plus long à une position donnée:
+        # les mots-clés qui en sont des préfixes sont vérifiés séparément
+        self._keyword_prefixes = {
+            keyword: [other for other in keywords if other != keyword and keyword.startswith(other)]
+            for keyword in keywords
+        }
         
-        # Extraire les informations d'éducation
-        education = self.extract_education(text)
+        self._experience_regexes = [re.compile(p, re.IGNORECASE) for p in EXPERIENCE_PATTERNS]
+        self._present_regex = re.compile(PRESENT_PATTERN, re.IGNORECASE)
         
-        # Analyser le niveau d'expérience
-        experience_level = "débutant"
-        if experience_years:
-            if experience_years > 5:
-                experience_level = "confirmé"
-            if experience_years > 10:
-                experience_level = "expert"
+        # Chaque famille est une assertion optionnelle évaluée à chaque position,
+        # pour reproduire les recherches indépendantes (et chevauchantes) des
+        # méthodes unitaires; la condition finale écarte les positions sans résultat
+        experience_alternatives = '|'.join(
+            f'(?P<e{i}>{pattern})' for i, pattern in enumerate(EXPERIENCE_PATTERNS)
+        )
+        self._scanner = re.compile(
+            r'(?=\b(?P<kw>' + '|'.join(re.escape(k) for k in keywords) + r')\b)?'
+            r'(?=(?i:(?P<exp>' + experience_alternatives + r')))?'
+            r'(?=(?i:(?P<per>' + PERIOD_PATTERN + r')))?'
+            r'(?=(?P<sep>' + PARAGRAPH_SEPARATOR + r'))?'
+            r'(?(kw)|(?(exp)|(?(per)|(?(sep)|(?!)))))'
+        )
+        
+    def analyze(self, text):
+        """
+        Analyse un CV en une seule passe.
+        
+        Args:
+            text (str): Texte du CV
+            
+        Returns:
+            dict: Dictionnaire des informations extraites (même format que EntityExtractor.analyze_cv)
+        """
+        return next(self.analyze_many([text]))
+        
+    def analyze_many(self, texts, batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES):
+        """
+        Analyse un lot de CVs, les passes SpaCy étant regroupées avec nlp.pipe.
+        
+        Args:
+            texts (iterable): Textes des CVs
+            batch_size (int): Nombre de textes par lot SpaCy
+            n_process (int): Nombre de processus SpaCy
+            
+        Returns:
+            generator: Analyses des CVs, dans l'ordre des textes
+        """
+        lowered_texts = (text.lower() for text in texts)
+        for doc in self.nlp.pipe(lowered_texts, batch_size=batch_size, n_process=n_process):
+            yield self._analyze_doc(doc)
+            
+    def _analyze_doc(self, doc):
+        """
+        Analyse un CV déjà passé dans le pipeline SpaCy.
+        
+        Args:
+            doc (spacy.tokens.Doc): Document SpaCy du texte normalisé
+            
+        Returns:
+            dict: Dictionnaire des informations extraites
+        """
+        lowered = doc.text
+        
+        keywords = set()
+        education_positions = []
+        experience_hit = None
+        periods = []
+        period_end = 0
+        separators = []
+        separator_end = 0
+        
+        for match in self._scanner.finditer(lowered):
+            position = match.start()
+            
+            keyword = match.group('kw')
+            if keyword:
+                found = [keyword] + [
+                    other for other in self._keyword_prefixes[keyword]
+                    if self._keyword_regexes[other].match(lowered, position)
+                ]
+                keywords.update(found)
+                if any(k in self.diplomas for k in found):
+                    education_positions.append(position)
+                    
+            # Seul le pattern d'expérience le plus prioritaire compte, à sa première position
+            if match.group('exp') is not None:
+                index = self._experience_index(match)
+                if experience_hit is None or index < experience_hit[0]:
+                    experience_hit = (index, position)
                 
+            # Les périodes et séparateurs ne se chevauchent pas (comme re.finditer / re.split)
+            if match.group('per') is not None and position >= period_end:
+                periods.append(match.group('per'))
+                period_end = position + len(match.group('per'))
+                
+            if match.group('sep') is not None and position >= separator_end:
+                separator_end = position + len(match.group('sep'))
+                separators.append((position, separator_end))
+                
+        skills = self._skills(doc, keywords)
+        experience_years = self._experience_years(lowered, experience_hit, periods)
+        education = self._education(lowered, education_positions, separators)
+        
         return {
             "skills": skills,
             "experience_years": experience_years,
             "education": education,
-            "experience_level": experience_level
-        }
\ No newline at end of file
+            "experience_level": experience_level_from_years(experience_years)
+        }
+        
+    @staticmethod
+    def _experience_index(match):
+        """
+        Retourne l'index du pattern d'expérience détecté par le scanner.
+        
+        Args:
+            match (re.Match): Résultat du scanner
+            
+        Returns:
+            int: Index dans EXPERIENCE_PATTERNS
+        """
+        for i in range(len(EXPERIENCE_PATTERNS)):
+            if match.group(f'e{i}') is not None:
+                return i
+        return None
+        
+    def _skills(self, doc, keywords):
+        """
+        Construit la liste des compétences à partir des mots-clés détectés.
+        
+        Args:
+            doc (spacy.tokens.Doc): Document SpaCy du texte normalisé
+            keywords (set): Mots-clés détectés par le scanner
+            
+        Returns:
+            list: Liste des compétences détectées
+        """
+        skills = set()
+        
+        # Même ordre d'insertion que EntityExtractor.extract_skills
+        for pattern in self.competences_patterns:
+            if pattern in keywords:
+                skills.add(pattern)
+                
+        for ent in doc.ents:
+            if ent.label_ == "ORG" and len(ent.text) > 1:
+                skills.add(ent.text.lower())
+                
+        return list(skills)
+        
+    def _experience_years(self, lowered, experience_hit, periods):
+        """
+        Calcule les années d'expérience à partir des résultats du scanner.
+        
+        Args:
+            lowered (str): Texte normalisé
+            experience_hit (tuple): (index du pattern prioritaire, position), ou None
+            periods (list): Périodes d'emploi détectées
+            
+        Returns:
+            int: Nombre estimé d'années d'expérience, ou None si non détecté
+        """
+        if experience_hit is not None:
+            index, position = experience_hit
+            return int(self._experience_regexes[index].match(lowered, position).group(1))
+            
+        total_years = 0
+        current_year = datetime.now().year
+        
+        for period in periods:
+            match = re.fullmatch(PERIOD_PATTERN, period, re.IGNORECASE)
+            start_year = int(match.group(1))
+            end_str = match.group(2)
+            if self._present_regex.match(end_str):
+                end_year = current_year
+            else:
+                end_year = int(end_str)
+                
+            if end_year >= start_year:
+                total_years += (end_year - start_year)
+                
+        return total_years if total_years > 0 else None
+        
+    def _education(self, lowered, education_positions, separators):
+        """
+        Retourne les paragraphes contenant un diplôme ou une formation.
+        
+        Args:
+            lowered (str): Texte normalisé
+            education_positions (list): Positions des mots-clés de diplômes
+            separators (list): Bornes (début, fin) des séparateurs de paragraphes
+            
+        Returns:
+            list: Liste des paragraphes d'éducation nettoyés
+        """
+        bounds = []
+        start = 0
+        for sep_start, sep_end in separators:
+            bounds.append((start, sep_start))
+            start = sep_end
+        bounds.append((start, len(lowered)))
+        
+        education_info = []
+        positions = iter(education_positions)
+        position = next(positions, None)
+        
+        for start, end in bounds:
+            while position is not None and position < start:
+                position = next(positions, None)
+            if position is not None and position < end:
+                education_info.append(re.sub(r'\s+', ' ', lowered[start:end]).strip())
+                while position is not None and position < end:
+                    position = next(positions, None)
+                    
+        return education_info
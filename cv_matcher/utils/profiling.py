@@ -0,0 +1,353 @@
+"""
+Module de profilage à la demande des requêtes (cProfile et tracemalloc).
+"""
+import os
+import io
+import hmac
+import json
+import time
+import uuid
+import pstats
+import asyncio
+import cProfile
+import logging
+import threading
+import functools
+import tracemalloc
+import contextvars
+from contextlib import contextmanager, nullcontext
+from config import PROFILING_DIR
+
+logger = logging.getLogger(__name__)
+
+# Profileur de la requête en cours (None hors requête profilée)
+_current_profiler = contextvars.ContextVar("request_profiler", default=None)
+
+_NULL_STAGE = nullcontext()
+
+
+class RequestProfiler:
+    """
+    Profileur d'une requête: profil cProfile complet et pics mémoire par étape.
+
+    Les étapes (extraction, encodage, NER, classement...) peuvent être appelées
+    plusieurs fois et s'imbriquer; leurs durées s'additionnent et leur pic
+    mémoire est le maximum observé.
+
+    cProfile n'observe que le thread qui l'active: le code exécuté dans le pool
+    de threads pour la requête est profilé par `thread()` et fusionné au profil
+    à la fin. Les processus workers du matching partitionné ne sont pas profilés;
+    leur durée apparaît comme une attente dans le processus de l'API.
+    """
+
+    def __init__(self, output_dir=PROFILING_DIR, label=""):
+        """
+        Initialise le profileur.
+
+        Args:
+            output_dir (str): Répertoire racine des profils sauvegardés
+            label (str): Description de la requête (méthode et chemin)
+        """
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.output_dir = os.path.join(output_dir, self.profile_id)
+        self.label = label
+        self.stages = {}
+        self._stack = []
+        self._profile = cProfile.Profile()
+        self._thread_profiles = []
+        self._thread_lock = threading.Lock()
+        self._thread_id = None
+        self._started_at = None
+
+    def start(self):
+        """Démarre le profilage CPU et le traçage mémoire."""
+        tracemalloc.start()
+        self._thread_id = threading.get_ident()
+        self._started_at = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self):
+        """
+        Arrête le profilage et sauvegarde les résultats.
+
+        Returns:
+            str: Répertoire contenant les résultats
+        """
+        self._profile.disable()
+        duration = time.perf_counter() - self._started_at
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Profil CPU brut (exploitable avec pstats ou snakeviz) et résumé texte,
+        # threads du pool compris
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        with self._thread_lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        stats.dump_stats(os.path.join(self.output_dir, "profile.prof"))
+        stats.sort_stats("cumulative").print_stats(50)
+        with open(os.path.join(self.output_dir, "profile.txt"), "w") as f:
+            f.write(stream.getvalue())
+
+        # Allocations encore vivantes en fin de requête, par ligne de code
+        with open(os.path.join(self.output_dir, "memory.txt"), "w") as f:
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+
+        with open(os.path.join(self.output_dir, "stages.json"), "w") as f:
+            json.dump({
+                "label": self.label,
+                "duration_s": round(duration, 6),
+                "peak_memory_bytes": peak,
+                "stages": self.stages
+            }, f, indent=2, ensure_ascii=False)
+
+        logger.info(f"Profil de la requête {self.label} sauvegardé dans {self.output_dir}")
+        return self.output_dir
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mesure une étape du traitement.
+
+        Args:
+            name (str): Nom de l'étape
+        """
+        # Le pic courant appartient à l'étape parente avant d'être réinitialisé
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+        frame = [name, 0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+            stats = self.stages.setdefault(name, {"calls": 0, "duration_s": 0.0, "peak_memory_bytes": 0})
+            stats["calls"] += 1
+            stats["duration_s"] = round(stats["duration_s"] + elapsed, 6)
+            stats["peak_memory_bytes"] = max(stats["peak_memory_bytes"], peak)
+
+    @contextmanager
+    def thread(self):
+        """
+        Profile le code exécuté dans un thread du pool pour le compte de la requête.
+        """
+        # Le thread de la boucle d'événements est déjà profilé
+        if threading.get_ident() == self._thread_id:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._thread_lock:
+                self._thread_profiles.append(profile)
+
+
+def profile_stage(name):
+    """
+    Retourne le contexte de mesure d'une étape, ou un contexte vide hors profilage.
+
+    Args:
+        name (str): Nom de l'étape
+
+    Returns:
+        contextmanager: Contexte à utiliser avec `with`
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+
+def profiled(name):
+    """
+    Décorateur mesurant chaque appel d'une fonction comme une étape du profil.
+
+    Args:
+        name (str): Nom de l'étape
+
+    Returns:
+        callable: Décorateur
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _current_profiler.get()
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiled_call(func):
+    """
+    Encapsule une fonction exécutée dans le pool de threads (run_in_threadpool)
+    pour qu'elle soit profilée avec la requête en cours.
+
+    Args:
+        func (callable): Fonction à encapsuler
+
+    Returns:
+        callable: Fonction profilée si la requête l'est
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _current_profiler.get()
+        if profiler is None:
+            return func(*args, **kwargs)
+        with profiler.thread():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def profiled_iter(iterable):
+    """
+    Parcourt un itérable consommé dans le pool de threads (StreamingResponse)
+    en profilant chaque élément avec la requête en cours.
+
+    Args:
+        iterable: Itérable à parcourir
+
+    Yields:
+        Éléments de l'itérable
+    """
+    iterator = iter(iterable)
+    while True:
+        # Le contexte de la requête est copié dans le thread à chaque élément
+        profiler = _current_profiler.get()
+        with profiler.thread() if profiler is not None else _NULL_STAGE:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI profilant les requêtes portant l'en-tête `X-Profile`.
+
+    Réservé aux administrateurs: l'en-tête `X-Admin-Token` doit correspondre
+    au jeton configuré. cProfile observe tout le thread de la boucle d'événements
+    et tracemalloc tout le processus: une requête profilée attend la fin des
+    requêtes en cours et s'exécute seule, les autres attendent sa fin.
+    """
+
+    def __init__(self, app, admin_token, output_dir=PROFILING_DIR):
+        """
+        Initialise le middleware.
+
+        Args:
+            app: Application ASGI encapsulée
+            admin_token (str): Jeton administrateur attendu
+            output_dir (str): Répertoire des profils sauvegardés
+        """
+        self.app = app
+        self.admin_token = admin_token
+        self.output_dir = output_dir
+        self._busy = False
+        self._active = 0
+        self._waiting = 0
+        self._gate = asyncio.Condition()
+
+    async def _enter(self, exclusive):
+        """
+        Attend le droit d'exécuter une requête.
+
+        Args:
+            exclusive (bool): Requête profilée, exécutée seule
+        """
+        async with self._gate:
+            if exclusive:
+                # Les requêtes arrivées pendant l'attente passent après le profilage
+                self._waiting += 1
+                try:
+                    await self._gate.wait_for(lambda: not self._busy and self._active == 0)
+                finally:
+                    self._waiting -= 1
+                    self._gate.notify_all()
+                self._busy = True
+            else:
+                await self._gate.wait_for(lambda: not self._busy and not self._waiting)
+            self._active += 1
+
+    async def _leave(self, exclusive):
+        """
+        Libère le droit d'exécution d'une requête.
+
+        Args:
+            exclusive (bool): Requête profilée
+        """
+        async with self._gate:
+            self._active -= 1
+            if exclusive:
+                self._busy = False
+            self._gate.notify_all()
+
+    async def _run(self, scope, receive, send):
+        """Exécute une requête non profilée, après toute requête profilée en cours."""
+        await self._enter(exclusive=False)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self._leave(exclusive=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile", b"").lower() not in (b"1", b"true"):
+            await self._run(scope, receive, send)
+            return
+
+        # Comparaison sur les octets bruts: un en-tête non ASCII est un simple refus
+        token = headers.get(b"x-admin-token", b"")
+        if not self.admin_token or not hmac.compare_digest(token, self.admin_token.encode()):
+            logger.warning("Profilage refusé: jeton administrateur invalide")
+            await self._run(scope, receive, send)
+            return
+
+        if self._busy:
+            logger.warning("Profilage ignoré: une autre requête est déjà profilée")
+            await self._run(scope, receive, send)
+            return
+
+        profiler = RequestProfiler(self.output_dir, label=f"{scope['method']} {scope['path']}")
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-profile-id", profiler.profile_id.encode())
+                ]
+            await send(message)
+
+        await self._enter(exclusive=True)
+        context_token = _current_profiler.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            _current_profiler.reset(context_token)
+            await self._leave(exclusive=True)